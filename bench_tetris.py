@@ -0,0 +1,222 @@
+"""
+Benchmark suite for the game primitives and whole headless games.
+
+Every benchmark uses fixed seeds and fixed boards: an empty board, a mid-game
+board and a near-death board, each built by playing a seeded policy, on both
+BitBoard and list boards. Each benchmark is calibrated to run for at least
+--min-time seconds per repeat; the best of --repeat runs is reported in ns per
+operation, since noise only ever makes runs slower.
+
+    python bench_tetris.py --save baseline.json
+    python bench_tetris.py --baseline baseline.json --threshold 0.10
+
+With --baseline the exit status is 1 if any benchmark is slower than the
+baseline by more than the threshold (0.10 = 10%).
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from tetris import (
+    BitBoard, Game, Piece, PIECE_TABLE, SHAPE_NAMES, check_collision, fix_piece_to_board,
+    remove_piece_from_board, clear_lines, clear_rows, restore_cleared_rows, new_tetrimino, enumerate_placements,
+    lowest_policy, random_policy, play_game, game_seed,
+)
+
+SEED = 1234
+THRESHOLD = 0.10
+
+def _play_until(policy, seed, stop):
+    """Plays a seeded game with policy until stop(game) is true; returns the game."""
+    game = Game(seed=seed)
+    rng = random.Random(seed)
+    while not game.game_over and not stop(game):
+        game.apply(*policy(game, rng), undoable=False)
+    return game
+
+def build_boards():
+    """The named BitBoards the primitive benchmarks run on."""
+    mid = _play_until(lowest_policy, SEED, lambda g: max(g.board.heights) >= 8).board
+    game = _play_until(random_policy, SEED, lambda g: max(g.board.heights) >= g.height - 4)
+    return {'empty': BitBoard(), 'mid': mid, 'near_death': game.board}
+
+def _positions(board, count, seed):
+    """Seeded Pieces at random in-bounds positions (colliding or not) on board."""
+    rng = random.Random(seed)
+    pieces = []
+    for _ in range(count):
+        name = rng.choice(SHAPE_NAMES)
+        rotation = rng.randrange(len(PIECE_TABLE[name]))
+        geometry = PIECE_TABLE[name][rotation]
+        pieces.append(Piece(name, rotation, rng.randrange(board.width - geometry.width + 1),
+                            rng.randrange(board.height - geometry.height + 1)))
+    return pieces
+
+def _free_positions(board, count, seed):
+    return [p for p in _positions(board, count * 4, seed) if not check_collision(board, p)][:count]
+
+def _with_full_rows(board, rows):
+    """A copy of board whose bottom `rows` rows are full, for the clear benchmarks."""
+    cells = board.to_rows()
+    for r in range(board.height - rows, board.height):
+        cells[r] = [1] * board.width
+    return BitBoard.from_rows(cells)
+
+def benchmarks():
+    """{name: (setup, ops)}: setup() returns a function that performs `ops` operations per call."""
+    boards = build_boards()
+    suite = {}
+    for label, board in boards.items():
+        for kind, target in (('bitboard', board), ('list', board.to_rows())):
+            def collision(target=target, pieces=_positions(board, 200, SEED)):
+                def run():
+                    for piece in pieces:
+                        check_collision(target, piece)
+                return run
+            suite[f'check_collision/{kind}/{label}'] = (collision, 200)
+
+            def fix(target=target, pieces=_free_positions(board, 100, SEED)):
+                def run():
+                    for piece in pieces:
+                        fix_piece_to_board(target, piece)
+                        remove_piece_from_board(target, piece)
+                return run
+            suite[f'fix_and_remove_piece/{kind}/{label}'] = (fix, 100)
+
+            def clear(target=target, board=board):
+                full = _with_full_rows(board, 4)
+                target = full if isinstance(target, BitBoard) else full.to_rows()
+                candidates = range(board.height - 4, board.height)
+                def run():
+                    for _ in range(50):
+                        restore_cleared_rows(target, clear_rows(target, candidates))
+                return run
+            suite[f'clear_and_restore_4_rows/{kind}/{label}'] = (clear, 50)
+
+            def lines(target=target, board=board):
+                full = _with_full_rows(board, 4)
+                target = full if isinstance(target, BitBoard) else full.to_rows()
+                rows = range(board.height - 4, board.height)
+                def run():
+                    for _ in range(50):
+                        clear_lines(target) # Through the public function: scans for the full rows itself
+                        restore_cleared_rows(target, rows)
+                return run
+            suite[f'clear_lines/{kind}/{label}'] = (lines, 50)
+
+        def placements(board=board):
+            pieces = [Piece.spawn(name, board.width) for name in SHAPE_NAMES]
+            def run():
+                for piece in pieces:
+                    enumerate_placements(board, piece)
+            return run
+        suite[f'enumerate_placements/{label}'] = (placements, len(SHAPE_NAMES))
+
+    def tetrimino():
+        rng = random.Random(SEED)
+        def run():
+            for _ in range(1000):
+                new_tetrimino(rng=rng)
+        return run
+    suite['new_tetrimino'] = (tetrimino, 1000)
+
+    def game_steps():
+        def run():
+            game = Game(seed=SEED)
+            rng = random.Random(SEED)
+            for _ in range(2000):
+                if game.game_over:
+                    game = Game(seed=SEED)
+                game.step(rng.choice('adwss'))
+                game.tick()
+        return run
+    suite['game_step_and_tick'] = (game_steps, 2000)
+
+    def full_games():
+        def run():
+            for i in range(4):
+                play_game(game_seed(SEED, i), lowest_policy, max_pieces=200)
+        return run
+    suite['full_game/lowest_policy'] = (full_games, 4)
+    return suite
+
+def measure(run, ops, min_time, repeat):
+    """Best ns per operation over `repeat` runs of at least min_time seconds each."""
+    loops = 1
+    while True: # Calibrate by doubling, like timeit's autorange
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    times = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        times.append(time.perf_counter() - start)
+    return min(times) / (loops * ops) * 1e9
+
+def run_suite(min_time=0.2, repeat=5, name_filter=None):
+    """Runs the benchmarks whose names contain name_filter; returns the results document."""
+    results = {}
+    for name, (setup, ops) in benchmarks().items():
+        if name_filter and name_filter not in name:
+            continue
+        ns = measure(setup(), ops, min_time, repeat)
+        results[name] = {'ns_per_op': ns, 'ops_per_second': 1e9 / ns}
+    return {
+        'meta': {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+                 'machine': platform.machine(), 'min_time': min_time, 'repeat': repeat},
+        'results': results,
+    }
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """
+    [(name, baseline ns, current ns, ratio, regressed)] for benchmarks present
+    in both result documents; ratio > 1 means slower than the baseline.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['ns_per_op'] / base['ns_per_op']
+        rows.append((name, base['ns_per_op'], result['ns_per_op'], ratio, ratio > 1 + threshold))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tetris.py primitives and full games.")
+    parser.add_argument('--filter', help="only run benchmarks whose name contains this")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per timed repeat")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', help="compare with results saved earlier")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="allowed slowdown, e.g. 0.10")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.min_time, args.repeat, args.filter)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+    if not args.baseline:
+        for name, result in current['results'].items():
+            print(f"{name:<48} {result['ns_per_op']:>12.0f} ns/op {result['ops_per_second']:>14.0f} ops/s")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = 0
+    for name, base_ns, ns, ratio, regressed in compare(current, baseline, args.threshold):
+        regressions += regressed
+        print(f"{name:<48} {base_ns:>12.0f} -> {ns:>12.0f} ns/op {ratio:>7.2f}x{'  REGRESSION' if regressed else ''}")
+    if regressions:
+        print(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import unittest
+
+from bench_tetris import benchmarks, build_boards, compare, measure
+
+
+class TestBench(unittest.TestCase):
+
+    def test_benchmarks_run(self):
+        """すべてのベンチマークが実行でき、盤面が固定シードで再現されるかテストします。"""
+        suite = benchmarks()
+        self.assertIn('full_game/lowest_policy', suite)
+        self.assertIn('clear_lines/bitboard/mid', suite)
+        for name, (setup, ops) in suite.items():
+            run = setup()
+            run() # 例外が出なければよい
+        self.assertGreater(measure(suite['new_tetrimino'][0](), 1000, 0.0, 2), 0)
+        boards = build_boards()
+        self.assertEqual(boards, build_boards(), "ベンチマーク用の盤面が再現されません。")
+        self.assertGreaterEqual(max(boards['near_death'].heights), boards['near_death'].height - 4)
+
+    def test_compare_flags_regressions(self):
+        """しきい値を超えた遅延だけが回帰と判定されるかテストします。"""
+        baseline = {'results': {'a': {'ns_per_op': 100.0}, 'b': {'ns_per_op': 100.0}, 'gone': {'ns_per_op': 1.0}}}
+        current = {'results': {'a': {'ns_per_op': 109.0}, 'b': {'ns_per_op': 120.0}, 'new': {'ns_per_op': 5.0}}}
+        rows = {name: regressed for name, _, _, _, regressed in compare(current, baseline, 0.10)}
+        self.assertEqual(rows, {'a': False, 'b': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,20 @@
+import io
+import os
+import re
+import subprocess
+import sys
+import time
 import unittest
+import random
 from tetris import (
     BOARD_WIDTH, BOARD_HEIGHT, TETROMINOES, create_board, new_tetrimino,
-    check_collision, fix_piece_to_board, clear_lines, get_piece_shape
+    check_collision, fix_piece_to_board, clear_lines, get_piece_shape,
+    BitBoard, PIECE_TABLE, PIECE_MASKS, rotate_piece, Game, score_for_lines,
+    enumerate_placements, board_features, clear_rows, board_size, BoardSnapshot,
+    Piece, SHAPE_NAMES, Renderer, FixedTimestep, RealtimeLoop, percentile,
+    simulate, summarize, resolve_policy, random_policy
 )
+from tetris import _search_placements
 
 class TestTetris(unittest.TestCase):
 
@@ -168,6 +180,24 @@ class TestTetris(unittest.TestCase):
         self.assertEqual(count, 0, "ラインが消去されていないのにカウントが0ではありません。")
         self.assertEqual(board, cleared_board, "ラインが消去されていないのにボードが変更されています。")
 
+    def test_clear_rows_only_checks_given_rows(self):
+        """指定した行だけを検査し、その場で詰めて消去行番号を返すかテストします。"""
+        rows = [0] * (BOARD_HEIGHT - 4) + [0b1] + [(1 << BOARD_WIDTH) - 1] * 3 # 下3行が満杯
+        for board in (BitBoard(rows).to_rows(), BitBoard(rows)):
+            original = board
+            cleared = clear_rows(board, [BOARD_HEIGHT - 3, BOARD_HEIGHT - 1, 0])
+            self.assertEqual(cleared, [BOARD_HEIGHT - 3, BOARD_HEIGHT - 1], "消去された行番号が正しくありません。")
+            self.assertIs(board, original)
+            self.assertEqual(len(board), BOARD_HEIGHT)
+            self.assertEqual(list(board[BOARD_HEIGHT - 1]), [1] * BOARD_WIDTH, "指定外の満杯行が消去されています。")
+            self.assertEqual(board[BOARD_HEIGHT - 2][0], 1, "上のブロックが正しく下がっていません。")
+            self.assertEqual(list(board[0]), [0] * BOARD_WIDTH)
+
+    def test_fix_piece_returns_rows(self):
+        """ピースを固定すると占有した行番号が返るかテストします。"""
+        piece = {'shape_name': 'I', 'shape': TETROMINOES['I'], 'rotation': 1, 'x': 0, 'y': 3}
+        self.assertEqual(list(fix_piece_to_board(create_board(), piece)), [3, 4, 5, 6])
+
     def test_scoring_logic(self):
         """ライン消去数に基づいたスコア計算をテストします。"""
         # このテストは tetris.py の main 内のスコアロジックを模倣します。
@@ -213,5 +243,600 @@ class TestTetris(unittest.TestCase):
         self.assertFalse(check_collision(empty_board, any_new_piece), "空のボードで新しいピースが衝突すると判定されます。")
 
 
+class TestBitBoard(unittest.TestCase):
+
+    def test_bitboard_matches_list_board(self):
+        """ビットボードがリストボードと同じ衝突・固定・消去結果になるかテストします。"""
+        rng = random.Random(1234)
+        list_board = create_board()
+        bit_board = BitBoard()
+        for _ in range(300):
+            name = rng.choice(list(TETROMINOES))
+            piece = {'shape_name': name, 'shape': TETROMINOES[name],
+                     'rotation': rng.randrange(4), 'x': rng.randrange(-1, BOARD_WIDTH), 'y': 0}
+            for dx in (-1, 0, 1):
+                for rot in range(4):
+                    self.assertEqual(
+                        check_collision(list_board, piece, new_x=piece['x'] + dx, new_rotation=rot),
+                        check_collision(bit_board, piece, new_x=piece['x'] + dx, new_rotation=rot),
+                        "ビットボードの衝突判定がリストボードと一致しません。")
+            if check_collision(list_board, piece):
+                list_board, bit_board = create_board(), BitBoard()
+                continue
+            while not check_collision(list_board, piece, new_y=piece['y'] + 1):
+                piece['y'] += 1
+            fix_piece_to_board(list_board, piece)
+            fix_piece_to_board(bit_board, piece)
+            list_board, list_count = clear_lines(list_board)
+            bit_board, bit_count = clear_lines(bit_board)
+            self.assertEqual(list_count, bit_count, "消去ライン数が一致しません。")
+            self.assertEqual(bit_board.to_rows(), list_board, "ボードの状態が一致しません。")
+
+    def test_bitboard_row_access(self):
+        """ビットボードの行をリストボードと同じように読めるかテストします。"""
+        board = create_board()
+        board[BOARD_HEIGHT - 1][0] = 1
+        board[BOARD_HEIGHT - 1][BOARD_WIDTH - 1] = 1
+        bit_board = BitBoard.from_rows(board)
+        self.assertEqual(len(bit_board), BOARD_HEIGHT)
+        self.assertEqual(bit_board[BOARD_HEIGHT - 1][0], 1)
+        self.assertEqual(bit_board[BOARD_HEIGHT - 1][1], 0)
+        self.assertEqual(bit_board[-1], bit_board[BOARD_HEIGHT - 1])
+        self.assertEqual(bit_board.to_rows(), board)
+        self.assertEqual([list(row) for row in bit_board], board, "行の反復が終わりません。")
+        with self.assertRaises(IndexError):
+            bit_board[BOARD_HEIGHT]
+        with self.assertRaises(IndexError):
+            bit_board[-BOARD_HEIGHT - 1]
+
+    def test_bitboard_clear_lines_in_place(self):
+        """ビットボードのライン消去がその場で行われ、上のブロックが下がるかテストします。"""
+        bit_board = BitBoard([0] * (BOARD_HEIGHT - 2) + [0b101, (1 << BOARD_WIDTH) - 1])
+        cleared_board, count = clear_lines(bit_board)
+        self.assertIs(cleared_board, bit_board)
+        self.assertEqual(count, 1)
+        self.assertEqual(bit_board.rows[BOARD_HEIGHT - 1], 0b101)
+        self.assertEqual(bit_board.rows[0], 0)
+
+
+    def test_piece_table_matches_shapes(self):
+        """事前計算テーブルが TETROMINOES の形状と一致するかテストします。"""
+        for name, rotations in TETROMINOES.items():
+            self.assertEqual(len(PIECE_TABLE[name]), len(rotations))
+            for rotation, shape in enumerate(rotations):
+                geometry = PIECE_TABLE[name][rotation]
+                self.assertEqual(geometry.width, len(shape[0]))
+                self.assertEqual(geometry.height, len(shape))
+                cells = {(r, c) for r, row in enumerate(shape) for c, cell in enumerate(row) if cell}
+                self.assertEqual(set(geometry.cells), cells, f"{name} の {rotation} 回転のセルが一致しません。")
+                for x in range(BOARD_WIDTH - geometry.width + 1):
+                    masks = PIECE_MASKS[(name, rotation, x)]
+                    self.assertEqual({(r, c - x) for r, m in enumerate(masks) for c in range(BOARD_WIDTH) if m >> c & 1}, cells)
+                self.assertNotIn((name, rotation, BOARD_WIDTH - geometry.width + 1), PIECE_MASKS)
+
+    def test_rotate_piece_wall_kick(self):
+        """回転が壁キック（左、右）を含めてリストボードとビットボードで一致するかテストします。"""
+        for board in (create_board(), BitBoard()):
+            # 縦向きIピースを右端に置いて回転すると、右壁を避けるために左へずれる必要がある
+            piece = {'shape_name': 'I', 'shape': TETROMINOES['I'], 'rotation': 1, 'x': BOARD_WIDTH - 1, 'y': 0}
+            self.assertFalse(rotate_piece(board, piece), "壁キック1マスで収まらない回転が成功しています。")
+            piece = {'shape_name': 'T', 'shape': TETROMINOES['T'], 'rotation': 1, 'x': BOARD_WIDTH - 2, 'y': 0}
+            self.assertTrue(rotate_piece(board, piece))
+            self.assertEqual((piece['rotation'], piece['x']), (2, BOARD_WIDTH - 3), "左への壁キックが適用されていません。")
+
+
+    def _scan_features(self, board):
+        """ボード全体を走査して特徴量を計算します（比較用）。"""
+        heights = []
+        holes = 0
+        for c in range(BOARD_WIDTH):
+            column = [board[r][c] for r in range(BOARD_HEIGHT)]
+            top = next((r for r, cell in enumerate(column) if cell), BOARD_HEIGHT)
+            heights.append(BOARD_HEIGHT - top)
+            holes += sum(1 for cell in column[top:] if not cell)
+        bumpiness = sum(abs(heights[c] - heights[c + 1]) for c in range(BOARD_WIDTH - 1))
+        walled = [BOARD_HEIGHT] + heights + [BOARD_HEIGHT]
+        wells = sum(max(min(walled[c], walled[c + 2]) - walled[c + 1], 0) for c in range(BOARD_WIDTH))
+        return tuple(heights), holes, bumpiness, wells
+
+    def test_features_maintained_incrementally(self):
+        """固定・消去のたびに特徴量が全走査の結果と一致するかテストします。"""
+        random.seed(5)
+        for _ in range(5):
+            game = Game()
+            while not game.game_over:
+                piece = game.current_piece
+                piece['rotation'], piece['x'], piece['y'] = random.choice(enumerate_placements(game.board, piece))
+                game.step('s')
+                features = game.board.features()
+                self.assertEqual((features.heights, features.holes, features.bumpiness, features.wells),
+                                 self._scan_features(game.board), "特徴量が全走査の結果と一致しません。")
+                self.assertEqual(features, BitBoard(game.board.rows).features(), "差分更新と再計算の結果が一致しません。")
+
+    def test_features_read_after_many_changes(self):
+        """固定・消去・取り消しを重ねてから読んだ特徴量とハッシュが再計算と一致するかテストします。"""
+        rng = random.Random(12)
+        game = Game(BitBoard(width=6, height=12), seed=3)
+        for moves in (5, 20, 40):
+            applied = 0
+            while applied < moves and not game.game_over:
+                game.apply(*max(enumerate_placements(game.board, game.current_piece),
+                                key=lambda p: (p[2], rng.random())))
+                applied += 1
+            rebuilt = BitBoard(game.board.rows, width=6)
+            self.assertEqual((game.board.features(), game.board.zobrist), (rebuilt.features(), rebuilt.zobrist))
+            for _ in range(applied // 2 + 1):
+                game.undo()
+            rebuilt = BitBoard(game.board.rows, width=6)
+            self.assertEqual((game.board.zobrist, game.board.row_transitions), (rebuilt.zobrist, rebuilt.row_transitions))
+            self.assertEqual(game.board.features(), rebuilt.features(), "取り消し後の特徴量が一致しません。")
+        self.assertGreater(game.lines, 0, "テスト中にライン消去が発生していません。")
+
+    def test_board_features_of_list_board(self):
+        """リストボードからも特徴量が得られるかテストします。"""
+        board = create_board()
+        board[BOARD_HEIGHT - 1][0] = 1
+        board[BOARD_HEIGHT - 3][0] = 1 # 下に1つの穴
+        features = board_features(board)
+        self.assertEqual(features.heights[0], 3)
+        self.assertEqual(features.holes, 1)
+        self.assertEqual(features.bumpiness, 3)
+        self.assertEqual(features.max_height, 3)
+
+
+class TestGame(unittest.TestCase):
+
+    def _i_piece(self):
+        return {'shape_name': 'I', 'shape': TETROMINOES['I'], 'rotation': 0, 'x': 0, 'y': 0}
+
+    def test_tick_locks_and_scores(self):
+        """重力でピースが着地・固定され、ライン消去とスコアが反映されるかテストします。"""
+        board = BitBoard([0] * (BOARD_HEIGHT - 1) + [((1 << BOARD_WIDTH) - 1) & ~0b1111]) # 左4マスだけ空き
+        game = Game(board)
+        game.current_piece = self._i_piece()
+        cleared = game.tick(BOARD_HEIGHT)
+        self.assertEqual(cleared, 1)
+        self.assertEqual(game.lines, 1)
+        self.assertEqual(game.pieces, 1)
+        self.assertEqual(game.score, score_for_lines(1))
+        self.assertEqual(game.board.rows[BOARD_HEIGHT - 1], 0, "消去後の最下段が空になっていません。")
+
+    def test_step_moves_and_soft_drop(self):
+        """移動・回転・ソフトドロップの操作をテストします。"""
+        game = Game()
+        game.current_piece = self._i_piece()
+        game.step('a')
+        self.assertEqual(game.current_piece['x'], 0, "左壁を越えて移動しています。")
+        game.step('d')
+        self.assertEqual(game.current_piece['x'], 1)
+        game.step('w')
+        self.assertEqual(game.current_piece['rotation'], 1)
+        game.step('s')
+        self.assertEqual((game.current_piece['y'], game.score), (1, 1), "ソフトドロップのスコアが正しくありません。")
+
+    def test_scoring_table(self):
+        """ライン消去数ごとの得点をテストします。"""
+        self.assertEqual([score_for_lines(n) for n in range(6)], [0, 100, 300, 500, 800, 800])
+
+    def test_headless_game_runs_to_game_over(self):
+        """入出力なしでゲームオーバーまで進められるかテストします。"""
+        random.seed(7)
+        game = Game(create_board())
+        while not game.game_over:
+            game.step(random.choice('adw'))
+            game.tick()
+        self.assertTrue(game.pieces > 0)
+        self.assertTrue(check_collision(game.board, game.current_piece))
+
+
+class TestPlacements(unittest.TestCase):
+
+    def test_fast_path_matches_bfs(self):
+        """列の高さによる高速経路が BFS と同じ配置を返すかテストします。"""
+        random.seed(11)
+        for _ in range(10):
+            game = Game()
+            while not game.game_over:
+                piece = game.current_piece
+                placements = enumerate_placements(game.board, piece)
+                _, resting = _search_placements(game.board, piece['shape_name'], [(piece['rotation'], piece['x'], piece['y'])])
+                self.assertEqual(sorted(placements), sorted(resting), "高速経路と BFS の結果が一致しません。")
+                self.assertEqual(len(placements), len(set(placements)), "配置が重複しています。")
+                piece['rotation'], piece['x'], piece['y'] = random.choice(placements)
+                game.step('s')
+
+    def test_tuck_under_overhang(self):
+        """張り出しの下に滑り込ませる配置が見つかるかテストします。"""
+        board = create_board()
+        for c in range(4, BOARD_WIDTH):
+            board[BOARD_HEIGHT - 2][c] = 1 # 最下段の上に張り出し
+        piece = {'shape_name': 'I', 'shape': TETROMINOES['I'], 'rotation': 0, 'x': 0, 'y': 0}
+        placements = enumerate_placements(board, piece)
+        self.assertIn((0, BOARD_WIDTH - 4, BOARD_HEIGHT - 1), placements, "張り出しの下への配置が見つかりません。")
+        for rotation, x, y in placements:
+            self.assertFalse(check_collision(board, piece, new_x=x, new_y=y, new_rotation=rotation))
+            self.assertTrue(check_collision(board, piece, new_x=x, new_y=y + 1, new_rotation=rotation))
+
+    def test_blocked_piece_has_no_placements(self):
+        """出現位置で衝突しているピースには配置がないことをテストします。"""
+        board = create_board()
+        board[0] = [1] * BOARD_WIDTH
+        self.assertEqual(enumerate_placements(board, new_tetrimino()), [])
+
+
+class TestBoardSizes(unittest.TestCase):
+
+    def test_boards_of_different_sizes_coexist(self):
+        """異なるサイズのボードを同じプロセスで扱えるかテストします。"""
+        random.seed(21)
+        for width, height in ((4, 8), (10, 20), (64, 8), (100, 5)):
+            for board in (create_board(width, height), BitBoard(width=width, height=height)):
+                self.assertEqual(board_size(board), (width, height))
+                game = Game(board)
+                self.assertFalse(check_collision(board, game.current_piece), "出現位置が盤面に収まっていません。")
+                while not game.game_over:
+                    piece = game.current_piece
+                    placements = enumerate_placements(game.board, piece)
+                    self.assertTrue(placements, "配置が見つかりません。")
+                    piece['rotation'], piece['x'], piece['y'] = random.choice(placements)
+                    game.step('s')
+                if isinstance(game.board, BitBoard):
+                    self.assertEqual(game.board.features(), BitBoard(game.board.rows, width=width).features())
+
+    def test_tall_board_stores_only_occupied_rows(self):
+        """高いボードでもスタック部分の行だけを保持するかテストします。"""
+        board = BitBoard(width=12, height=5000)
+        piece = {'shape_name': 'O', 'shape': TETROMINOES['O'], 'rotation': 0, 'x': 0, 'y': 0}
+        placements = enumerate_placements(board, piece)
+        self.assertIn((0, 0, 4998), placements)
+        piece['y'] = 4998
+        fix_piece_to_board(board, piece)
+        self.assertEqual(board.stack_height, 2)
+        self.assertEqual(board.features().max_height, 2)
+        self.assertTrue(check_collision(board, piece))
+        self.assertFalse(check_collision(board, piece, new_y=4996))
+        self.assertEqual(board[4999][:3], (1, 1, 0))
+        self.assertEqual(board[0], (0,) * 12)
+
+    def test_tall_board_clear_lines(self):
+        """高いボードの clear_lines がボードの高さに比例して遅くならないかテストします。"""
+        def best_time(height):
+            board = BitBoard([0] * (height - 2) + [(1 << 10) - 1, 0b11], height=height)
+            clear_lines(board) # 満杯の行を消して残りを1行にする
+            self.assertEqual((board.stack_height, board[height - 1][:3]), (1, (1, 1, 0)))
+            times = []
+            for _ in range(5):
+                start = time.perf_counter()
+                clear_lines(board)
+                times.append(time.perf_counter() - start)
+            return min(times)
+        self.assertLess(best_time(1_000_000), best_time(20) * 20 + 0.001, "高さに比例して時間がかかっています。")
+
+    def test_wide_board_line_clear(self):
+        """64列を超えるボードでライン消去ができるかテストします。"""
+        width = 80
+        board = BitBoard([0, (1 << width) - 1 - 0b1111], width=width, height=2)
+        piece = {'shape_name': 'I', 'shape': TETROMINOES['I'], 'rotation': 0, 'x': 0, 'y': 1}
+        self.assertFalse(check_collision(board, piece))
+        rows = fix_piece_to_board(board, piece)
+        self.assertEqual(clear_rows(board, rows), [1])
+        self.assertEqual(board.stack_height, 0)
+        self.assertEqual(board, BitBoard(width=width, height=2))
+
+
+class TestSnapshotsAndUndo(unittest.TestCase):
+
+    def _play(self, game, rng, moves):
+        """なるべく低い配置を moves 回適用し、適用前の状態を記録します。"""
+        history = []
+        for _ in range(moves):
+            if game.game_over:
+                break
+            board = game.board
+            state = (board.snapshot() if isinstance(board, BitBoard) else [row[:] for row in board],
+                     game.score, game.lines, game.pieces, dict(game.current_piece))
+            history.append(state)
+            placements = enumerate_placements(board, game.current_piece)
+            game.apply(*max(placements, key=lambda p: (p[2], rng.random()))) # 低い位置を優先して消去を起こす
+        return history
+
+    def test_undo_restores_every_state(self):
+        """apply と undo で盤面・得点・ピースが完全に元に戻るかテストします。"""
+        rng = random.Random(9)
+        for board in (BitBoard(width=6, height=12), create_board(6, 12)):
+            game = Game(board)
+            history = self._play(game, rng, 60)
+            self.assertTrue(game.lines > 0, "テスト中にライン消去が発生していません。")
+            for board_state, score, lines, pieces, piece in reversed(history):
+                game.undo()
+                if isinstance(game.board, BitBoard):
+                    self.assertEqual(game.board.snapshot(), board_state, "盤面が元に戻っていません。")
+                    self.assertEqual(game.board.features(), BitBoard.from_snapshot(board_state).features())
+                else:
+                    self.assertEqual(game.board, board_state, "盤面が元に戻っていません。")
+                self.assertEqual((game.score, game.lines, game.pieces), (score, lines, pieces))
+                self.assertEqual(game.current_piece, piece, "ピースが元に戻っていません。")
+
+    def test_undo_keeps_piece_sequence(self):
+        """undo 後に同じ配置を適用すると同じピースが出現するかテストします。"""
+        random.seed(4)
+        game = Game()
+        game.apply(*enumerate_placements(game.board, game.current_piece)[0])
+        spawned = game.current_piece['shape_name']
+        game.undo()
+        game.apply(*enumerate_placements(game.board, game.current_piece)[-1])
+        self.assertEqual(game.current_piece['shape_name'], spawned)
+
+    def test_apply_after_game_over(self):
+        """ゲームオーバー後の apply が盤面・得点・ピースを変えないかテストします。"""
+        game = Game(seed=6)
+        while not game.game_over:
+            game.apply(*enumerate_placements(game.board, game.current_piece)[0])
+        state, undo_entries = game.state(), len(game._undo_log)
+        self.assertEqual(game.apply(0, 0, 0), 0)
+        self.assertEqual(game.state(), state, "ゲームオーバー後に状態が変わりました。")
+        self.assertEqual(len(game._undo_log), undo_entries)
+
+    def test_snapshot_hash_and_equality(self):
+        """スナップショットが不変・ハッシュ可能で、同じ盤面は同じハッシュになるかテストします。"""
+        rng = random.Random(17)
+        game = Game(BitBoard(width=8, height=16))
+        self._play(game, rng, 30)
+        board = game.board
+        snapshot = board.snapshot()
+        self.assertIsInstance(snapshot, BoardSnapshot)
+        rebuilt = BitBoard.from_snapshot(snapshot)
+        self.assertEqual(rebuilt.zobrist, board.zobrist, "差分更新したハッシュが再計算と一致しません。")
+        self.assertEqual(rebuilt.snapshot(), snapshot)
+        self.assertEqual(len({snapshot, rebuilt.snapshot()}), 1)
+        self.assertNotEqual(BitBoard(width=8, height=16).zobrist, board.zobrist)
+        with self.assertRaises(AttributeError):
+            snapshot.zobrist = 0
+
+
+class TestPiece(unittest.TestCase):
+
+    def test_piece_behaves_like_dict_piece(self):
+        """Piece が辞書型ピースと同じように読み書きできるかテストします。"""
+        for name in SHAPE_NAMES:
+            piece = Piece.spawn(name)
+            as_dict = {'shape_name': name, 'shape': TETROMINOES[name], 'rotation': 0,
+                       'x': BOARD_WIDTH // 2 - len(TETROMINOES[name][0][0]) // 2, 'y': 0}
+            for key in ('shape_name', 'rotation', 'x', 'y'):
+                self.assertIn(key, piece)
+                self.assertEqual(piece[key], as_dict[key], f"{key} の値が辞書型ピースと一致しません。")
+            self.assertEqual([list(map(list, shape)) for shape in piece['shape']], TETROMINOES[name])
+            self.assertEqual(get_piece_shape(piece), tuple(map(tuple, get_piece_shape(as_dict))))
+            piece['x'] += 1
+            self.assertEqual(piece.x, as_dict['x'] + 1)
+            self.assertEqual(Piece.from_dict(dict(piece)), piece)
+            self.assertEqual(Piece.from_dict(as_dict), as_dict, "new_tetrimino 形式の辞書と等しくなりません。")
+            self.assertNotEqual(piece, as_dict)
+            for key in ('copy', 'as_dict', '__class__', 'z'):
+                with self.assertRaises(KeyError, msg=f"{key!r} が辞書のキーとして読めてしまいます。"):
+                    piece[key]
+            with self.assertRaises(KeyError):
+                piece['shape'] = TETROMINOES[name]
+
+    def test_piece_and_dict_give_same_results(self):
+        """Piece と辞書型ピースで衝突判定・固定の結果が同じかテストします。"""
+        rng = random.Random(2)
+        for _ in range(200):
+            name = rng.choice(SHAPE_NAMES)
+            piece = Piece(name, rng.randrange(4), rng.randrange(-1, BOARD_WIDTH), rng.randrange(BOARD_HEIGHT))
+            as_dict = piece.as_dict()
+            for board in (create_board(), BitBoard()):
+                self.assertEqual(check_collision(board, piece), check_collision(board, as_dict))
+                if not check_collision(board, piece):
+                    self.assertEqual(list(fix_piece_to_board(board, piece)), list(fix_piece_to_board(create_board(), as_dict)))
+
+    def test_game_uses_piece(self):
+        """Game のピースが Piece になり、辞書を代入しても変換されるかテストします。"""
+        game = Game()
+        self.assertIsInstance(game.current_piece, Piece)
+        game.current_piece = {'shape_name': 'O', 'shape': TETROMINOES['O'], 'rotation': 0, 'x': 1, 'y': 2}
+        self.assertIsInstance(game.current_piece, Piece)
+        self.assertEqual((game.current_piece.x, game.current_piece.y), (1, 2))
+
+
+def _terminal_screen(text, screen=None):
+    """ANSI エスケープを解釈して {(行, 列): 文字} の画面を返す簡易端末です。"""
+    screen = {} if screen is None else screen
+    line = col = 1
+    for token in re.findall(r"\033\[(?:\d+;\d+)?[HJK]|\033\[2J|.|\n", text):
+        if token == "\n":
+            line, col = line + 1, 1
+        elif token.startswith("\033["):
+            if token == "\033[2J":
+                screen.clear()
+            elif token.endswith("K"):
+                for key in [k for k in screen if k[0] == line and k[1] >= col]:
+                    del screen[key]
+            else:
+                line, col = map(int, token[2:-1].split(";")) if ";" in token else (1, 1)
+        else:
+            screen[(line, col)] = token
+            if token == "・": # 全角文字は 2 列
+                screen[(line, col + 1)] = ""
+            col += 2 if token == "・" else 1
+    return screen
+
+
+class TestRenderer(unittest.TestCase):
+
+    def test_incremental_frames_match_full_redraw(self):
+        """差分描画の結果が毎回の全描画と同じ画面になるかテストします。"""
+        out = io.StringIO()
+        renderer = Renderer(out, max_fps=0)
+        screen = {}
+        game = Game()
+        rng = random.Random(4)
+        for i in range(150):
+            if game.game_over:
+                break
+            game.step(rng.choice("adws"))
+            status = f"Score: {game.score}"
+            out.seek(0)
+            out.truncate()
+            self.assertTrue(renderer.draw(game.board, game.current_piece, status))
+            _terminal_screen(out.getvalue(), screen)
+            full = io.StringIO()
+            Renderer(full).draw(game.board, game.current_piece, status)
+            expected = _terminal_screen(full.getvalue())
+            self.assertEqual({k: v for k, v in screen.items() if v}, {k: v for k, v in expected.items() if v},
+                             f"{i} フレーム目の画面が全描画と一致しません。")
+
+    def test_only_changed_cells_are_sent(self):
+        """ピースを 1 マス動かしたとき変化したセルだけが送られるかテストします。"""
+        out = io.StringIO()
+        renderer = Renderer(out, max_fps=0)
+        board = BitBoard()
+        piece = Piece('O', 0, 4, 5)
+        renderer.draw(board, piece, "Score: 0")
+        out.seek(0)
+        out.truncate()
+        piece.x += 1
+        renderer.draw(board, piece, "Score: 0")
+        frame = out.getvalue()
+        self.assertNotIn("\033[2J", frame, "差分描画で画面全体が消去されています。")
+        self.assertEqual(frame.count("□"), 2, "新しく埋まったセルだけが描かれるべきです。")
+        self.assertEqual(frame.count("・"), 2, "空いたセルだけが描かれるべきです。")
+        self.assertNotIn("Score", frame, "変化していないステータス行が再送されています。")
+
+    def test_frame_rate_cap(self):
+        """最大フレームレートを超える描画が間引かれるかテストします。"""
+        now = [0.0]
+        out = io.StringIO()
+        renderer = Renderer(out, max_fps=10, clock=lambda: now[0])
+        board = BitBoard()
+        self.assertTrue(renderer.draw(board))
+        now[0] = 0.05
+        self.assertFalse(renderer.draw(board), "間隔が短すぎる描画が行われました。")
+        self.assertTrue(renderer.draw(board, force=True), "force 指定の描画は常に行われるべきです。")
+        now[0] = 0.2
+        self.assertTrue(renderer.draw(board))
+        self.assertEqual((renderer.frames, renderer.skipped), (3, 1))
+
+
+class FakeClock:
+    """テスト用の時計です。read_keys として使うと timeout 分だけ時間を進めます。"""
+
+    def __init__(self, keys=None):
+        self.now = 0.0
+        self.keys = dict(keys or {}) # 時刻 -> キーのリスト
+
+    def __call__(self):
+        return self.now
+
+    def read_keys(self, timeout):
+        due = [t for t in self.keys if t <= self.now + timeout]
+        if due:
+            t = min(due)
+            self.now = max(self.now, t)
+            return self.keys.pop(t)
+        self.now += timeout
+        return []
+
+
+class TestRealtimeLoop(unittest.TestCase):
+
+    def test_fixed_timestep_catches_up_without_drift(self):
+        """遅れて呼ばれても累積誤差なく追いつくかテストします。"""
+        steps = FixedTimestep(0.1, 0.0)
+        self.assertEqual(steps.due(0.05), 0)
+        self.assertEqual(steps.due(0.35), 3, "遅れた分のステップが実行されていません。")
+        total = 3
+        now = 0.35
+        for _ in range(10000):
+            now += 0.0137
+            total += steps.due(now)
+        self.assertEqual(total, int(now / 0.1), "ステップ数がずれています。")
+        self.assertEqual(steps.due(now + 10), steps.max_catch_up, "追いつく上限を超えています。")
+        self.assertGreater(steps.dropped, 0)
+
+    def test_gravity_runs_without_input(self):
+        """入力がなくても一定間隔で重力が進むかテストします。"""
+        clock = FakeClock()
+        game = Game()
+        loop = RealtimeLoop(game, Renderer(io.StringIO(), max_fps=0), clock.read_keys, clock,
+                            gravity_interval=0.5)
+        y = game.current_piece.y
+        while clock.now < 2.0:
+            loop.run_once()
+        self.assertEqual(game.current_piece.y, y + 4, "重力のステップ数が正しくありません。")
+
+    def test_lock_delay_and_latency(self):
+        """着地したピースが遅延後に固定され、入力の遅延が記録されるかテストします。"""
+        board = BitBoard()
+        clock = FakeClock({0.1: ['a'], 0.2: ['d']})
+        game = Game(board)
+        game.current_piece = Piece('O', 0, 4, board.height - 2) # 床の上で静止
+        loop = RealtimeLoop(game, Renderer(io.StringIO(), max_fps=0), clock.read_keys, clock,
+                            gravity_interval=0.05, lock_delay=0.3)
+        while game.pieces == 0:
+            loop.run_once()
+        # 最後の移動 (0.2 秒) からロック遅延の 0.3 秒後に固定される
+        self.assertAlmostEqual(clock.now, 0.5)
+        self.assertEqual(board.rows[-1], 0b11 << (board.width - 6), "ピースが移動後の位置に固定されていません。")
+        self.assertEqual(len(loop.latencies), 2)
+        self.assertEqual(percentile(loop.latencies, 99), 0.0)
+
+    def test_quit_key(self):
+        """終了キーでループが終わるかテストします。"""
+        clock = FakeClock({1.0: ['q']})
+        loop = RealtimeLoop(Game(), Renderer(io.StringIO(), max_fps=0), clock.read_keys, clock)
+        loop.run()
+        self.assertTrue(loop.quit)
+        self.assertAlmostEqual(clock.now, 1.0)
+
+    def test_piped_input_ends_cleanly(self):
+        """パイプからの入力が尽きたら終了として扱い、トレースバックを出さないかテストします。"""
+        result = subprocess.run([sys.executable, 'tetris.py'], input='a\nd\n',
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn('Traceback', result.stderr)
+        self.assertIn("Quitting game.", result.stdout)
+
+
+class TestSimulate(unittest.TestCase):
+
+    def test_results_independent_of_workers(self):
+        """ワーカー数によらず同じシードで同じ結果になるかテストします。"""
+        def run(workers):
+            results = [r for chunk in simulate(12, workers, seed=5, max_pieces=60, chunk_size=5) for r in chunk]
+            return sorted(r[:4] for r in results)
+        single = run(1)
+        self.assertEqual(len(single), 12)
+        self.assertEqual(len({r[0] for r in single}), 12, "ゲームごとのシードが重複しています。")
+        self.assertEqual(run(2), single, "プロセスプールでの結果が一致しません。")
+
+    def test_summary(self):
+        """集計結果がゲームの結果と一致するかテストします。"""
+        results = [r for chunk in simulate(4, 1, seed=1, policy='random', max_pieces=30) for r in chunk]
+        summary = summarize(results, 2.0)
+        self.assertEqual(summary['games'], 4)
+        self.assertEqual(summary['games_per_second'], 2.0)
+        self.assertEqual(summary['score_max'], max(r.score for r in results))
+        self.assertLessEqual(summary['pieces_mean'], 30)
+
+    def test_resolve_policy(self):
+        """ポリシー名と module:function 形式の指定を解決できるかテストします。"""
+        self.assertIs(resolve_policy('tetris:random_policy'), random_policy)
+        self.assertIs(resolve_policy('random'), random_policy)
+        with self.assertRaises(ValueError):
+            resolve_policy('no-such-policy')
+
+    def test_cli_with_module_policy(self):
+        """tetris.py をスクリプトとして実行し module:function のポリシーで完走するかテストします。"""
+        result = subprocess.run(
+            [sys.executable, 'tetris.py', 'simulate', '--games', '2', '--workers', '1',
+             '--policy', 'tetris_bot:policy', '--max-pieces', '20'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertRegex(result.stdout, r"games: 2\n")
+        self.assertRegex(result.stdout, r"pieces_mean: 20\.00\n", "ポリシーが最後まで配置していません。")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+import random
+import unittest
+
+try:
+    import numpy as np
+except ImportError: # バッチ環境は NumPy が必要
+    np = None
+
+from tetris import BitBoard, Game, PIECE_TABLE, TETROMINOES
+
+if np is not None:
+    from tetris_batch import BatchGame, SHAPE_NAMES, NOOP, LEFT, RIGHT, ROTATE, DOWN
+
+ACTION_KEYS = {LEFT: 'a', RIGHT: 'd', ROTATE: 'w', DOWN: 's'} if np is not None else {}
+
+
+@unittest.skipIf(np is None, "NumPy がインストールされていません。")
+class TestBatchGame(unittest.TestCase):
+
+    def _mirror(self, batch, i):
+        """バッチ内のゲーム i と同じ状態の Game を作ります。"""
+        game = Game(BitBoard.from_rows(batch.boards[i].tolist()))
+        name = SHAPE_NAMES[batch.shape[i]]
+        game.current_piece = {
+            'shape_name': name, 'shape': TETROMINOES[name],
+            'rotation': int(batch.rotation[i]) % len(PIECE_TABLE[name]),
+            'x': int(batch.x[i]), 'y': int(batch.y[i]),
+        }
+        game.score = int(batch.score[i])
+        game.game_over = False
+        return game
+
+    def test_batch_matches_single_game(self):
+        """バッチ環境の各ゲームが Game と同じ結果になるかテストします。"""
+        batch = BatchGame(16, seed=3)
+        rng = random.Random(3)
+        for _ in range(400):
+            actions = np.array([rng.choice((NOOP, LEFT, RIGHT, ROTATE, DOWN, DOWN)) for _ in range(batch.n)])
+            for gravity in (False, True):
+                live = ~batch.game_over
+                mirrors = [self._mirror(batch, i) for i in range(batch.n)]
+                cleared = batch.tick() if gravity else batch.step(actions)
+                for i, game in enumerate(mirrors):
+                    if not live[i]:
+                        continue
+                    if gravity:
+                        expected = game.tick()
+                    else:
+                        expected = game.step(ACTION_KEYS.get(int(actions[i])))
+                    self.assertEqual(cleared[i], expected, "消去ライン数が一致しません。")
+                    self.assertEqual(game.board.to_rows(), batch.boards[i].astype(int).tolist(), "ボードが一致しません。")
+                    self.assertEqual(game.score, batch.score[i], "スコアが一致しません。")
+                    if game.pieces == 0: # 固定されていなければピース位置も一致するはず
+                        self.assertEqual((game.current_piece['x'], game.current_piece['y'], game.current_piece['rotation']),
+                                         (batch.x[i], batch.y[i], batch.rotation[i] % len(game.current_piece['shape'])),
+                                         "ピース位置が一致しません。")
+            batch.reset()
+
+    def test_line_clear_and_reset(self):
+        """バッチでのライン消去、スコア、リセットをテストします。"""
+        batch = BatchGame(2, seed=0)
+        batch.boards[:, -1, 4:] = True
+        batch.shape[:] = SHAPE_NAMES.index('I')
+        batch.rotation[:] = 0
+        batch.x[:] = 0
+        batch.y[:] = batch.boards.shape[1] - 1
+        cleared = batch.step(np.array([DOWN, NOOP]))
+        self.assertEqual(cleared.tolist(), [1, 0])
+        self.assertEqual(batch.score.tolist(), [100, 0])
+        self.assertFalse(batch.boards[0].any(), "消去後のボードが空になっていません。")
+        batch.game_over[1] = True
+        batch.reset()
+        self.assertFalse(batch.boards[1].any())
+        self.assertEqual(batch.score[0], 100, "リセット対象外のゲームが変更されています。")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from tetris import Game, enumerate_placements, simulate
+from tetris_bot import Bot
+
+
+class TestBot(unittest.TestCase):
+
+    def test_bot_clears_lines(self):
+        """ボットがゲームオーバーにならずにラインを消せるかテストします。"""
+        game = Game(seed=1)
+        bot = Bot(depth=2)
+        for _ in range(100):
+            placement = bot.choose(game)
+            self.assertIn(placement, enumerate_placements(game.board, game.current_piece))
+            game.apply(*placement)
+        self.assertFalse(game.game_over, "ボットが 100 ピース以内にゲームオーバーになりました。")
+        self.assertGreaterEqual(game.lines, 30)
+
+    def test_search_leaves_game_unchanged(self):
+        """探索後にボードとゲームの状態が元のままかテストします。"""
+        game = Game(seed=2)
+        bot = Bot(depth=3)
+        for _ in range(20):
+            game.preview(bot.preview) # 先読みでキューが埋まるのは想定どおり
+            state = game.state()
+            zobrist = game.board.zobrist
+            features = game.board.features()
+            placement = bot.choose(game)
+            self.assertEqual(game.state(), state, "探索でゲームの状態が変わりました。")
+            self.assertEqual((game.board.zobrist, game.board.features()), (zobrist, features))
+            game.apply(*placement)
+        self.assertGreater(bot.cache_hits, 0, "置換表が使われていません。")
+
+    def test_time_budget(self):
+        """時間制限が短いと反復深化が途中で打ち切られるかテストします。"""
+        game = Game(seed=3)
+        bot = Bot(depth=4, time_budget=0.0)
+        placement = bot.choose(game)
+        self.assertIn(placement, enumerate_placements(game.board, game.current_piece))
+        self.assertLess(bot.completed_depths[-1], 4)
+
+    def test_bot_as_simulate_policy(self):
+        """simulate のポリシーとして使えるかテストします。"""
+        results = [r for chunk in simulate(2, 1, seed=0, policy='tetris_bot:policy', max_pieces=40) for r in chunk]
+        self.assertEqual([r.pieces for r in results], [40, 40])
+
+
+if __name__ == '__main__':
+    unittest.main()
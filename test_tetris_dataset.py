@@ -0,0 +1,91 @@
+import os
+import random
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError: # データセットは NumPy が必要
+    np = None
+
+from tetris import BitBoard, Game, SHAPE_NAMES, game_seed, lowest_policy
+
+if np is not None:
+    import tetris_dataset
+    from tetris_dataset import Dataset, DatasetWriter, export_games, pack_board, unpack_boards
+
+
+@unittest.skipIf(np is None, "NumPy がインストールされていません。")
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, 'data')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_pack_board_round_trip(self):
+        """ビットパックしたボードが元に戻るかテストします。"""
+        rng = random.Random(0)
+        for width, height in ((10, 20), (7, 9), (64, 8)):
+            rows = [rng.getrandbits(width) for _ in range(height)]
+            board = BitBoard(rows, width=width)
+            packed = np.frombuffer(pack_board(board), np.uint8)[None]
+            self.assertEqual(unpack_boards(packed, width, height)[0].tolist(), board.to_rows())
+
+    def test_export_records_games(self):
+        """エクスポートしたレコードが実際のゲームの盤面と操作に一致するかテストします。"""
+        count = export_games(self.path, 3, policy='lowest', seed=2, max_pieces=40)
+        dataset = Dataset(self.path)
+        self.assertEqual((len(dataset), dataset.games), (count, 3))
+        for i in range(3):
+            game = Game(seed=game_seed(2, i))
+            rng = random.Random(game.seed)
+            records = dataset.game(i)
+            for record in records:
+                board = unpack_boards(record['board'][None], dataset.width, dataset.height)[0]
+                self.assertEqual(board.tolist(), game.board.to_rows(), "記録された盤面が一致しません。")
+                self.assertEqual(SHAPE_NAMES[record['shape']], game.current_piece.shape_name)
+                placement = lowest_policy(game, rng)
+                self.assertEqual((record['rotation'], record['x'], record['y']), placement)
+                score = game.score
+                game.apply(*placement)
+                self.assertEqual(record['reward'], game.score - score)
+            self.assertEqual(len(records), game.pieces)
+
+    def test_grow_and_append(self):
+        """ファイルの拡張と追記後もレコードと索引が正しいかテストします。"""
+        grow, staging = tetris_dataset.GROW_RECORDS, tetris_dataset.STAGING_RECORDS
+        tetris_dataset.GROW_RECORDS, tetris_dataset.STAGING_RECORDS = 100, 32
+        try:
+            board = BitBoard()
+            with DatasetWriter(self.path) as writer:
+                for i in range(250):
+                    writer.add(board, 'T', i % 4, i % 8, i, i)
+                    if i % 50 == 49:
+                        writer.end_game()
+            with DatasetWriter(self.path, append=True) as writer:
+                for i in range(250, 300):
+                    writer.add(board, 'I', 0, 0, i, i)
+                writer.end_game()
+        finally:
+            tetris_dataset.GROW_RECORDS, tetris_dataset.STAGING_RECORDS = grow, staging
+        dataset = Dataset(self.path)
+        self.assertEqual(len(dataset), 300)
+        self.assertEqual(dataset.game_starts.tolist(), [0, 50, 100, 150, 200, 250])
+        self.assertEqual(dataset.records['y'].tolist(), list(range(300)))
+        self.assertEqual(os.path.getsize(self.path + '.bin'), 300 * dataset.dtype.itemsize)
+
+    def test_sample(self):
+        """ミニバッチが正しい形と値で取り出せるかテストします。"""
+        export_games(self.path, 2, seed=0, max_pieces=30)
+        dataset = Dataset(self.path)
+        batch = dataset.sample(16, np.random.default_rng(0))
+        self.assertEqual(batch['board'].shape, (16, dataset.height, dataset.width))
+        self.assertEqual(len(batch['reward']), 16)
+        self.assertTrue((batch['shape'] < len(SHAPE_NAMES)).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
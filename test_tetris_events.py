@@ -0,0 +1,154 @@
+import os
+import random
+import tempfile
+import threading
+import unittest
+
+from tetris import Game, GameEvent, BitBoard, enumerate_placements, EVENT_FIELDS
+from tetris_events import EventLog, drain, read_events
+
+
+def _play(game, rng, pieces=40):
+    """ランダムな操作・配置・重力でゲームを進めます。"""
+    while not game.game_over and game.pieces < pieces:
+        if rng.random() < 0.2:
+            game.apply(*rng.choice(enumerate_placements(game.board, game.current_piece)))
+        else:
+            game.step(rng.choice('adwsx'))
+        game.tick(rng.choice((0, 1)))
+    return game
+
+
+class TestGameEvents(unittest.TestCase):
+
+    def test_events_follow_actions(self):
+        """移動・回転・固定・ライン消去・得点のイベントが操作どおりに届くかテストします。"""
+        rows = [[0] * 10 for _ in range(20)]
+        rows[19] = [1] * 9 + [0]
+        game = Game(board=BitBoard.from_rows(rows), seed=5)
+        events = game.event_queue()
+        game.current_piece = {'shape_name': 'I', 'rotation': 1, 'x': 9, 'y': 0}
+        game.step('a')
+        self.assertEqual(events.popleft(), GameEvent('move', 0, (8, 0)))
+        game.step('d')
+        events.clear()
+        game.tick()
+        self.assertEqual(events.popleft(), GameEvent('move', 1, (9, 1)))
+        rotation = game.current_piece.rotation
+        game.apply(rotation, 9, 16)
+        kinds = [event.kind for event in drain(events)]
+        self.assertEqual(kinds, ['lock', 'lines', 'score', 'spawn'])
+        self.assertFalse(events)
+
+    def test_line_rows_and_score(self):
+        """ライン消去イベントが消去行を持ち、得点イベントがスコアと一致するかテストします。"""
+        rows = [[0] * 10 for _ in range(20)]
+        rows[19] = [1] * 9 + [0]
+        game = Game(board=BitBoard.from_rows(rows), seed=5)
+        log = []
+        game.subscribe(log.append)
+        game.current_piece = {'shape_name': 'I', 'rotation': 1, 'x': 9, 'y': 0}
+        game.apply(1, 9, 16)
+        by_kind = {event.kind: event for event in log}
+        self.assertEqual(by_kind['lock'].data, ('I', 1, 9, 16))
+        self.assertEqual(by_kind['lines'].data, ((19,),))
+        self.assertEqual(by_kind['score'].data, (game.score, game.score))
+        self.assertEqual(by_kind['spawn'].data[0], game.current_piece.shape_name)
+
+    def test_event_fields_and_game_over(self):
+        """全イベントのデータがフィールド定義どおりで、最後がゲームオーバーかテストします。"""
+        log = []
+        game = Game(seed=11, listeners=[log.append])
+        _play(game, random.Random(3), pieces=10 ** 6)
+        self.assertEqual(log[0].kind, 'spawn', "最初のピースが通知されていません。")
+        for event in log:
+            self.assertEqual(len(event.data), len(EVENT_FIELDS[event.kind]))
+        self.assertEqual(log[-1], GameEvent('game_over', game.ticks, (game.score,)))
+        self.assertEqual(sum(event.kind == 'lock' for event in log), game.pieces)
+        lines = sum(len(event.data[0]) for event in log if event.kind == 'lines')
+        self.assertEqual(lines, game.lines)
+
+    def test_listeners_do_not_change_game(self):
+        """リスナーの有無でゲームの進行が変わらず、解除後は通知されないかテストします。"""
+        log = []
+        plain = _play(Game(seed=9), random.Random(4))
+        watched = Game(seed=9)
+        listener = watched.subscribe(log.append)
+        _play(watched, random.Random(4))
+        self.assertEqual(plain.state(), watched.state())
+        watched.unsubscribe(listener)
+        count = len(log)
+        watched.step('s')
+        self.assertEqual(len(log), count)
+
+
+class TestEventLog(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _round_trip(self, format):
+        path = os.path.join(self.dir.name, 'events.' + format)
+        recorded = []
+        with EventLog(path, format=format, session='s1') as log:
+            game = Game(seed=21, listeners=[recorded.append, log])
+            _play(game, random.Random(8))
+        self.assertEqual(log.written, len(recorded))
+        self.assertEqual(log.dropped, 0)
+        self.assertEqual(list(read_events(path)), recorded)
+        return path
+
+    def test_ndjson_round_trip(self):
+        """NDJSON ログを読み戻すと同じイベント列になるかテストします。"""
+        path = self._round_trip('ndjson')
+        with open(path) as f:
+            self.assertIn('"session":"s1"', f.readline())
+
+    def test_binary_round_trip(self):
+        """バイナリログを読み戻すと同じイベント列になり、NDJSON より小さいかテストします。"""
+        binary = self._round_trip('binary')
+        ndjson = self._round_trip('ndjson')
+        self.assertLess(os.path.getsize(binary) * 4, os.path.getsize(ndjson))
+
+    def test_append_to_existing_log(self):
+        """既存のバイナリログに追記しても読めるかテストします。"""
+        path = os.path.join(self.dir.name, 'events.bin')
+        for seed in (1, 2):
+            with EventLog(path, format='binary') as log:
+                _play(Game(seed=seed, listeners=[log]), random.Random(seed), pieces=5)
+        kinds = [event.kind for event in read_events(path)]
+        self.assertEqual(kinds.count('spawn'), kinds.count('lock') + 2)
+
+    def test_writes_happen_off_the_caller_thread(self):
+        """書き込みがバックグラウンドスレッドで行われ、呼び出し側が待たされないかテストします。"""
+        path = os.path.join(self.dir.name, 'events.ndjson')
+        log = EventLog(path, flush_interval=60)
+        writers = []
+        original = log._write_pending
+        log._write_pending = lambda: (writers.append(threading.current_thread()), original())[1]
+        game = Game(seed=3, listeners=[log])
+        game.step('a')
+        self.assertEqual(log.written, 0, "イベントが即座に書き込まれています。")
+        log.close()
+        self.assertGreater(log.written, 0)
+        self.assertNotIn(threading.current_thread(), writers)
+
+    def test_drops_beyond_max_pending(self):
+        """未書き込みイベントが上限を超えたら破棄して数えるかテストします。"""
+        path = os.path.join(self.dir.name, 'events.ndjson')
+        log = EventLog(path, flush_interval=60, max_pending=3)
+        for i in range(5):
+            log(GameEvent('score', i, (i, 1)))
+        log.close()
+        self.assertEqual((log.written, log.dropped), (3, 2))
+        self.assertEqual([event.ticks for event in read_events(path)], [0, 1, 2])
+
+    def test_rejects_unknown_format(self):
+        """未知の形式でエラーになるかテストします。"""
+        with self.assertRaises(ValueError):
+            EventLog(os.path.join(self.dir.name, 'x'), format='xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
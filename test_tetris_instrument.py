@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+import tetris
+from tetris import Game, RealtimeLoop, Renderer, percentile
+from tetris_instrument import Histogram, Instrumentation, NULL_INSTRUMENT
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_histogram_percentiles(self):
+        """ヒストグラムの百分位が正確な値から 1 バケット以内かテストします。"""
+        rng = random.Random(0)
+        values = [rng.lognormvariate(-7, 1.5) for _ in range(5000)]
+        histogram = Histogram()
+        for value in values:
+            histogram.add(value)
+        for p in (50, 90, 99):
+            exact = percentile(values, p)
+            self.assertLessEqual(abs(histogram.percentile(p) - exact) / exact, 0.1, f"p{p} の誤差が大きすぎます。")
+        self.assertEqual(histogram.count, 5000)
+        self.assertEqual(histogram.max, max(values))
+
+    def test_wrap_counts_calls(self):
+        """ラップした関数の呼び出し回数が数えられ、unwrap で元に戻るかテストします。"""
+        original, original_method = tetris.check_collision, tetris.BitBoard.collides
+        instrument = Instrumentation()
+        instrument.wrap(tetris)
+        try:
+            game = Game(tetris.create_board(), seed=1)
+            bit_game = Game(seed=1)
+            for _ in range(10):
+                game.step('a')
+                bit_game.step('s')
+        finally:
+            instrument.unwrap()
+        self.assertIs(tetris.check_collision, original, "unwrap で元の関数に戻っていません。")
+        self.assertIs(tetris.BitBoard.collides, original_method, "unwrap で元のメソッドに戻っていません。")
+        self.assertEqual(instrument.functions['check_collision'][0], 10 + 1) # 出現時の判定 1 回を含む
+        self.assertGreater(instrument.functions['check_collision'][1], 0)
+        self.assertEqual(instrument.functions['BitBoard.collides'][0], 10 + 1, "メソッドの呼び出しが数えられていません。")
+
+    def test_loop_phases_and_export(self):
+        """ゲームループのフェーズごとの時間と入力遅延が記録され、JSON に書き出されるかテストします。"""
+        keys = [['a'], [], ['d'], ['q']]
+        now = [0.0]
+
+        def read_keys(timeout):
+            now[0] += 0.01
+            return keys.pop(0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stats.json')
+            instrument = Instrumentation(path, export_interval=0.0)
+            loop = RealtimeLoop(Game(seed=2), Renderer(io.StringIO(), max_fps=0), read_keys,
+                                lambda: now[0], instrument=instrument)
+            loop.run()
+            with open(path) as f:
+                snapshot = json.load(f)
+        self.assertEqual(snapshot['frames'], 4, "終了キーのフレームが数えられていません。")
+        self.assertEqual(snapshot['histograms']['frame']['count'], 4)
+        for phase in ('input', 'simulation', 'render', 'frame', 'input_to_draw'):
+            self.assertIn(phase, snapshot['histograms'])
+        self.assertEqual(snapshot['histograms']['input_to_draw']['count'], 2)
+
+    def test_null_instrument_is_default(self):
+        """計測を指定しないときは何もしない計測オブジェクトが使われるかテストします。"""
+        loop = RealtimeLoop(Game(), Renderer(io.StringIO()), lambda timeout: [])
+        self.assertIs(loop.instrument, NULL_INSTRUMENT)
+        self.assertFalse(loop.instrument.enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
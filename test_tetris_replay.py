@@ -0,0 +1,95 @@
+import random
+import unittest
+
+from tetris import Game, create_board, enumerate_placements
+from tetris_replay import Replay, ReplayError, ReplayRecorder
+
+
+def _record(seed, rng, states=None):
+    """ランダムな操作と重力でゲームを記録し、(バイト列, 最終ゲーム) を返します。"""
+    recorder = ReplayRecorder(Game(seed=seed))
+    game = recorder.game
+    while not game.game_over and game.pieces < 60:
+        if rng.random() < 0.3:
+            placements = enumerate_placements(game.board, game.current_piece)
+            if placements:
+                recorder.apply(*rng.choice(placements))
+        else:
+            recorder.step(rng.choice('adwsx'))
+        if states is not None:
+            states[game.ticks] = game.state()
+        recorder.tick(rng.choice((0, 0, 1, 2)))
+    recorder.tick(3)
+    if states is not None:
+        states[game.ticks] = game.state()
+    return recorder.to_bytes(), game
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_seeded_games_repeat(self):
+        """同じシードのゲームが同じピース列になるかテストします。"""
+        first, second = Game(seed=42), Game(seed=42)
+        self.assertEqual(first.preview(50), second.preview(50))
+        self.assertNotEqual(Game(seed=43).preview(50), first.preview(50))
+        random.seed(1)
+        unseeded = Game()
+        self.assertEqual(Game(seed=unseeded.seed).preview(20), unseeded.preview(20), "シードが保存されていません。")
+
+    def test_replay_reproduces_game(self):
+        """再生したゲームの最終状態が記録時と一致するかテストします。"""
+        for seed in range(5):
+            data, game = _record(seed, random.Random(seed))
+            replayed = Replay(data).run()
+            self.assertEqual(replayed.state(), game.state(), "再生結果が記録と一致しません。")
+            self.assertEqual((game._undo_log, replayed._undo_log), ([], []), "使われない取り消し記録が溜まっています。")
+            self.assertLess(len(data), 12 * max(1, game.pieces), "リプレイが大きすぎます。")
+
+    def test_seek_matches_recorded_states(self):
+        """任意の tick へのシークが記録時の状態と一致するかテストします。"""
+        states = {}
+        data, game = _record(7, random.Random(7), states)
+        replay = Replay(data, keyframe_interval=8)
+        ticks = sorted(states)
+        for tick in ticks[::5] + [ticks[-1]]:
+            # states[tick] はその tick で行われた最後の操作の後の状態
+            self.assertEqual(replay.seek(tick).state(), states[tick], f"tick {tick} の状態が一致しません。")
+
+    def test_invalid_data(self):
+        """不正なデータでエラーになるかテストします。"""
+        with self.assertRaises(ReplayError):
+            Replay(b'nope')
+        data, _ = _record(1, random.Random(1))
+        with self.assertRaises(ReplayError):
+            Replay(data[:4] + b'\x09' + data[5:])
+
+    def test_list_board_game(self):
+        """リストボードのゲームも記録・状態の保存・復元ができ、ボードの種類が保たれるかテストします。"""
+        recorder = ReplayRecorder(Game(create_board(), seed=5))
+        game = recorder.game
+        rng = random.Random(5)
+        while not game.game_over and game.pieces < 30:
+            recorder.apply(*rng.choice(enumerate_placements(game.board, game.current_piece)))
+            recorder.tick()
+        state = game.state()
+        self.assertEqual(Replay(recorder.to_bytes()).run().state(), state, "再生結果が記録と一致しません。")
+        board = [row[:] for row in game.board]
+        game.restore(Game(seed=5).state())
+        game.restore(state)
+        self.assertIsInstance(game.board, list, "復元でボードの種類が変わりました。")
+        self.assertEqual((game.board, game.state()), (board, state))
+        filled = create_board()
+        filled[-1][0] = 1
+        with self.assertRaises(ValueError):
+            ReplayRecorder(Game(filled, seed=5))
+
+    def test_recorder_needs_fresh_game(self):
+        """途中から記録を始めようとするとエラーになるかテストします。"""
+        game = Game(seed=3)
+        game.tick(2)
+        with self.assertRaises(ValueError):
+            ReplayRecorder(game)
+
+
+if __name__ == '__main__':
+    unittest.main()
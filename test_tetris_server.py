@@ -0,0 +1,140 @@
+import asyncio
+import json
+import random
+import unittest
+
+from tetris_server import MAX_PENDING_ACTIONS, Server, Session, apply_update
+
+
+class FakeTransport:
+    """書き込まれたデータを保持するだけのトランスポートです。"""
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def set_write_buffer_limits(self, high=None):
+        pass
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        self.closed = True
+
+    def messages(self):
+        lines, self.data = self.data.split(b'\n')[:-1], b''
+        return [json.loads(line) for line in lines]
+
+
+class TestSession(unittest.TestCase):
+
+    def _session(self):
+        server = Server(gravity_ticks=2)
+        session = Session(server)
+        session.connection_made(FakeTransport())
+        return server, session
+
+    def test_deltas_rebuild_board(self):
+        """差分更新を順に適用するとサーバー側のボードと一致するかテストします。"""
+        server, session = self._session()
+        rng = random.Random(5)
+        rows = []
+        for _ in range(600):
+            session.data_received(json.dumps({'actions': ''.join(rng.choice('adwss') for _ in range(3))}).encode() + b'\n')
+            server.tick()
+            for message in session.transport.messages():
+                rows = apply_update(rows, message)
+                if 'piece' in message:
+                    piece = message['piece']
+            p = session.game.current_piece
+            self.assertEqual(rows, session.game.board.rows, "差分から復元したボードが一致しません。")
+            self.assertEqual(piece, [p.shape_name, p.rotation, p.x, p.y], "ピースの状態が一致しません。")
+
+    def test_unchanged_tick_sends_nothing(self):
+        """変化のない tick では何も送られないかテストします。"""
+        server, session = self._session()
+        server.tick() # 重力なし: 最初の全体更新だけ
+        self.assertEqual(len(session.transport.messages()), 1)
+        server.ticks = 2 # 次の tick (3) も重力なし
+        server.tick()
+        self.assertEqual(session.transport.messages(), [])
+
+    def test_paused_session_catches_up(self):
+        """送信が一時停止されたセッションが再開後の 1 回の更新で追いつくかテストします。"""
+        server, session = self._session()
+        server.tick()
+        rows = apply_update([], session.transport.messages()[0])
+        session.pause_writing()
+        for _ in range(40):
+            session.pending.extend('s')
+            server.tick()
+        self.assertEqual(session.transport.data, b'', "一時停止中に送信されています。")
+        self.assertEqual(server.skipped_updates, 40)
+        session.resume_writing()
+        server.tick()
+        messages = session.transport.messages()
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(apply_update(rows, messages[0]), session.game.board.rows)
+
+    def test_pending_actions_are_bounded(self):
+        """適用より速く送られた操作が上限までしか溜まらず、超過分が数えられるかテストします。"""
+        server, session = self._session()
+        line = json.dumps({'actions': 'a' * 100}).encode() + b'\n'
+        for _ in range(10):
+            session.data_received(line)
+        self.assertEqual(len(session.pending), MAX_PENDING_ACTIONS)
+        self.assertEqual(server.stats()['dropped_actions'], 1000 - MAX_PENDING_ACTIONS)
+        server.tick()
+        session.data_received(line)
+        self.assertEqual(len(session.pending), MAX_PENDING_ACTIONS, "消化された分の空きが使われていません。")
+
+    def test_game_over_restarts(self):
+        """ゲームオーバー後に最終スコアが通知され、新しいゲームが始まるかテストします。"""
+        server, session = self._session()
+        server.tick()
+        session.transport.messages()
+        session.game.score = 7
+        session.game.game_over = True
+        server.tick()
+        message, = session.transport.messages()
+        self.assertEqual(message['over'], [7])
+        self.assertIn('size', message, "新しいゲームの全体更新が送られていません。")
+        self.assertFalse(session.game.game_over)
+
+
+class TestServer(unittest.TestCase):
+
+    def test_sessions_over_tcp(self):
+        """TCP 経由で複数のセッションが更新と統計を受け取れるかテストします。"""
+        async def run():
+            server = Server(tick_rate=200, gravity_ticks=4)
+            listener = await server.serve('127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            clients = [await asyncio.open_connection('127.0.0.1', port) for _ in range(5)]
+            for reader, writer in clients:
+                writer.write(b'{"actions":"ws"}\n')
+            updates = []
+            for reader, writer in clients:
+                updates.append([json.loads(await reader.readline()) for _ in range(3)])
+            reader, writer = clients[0]
+            writer.write(b'{"stats":true}\n')
+            while True:
+                message = json.loads(await reader.readline())
+                if 'stats' in message:
+                    break
+            for reader, writer in clients:
+                writer.close()
+            await server.close(listener)
+            return updates, message['stats']
+
+        updates, stats = asyncio.run(run())
+        for messages in updates:
+            self.assertIn('size', messages[0])
+            self.assertEqual([m['t'] for m in messages], sorted(m['t'] for m in messages))
+        self.assertEqual(stats['sessions'], 5)
+        self.assertGreater(stats['ticks'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+
+from tetris import BitBoard, Game, Piece, enumerate_placements
+from tetris_solver import PerfectClearSolver, perfect_clear, finesse, solution_finesse
+
+
+def _board(*lines):
+    """床に揃えた '#'/'.' の行から 10x20 の BitBoard を作ります。"""
+    rows = [[0] * 10 for _ in range(20 - len(lines))]
+    rows += [[1 if cell == '#' else 0 for cell in line] for line in lines]
+    return BitBoard.from_rows(rows)
+
+
+def _game(board, queue):
+    """board の上で queue の順にピースが出るゲームを作ります。"""
+    game = Game(board=board, seed=0)
+    game.current_piece = Piece.spawn(queue[0], game.width)
+    game.next_queue.clear()
+    game.next_queue.extend(queue[1:])
+    return game
+
+
+class TestPerfectClear(unittest.TestCase):
+
+    def test_solutions_clear_the_board(self):
+        """解の配置を順に置くとボードが空になり、各配置が到達可能かテストします。"""
+        for queue in ('IOJSZLTJLT', 'IZLTOJSTOJ'):
+            placements = perfect_clear(BitBoard(), queue)
+            self.assertIsNotNone(placements, f"{queue} の解が見つかりません。")
+            game = _game(BitBoard(), queue)
+            for placement in placements:
+                self.assertIn(placement, enumerate_placements(game.board, game.current_piece))
+                game.apply(*placement)
+            self.assertEqual(game.board.stack_height, 0, "パーフェクトクリアになっていません。")
+            self.assertEqual(game.lines * 10, len(placements) * 4)
+
+    def test_partial_boards(self):
+        """途中のボードから最短の配置で消せるかテストします。"""
+        self.assertEqual(perfect_clear(_board('####..####', '####..####'), 'OO'), [(0, 4, 18)])
+        well = _board(*['#########.'] * 4)
+        self.assertEqual(perfect_clear(well, 'I'), [(1, 9, 16)])
+        self.assertIsNone(perfect_clear(well, 'O'))
+        board = well.to_rows()
+        perfect_clear(board, 'I')
+        self.assertEqual(board, well.to_rows(), "ソルバーがボードを変更しました。")
+
+    def test_parity_limits_heights(self):
+        """セル数のパリティとピース数で箱の高さが絞られるかテストします。"""
+        solver = PerfectClearSolver()
+        self.assertEqual(solver.heights(BitBoard(), 10), [2, 4])
+        self.assertEqual(solver.heights(BitBoard(), 9), [2])
+        self.assertEqual(solver.heights(_board('##........'), 10), [1, 3])
+        self.assertIsNone(solver.solve(BitBoard(), 'OOOO'))
+        self.assertEqual(solver.nodes, 0, "パリティで除外できる高さを探索しました。")
+
+    def test_unsolvable_queue(self):
+        """解のないキューで None を返し、時間切れとは区別されるかテストします。"""
+        solver = PerfectClearSolver()
+        self.assertIsNone(solver.solve(BitBoard(), 'SSSSSSSSSS'))
+        self.assertFalse(solver.timed_out)
+        hole = _board('####..####', '####..####')
+        self.assertIsNone(solver.solve(hole, 'IO'), "キューの順序を無視しました。")
+        self.assertIsNone(solver.solve(hole, 'OO', max_pieces=0))
+
+    def test_time_budget(self):
+        """時間予算を使い切ると探索を打ち切るかテストします。"""
+        solver = PerfectClearSolver(time_budget=0)
+        self.assertIsNone(solver.solve(BitBoard(), 'JITLSOZLIZ'))
+        self.assertTrue(solver.timed_out)
+
+
+class TestFinesse(unittest.TestCase):
+
+    def test_minimal_presses(self):
+        """出現位置から最少のキー入力で移動し、重力で落とす経路になるかテストします。"""
+        self.assertEqual(finesse(BitBoard(), 'O', 0, 0, 18), ['a'] * 4 + ['s'] * 19)
+        self.assertEqual(finesse(BitBoard(), 'I', 1, 9, 16).count('s'), 17)
+        self.assertIsNone(finesse(BitBoard(), 'O', 0, 0, 10), "接地していない配置を返しました。")
+
+    def test_tuck_under_overhang(self):
+        """張り出しの下へ滑り込ませる経路を見つけ、届かない配置は None になるかテストします。"""
+        board = _board('###.......', '..........')
+        self.assertEqual(finesse(board, 'I', 0, 0, 19), ['s'] * 19 + ['a'] * 3 + ['s'])
+        closed = _board('####......', '..........')
+        self.assertIsNone(finesse(closed, 'O', 0, 0, 18))
+
+    def test_paths_replay_in_game(self):
+        """経路を Game.step で再生すると解と同じ配置で固定されるかテストします。"""
+        queue = 'IOJSZLTJLT'
+        placements = perfect_clear(BitBoard(), queue)
+        stepped, applied = _game(BitBoard(), queue), _game(BitBoard(), queue)
+        for placement, actions in zip(placements, solution_finesse(BitBoard(), queue, placements)):
+            for action in actions:
+                stepped.step(action)
+            applied.apply(*placement)
+            self.assertEqual(stepped.board, applied.board)
+            self.assertEqual(stepped.pieces, applied.pieces)
+        self.assertEqual(stepped.board.stack_height, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import json
+import os
+import tempfile
+import unittest
+
+from tetris_tuner import Tuner
+
+
+class TestTuner(unittest.TestCase):
+
+    def _tuner(self, **options):
+        return Tuner(population=6, games=2, max_pieces=30, seed=4, **options)
+
+    def test_resume_matches_uninterrupted_run(self):
+        """チェックポイントから再開した結果が中断なしの実行と一致するかテストします。"""
+        expected = self._tuner()
+        expected.run(3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'tuner.json')
+            self._tuner(checkpoint=path).run(2)
+            with open(path) as f:
+                self.assertEqual(json.load(f)['generation'], 2)
+            resumed = self._tuner(checkpoint=path)
+            self.assertEqual(resumed.generation, 2, "チェックポイントから再開されていません。")
+            resumed.run(3)
+        self.assertEqual(resumed.history, expected.history, "再開後の結果が一致しません。")
+        self.assertEqual(resumed.population, expected.population)
+
+    def test_pool_matches_single_process(self):
+        """プロセスプールと共有メモリで集計した結果が単一プロセスと一致するかテストします。"""
+        single = self._tuner()
+        single.run(2)
+        pooled = self._tuner(workers=2)
+        pooled.run(2)
+        self.assertEqual(pooled.history, single.history)
+        self.assertGreater(single.best[0], 0, "最良の候補がラインを消していません。")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,17 @@
+import os
 import random
+import select
+import sys
+import time
+from collections import deque, namedtuple
+
+try:
+    import termios
+    import tty
+except ImportError: # Not available on Windows; main() falls back to line input
+    termios = tty = None
+
+from tetris_instrument import NULL_INSTRUMENT
 
 # Game board dimensions
 BOARD_WIDTH = 10
@@ -42,19 +55,570 @@ TETROMINOES = {
 }
 
 # Game board initialization
-def create_board():
+def create_board(width=BOARD_WIDTH, height=BOARD_HEIGHT):
     """Creates an empty game board."""
-    return [[0 for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+    return [[0 for _ in range(width)] for _ in range(height)]
+
+# Precompiled piece geometry, built once at import.
+# masks: row bitmasks at x=0; cells: (row, col) offsets of solid cells;
+# bottom: lowest solid row offset per shape column; kicks: (rotation, dx)
+# candidates tried in order by the rotate action (no kick, left, right).
+PieceGeometry = namedtuple('PieceGeometry', 'masks cells width height bottom kicks')
+
+def _build_piece_table():
+    table = {}
+    for name, rotations in TETROMINOES.items():
+        entries = []
+        for rotation, shape in enumerate(rotations):
+            cells = tuple((r, c) for r, row in enumerate(shape) for c, cell in enumerate(row) if cell)
+            width, height = len(shape[0]), len(shape)
+            next_rotation = (rotation + 1) % len(rotations)
+            entries.append(PieceGeometry(
+                masks=tuple(sum(1 << c for c, cell in enumerate(row) if cell) for row in shape),
+                cells=cells,
+                width=width,
+                height=height,
+                bottom=tuple(max(r for r, c in cells if c == col) for col in range(width)),
+                kicks=((next_rotation, 0), (next_rotation, -1), (next_rotation, 1)),
+            ))
+        table[name] = tuple(entries)
+    return table
+
+PIECE_TABLE = _build_piece_table()
+
+_mask_tables = {}
+
+def piece_mask_tables(width):
+    """
+    Returns (masks, kicks, masks_by_x) lookup tables for boards of the given
+    width, built on first use. masks maps (shape_name, rotation, x) to row
+    masks shifted to column x, for every x that fits; kicks maps the same key
+    to the ((new_rotation, new_x, masks), ...) kick candidates that stay inside
+    the walls, in the order the rotate action tries them. masks_by_x holds the
+    same masks as masks_by_x[shape_name][rotation][x], for hot paths that
+    would rather index than build a tuple key.
+    """
+    tables = _mask_tables.get(width)
+    if tables is None:
+        masks = {
+            (name, rotation, x): tuple(mask << x for mask in geometry.masks)
+            for name, rotations in PIECE_TABLE.items()
+            for rotation, geometry in enumerate(rotations)
+            for x in range(width - geometry.width + 1)
+        }
+        kicks = {
+            (name, rotation, x): tuple(
+                (new_rotation, x + dx, masks[(name, new_rotation, x + dx)])
+                for new_rotation, dx in PIECE_TABLE[name][rotation].kicks
+                if (name, new_rotation, x + dx) in masks
+            )
+            for name, rotation, x in masks
+        }
+        masks_by_x = {
+            name: tuple(tuple(masks[(name, rotation, x)] for x in range(width - geometry.width + 1))
+                        for rotation, geometry in enumerate(rotations))
+            for name, rotations in PIECE_TABLE.items()
+        }
+        tables = _mask_tables[width] = (masks, kicks, masks_by_x)
+    return tables
+
+# Tables for the default board width
+PIECE_MASKS, PIECE_KICKS, _ = piece_mask_tables(BOARD_WIDTH)
+
+# Bitboard backend: every row is an int whose bit c is set when column c is filled.
+# Full-row mask for the default width; each BitBoard carries its own as full_row.
+FULL_ROW_MASK = (1 << BOARD_WIDTH) - 1
+
+# Aggregates evaluators read from a board; see BitBoard.features()
+BoardFeatures = namedtuple(
+    'BoardFeatures',
+    'heights aggregate_height max_height holes bumpiness row_transitions column_transitions wells'
+)
+
+# Zobrist-style hashing: each stored row j contributes a hash of (key j, row mask),
+# XORed together, so changing a row only needs that row's two terms.
+_HASH_MASK = (1 << 64) - 1
+_zobrist_keys = []
+_zobrist_rng = random.Random(0x7E7215)
+
+def _row_hash(j, mask):
+    """Hash term of a stored row; empty rows contribute 0."""
+    if not mask:
+        return 0
+    while j >= len(_zobrist_keys):
+        _zobrist_keys.append(_zobrist_rng.getrandbits(64))
+    return hash((_zobrist_keys[j], mask)) & _HASH_MASK
+
+class BoardSnapshot(namedtuple('BoardSnapshot', 'width height stack zobrist')):
+    """
+    Immutable, hashable copy of a BitBoard: its dimensions, the stored rows
+    bottom-up as a tuple of ints, and its Zobrist hash (used as the hash).
+    Use BitBoard.snapshot() to take one and BitBoard.from_snapshot() to rebuild.
+    """
+    __slots__ = ()
+
+    def __hash__(self):
+        return self.zobrist
+
+def _column_feature(slot):
+    """Read-only BitBoard property for a cached column aggregate, refreshed on access."""
+    def get(self):
+        if self._dirty_columns:
+            self._refresh_columns()
+        return getattr(self, slot)
+    return property(get)
+
+def _row_feature(slot):
+    """Read-only BitBoard property for a cached row aggregate, refreshed on access."""
+    def get(self):
+        if self._dirty_rows:
+            self._refresh_rows()
+        return getattr(self, slot)
+    return property(get)
+
+class BitBoard:
+    """
+    Board backend that stores each row as an integer bitmask.
+    Collision becomes a mask AND per piece row, fixing a piece a mask OR and a
+    full line a compare against the full-row mask. check_collision,
+    fix_piece_to_board and clear_lines accept a BitBoard anywhere they accept a
+    list board. Hot loops that already hold a piece's masks (from self.masks)
+    should call collides() directly, as Game and the placement search do:
+    check_collision's piece unpacking and dispatch cost as much as the probe.
+
+    The board carries its own width and height, so boards of different sizes
+    can coexist (rows are Python ints, so widths beyond 64 work too). Rows are
+    kept bottom-up and only up to the highest one ever filled: rows above the
+    stack are implicitly empty, so memory and per-move work scale with the
+    occupied region rather than the full height. Row indices in the public API
+    are top-down like the list board's.
+
+    The board also keeps column masks (bit j set when the cell j rows above the
+    floor is filled) and caches the evaluation features derived from them:
+    column heights, holes, bumpiness, row/column transitions and well depths.
+    fix() and clear_rows() only mark the rows and columns they change; reading
+    a feature recomputes just those, so placements that are never evaluated
+    cost nothing extra. Mutate the board only through those methods.
+
+    zobrist is an incrementally maintained hash of the cells, equal for equal
+    boards, for transposition tables; like the features, it is brought up to
+    date per changed row when read. snapshot() returns an immutable copy, and
+    unfix()/restore_rows() undo fix()/clear_rows() so search can roll a
+    placement back without copying the board.
+    """
+    __slots__ = (
+        'width', 'height', 'full_row', 'masks', 'kicks', 'masks_by_x', '_stack', '_row_edges', '_row_pairs',
+        '_column_bits', 'cols', '_heights', '_column_holes', '_column_transitions', '_row_transitions',
+        '_aggregate_height', '_hole_count', '_bumpiness', '_row_transitions_total',
+        '_column_transitions_total', '_wells', '_row_hashes', '_zobrist', '_dirty_columns', '_dirty_rows',
+    )
+
+    def __init__(self, rows=None, width=BOARD_WIDTH, height=None):
+        """rows are top-down masks like create_board()'s rows; height defaults to len(rows) or BOARD_HEIGHT."""
+        rows = list(rows) if rows is not None else []
+        self.width = width
+        self.height = height if height is not None else (len(rows) or BOARD_HEIGHT)
+        self.full_row = (1 << width) - 1
+        self.masks, self.kicks, self.masks_by_x = piece_mask_tables(width)
+        self._row_edges = 1 | (1 << (width + 1)) # Both walls, for row transitions
+        self._row_pairs = (1 << (width + 1)) - 1
+        self._column_bits = (1 << self.height) - 1
+        stack = self._stack = rows[::-1]
+        while stack and not stack[-1]:
+            stack.pop()
+        self.cols = [0] * width
+        for j, row in enumerate(stack):
+            for c in range(width):
+                if row >> c & 1:
+                    self.cols[c] |= 1 << j
+        # Caches start as for an empty board, with every row and column marked changed
+        self._row_transitions = [0] * len(stack)
+        self._row_hashes = [0] * len(stack)
+        self._row_transitions_total = self._zobrist = 0
+        self._heights = [0] * width
+        self._column_holes = [0] * width
+        self._column_transitions = [self._transitions_in_column(0)] * width
+        self._aggregate_height = self._hole_count = self._bumpiness = self._wells = 0
+        self._column_transitions_total = sum(self._column_transitions)
+        self._dirty_rows = (1 << len(stack)) - 1
+        self._dirty_columns = self.full_row
+
+    @classmethod
+    def from_rows(cls, board):
+        """Builds a BitBoard from a list-of-lists board (non-zero cells are filled)."""
+        return cls([sum(1 << c for c, cell in enumerate(row) if cell) for row in board], width=len(board[0]))
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Builds a mutable BitBoard equal to the board the snapshot was taken from."""
+        return cls(snapshot.stack[::-1], width=snapshot.width, height=snapshot.height)
+
+    def snapshot(self):
+        """Returns an immutable, hashable BoardSnapshot of the current cells."""
+        stack = self._stack
+        top = len(stack)
+        while top and not stack[top - 1]:
+            top -= 1
+        return BoardSnapshot(self.width, self.height, tuple(stack[:top]), self.zobrist)
+
+    @property
+    def rows(self):
+        """All rows as top-down masks, like create_board()'s rows (built on each access)."""
+        return [0] * (self.height - len(self._stack)) + self._stack[::-1]
+
+    @property
+    def stack_height(self):
+        """Number of rows from the floor up to the highest stored row; rows above are empty."""
+        return len(self._stack)
+
+    def to_rows(self):
+        """Returns the board as a list of lists of 0/1, like create_board()."""
+        return [list(self[r]) for r in range(self.height)]
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, r):
+        """Read-only view of row r (top-down) as a tuple of 0/1 cells."""
+        if r < 0:
+            r += self.height
+        if not 0 <= r < self.height:
+            raise IndexError("board row out of range")
+        j = self.height - 1 - r
+        mask = self._stack[j] if 0 <= j < len(self._stack) else 0
+        return tuple((mask >> c) & 1 for c in range(self.width))
+
+    def __eq__(self, other):
+        if isinstance(other, BitBoard):
+            return (self.width, self.height, self.cols) == (other.width, other.height, other.cols)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"BitBoard({self.rows!r}, width={self.width})"
+
+    heights = _column_feature('_heights')
+    aggregate_height = _column_feature('_aggregate_height')
+    hole_count = _column_feature('_hole_count')
+    bumpiness = _column_feature('_bumpiness')
+    column_transitions = _column_feature('_column_transitions_total')
+    wells = _column_feature('_wells')
+    row_transitions = _row_feature('_row_transitions_total')
+    zobrist = _row_feature('_zobrist')
+
+    def features(self):
+        """Returns the maintained aggregates as a BoardFeatures tuple."""
+        if self._dirty_columns:
+            self._refresh_columns()
+        if self._dirty_rows:
+            self._refresh_rows()
+        return BoardFeatures(
+            tuple(self._heights), self._aggregate_height, max(self._heights), self._hole_count,
+            self._bumpiness, self._row_transitions_total, self._column_transitions_total, self._wells,
+        )
+
+    def _transitions_in_row(self, mask):
+        """Filled/empty changes along a row, walls counting as filled. Empty rows count 0."""
+        if not mask:
+            return 0
+        edges = (mask << 1) | self._row_edges
+        return ((edges ^ (edges >> 1)) & self._row_pairs).bit_count()
+
+    def _transitions_in_column(self, col):
+        """Filled/empty changes up a column mask, the floor counting as filled."""
+        edges = (col << 1) | 1
+        return ((edges ^ (edges >> 1)) & self._column_bits).bit_count()
+
+    def _wells_and_bumpiness(self, lo, hi):
+        """Sum of well depths over columns lo..hi-1 and of height steps between them."""
+        heights, wall, last = self._heights, self.height, self.width - 1
+        wells = bumps = 0
+        prev = heights[lo - 1] if lo else wall
+        here = heights[lo]
+        for c in range(lo, hi):
+            right = heights[c + 1] if c < last else wall
+            depth = (prev if prev < right else right) - here
+            if depth > 0:
+                wells += depth
+            if c + 1 < hi:
+                bumps += abs(here - right)
+            prev, here = here, right
+        return wells, bumps
+
+    def _refresh_columns(self):
+        """Recomputes the column features of the columns changed since the last read."""
+        dirty = self._dirty_columns
+        self._dirty_columns = 0
+        self._update_columns((dirty & -dirty).bit_length() - 1, dirty.bit_length())
+
+    def _refresh_rows(self):
+        """Recomputes the transitions and hash terms of the rows changed since the last read."""
+        stack, transitions, hashes = self._stack, self._row_transitions, self._row_hashes
+        dirty = self._dirty_rows & ((1 << len(stack)) - 1) # Rows trimmed since are gone
+        self._dirty_rows = 0
+        while dirty:
+            low = dirty & -dirty
+            j = low.bit_length() - 1
+            row = stack[j]
+            row_transitions = self._transitions_in_row(row)
+            self._row_transitions_total += row_transitions - transitions[j]
+            transitions[j] = row_transitions
+            row_hash = _row_hash(j, row)
+            self._zobrist ^= hashes[j] ^ row_hash
+            hashes[j] = row_hash
+            dirty ^= low
+
+    def _update_columns(self, start, stop):
+        """Refreshes column features for columns start..stop-1 and the sums that depend on them."""
+        heights, holes, transitions, cols = self._heights, self._column_holes, self._column_transitions, self.cols
+        lo, hi = max(start - 1, 0), min(stop + 1, self.width)
+        old_wells, old_bumps = self._wells_and_bumpiness(lo, hi)
+        column_bits = self._column_bits
+        for c in range(start, stop):
+            col = cols[c]
+            height = col.bit_length()
+            column_holes = height - col.bit_count()
+            edges = (col << 1) | 1 # Inlined _transitions_in_column
+            column_transitions = ((edges ^ (edges >> 1)) & column_bits).bit_count()
+            self._aggregate_height += height - heights[c]
+            self._hole_count += column_holes - holes[c]
+            self._column_transitions_total += column_transitions - transitions[c]
+            heights[c], holes[c], transitions[c] = height, column_holes, column_transitions
+        wells, bumps = self._wells_and_bumpiness(lo, hi)
+        self._wells += wells - old_wells
+        self._bumpiness += bumps - old_bumps
+
+    def collides(self, masks, y):
+        """True if row masks from self.masks collide when their top row is at y."""
+        bottom = self.height - y - len(masks) # Floor-relative index of the lowest piece row
+        if y < 0 or bottom < 0:
+            return True
+        stack = self._stack
+        stored = len(stack)
+        if bottom >= stored:
+            return False # Entirely above the stack
+        j = bottom + len(masks) - 1
+        for mask in masks:
+            if j < stored and stack[j] & mask:
+                return True
+            j -= 1
+        return False
+
+    def _grow(self, top):
+        """Makes sure stack index top is stored."""
+        grow = top + 1 - len(self._stack)
+        if grow > 0:
+            self._stack.extend([0] * grow)
+            self._row_transitions.extend([0] * grow)
+            self._row_hashes.extend([0] * grow)
+
+    def _trim(self):
+        """Drops empty rows from the top of the stack, with their cached terms."""
+        stack = self._stack
+        while stack and not stack[-1]:
+            stack.pop()
+            self._row_transitions_total -= self._row_transitions.pop()
+            self._zobrist ^= self._row_hashes.pop()
+
+    def fix(self, masks, y):
+        """ORs row masks from self.masks into the board with their top row at y."""
+        top = self.height - 1 - y
+        self._grow(top)
+        stack, cols = self._stack, self.cols
+        touched = 0
+        j = top
+        for mask in masks:
+            stack[j] |= mask
+            bit = 1 << j
+            touched |= mask
+            while mask:
+                low = mask & -mask
+                cols[low.bit_length() - 1] |= bit
+                mask ^= low
+            j -= 1
+        self._dirty_columns |= touched
+        self._dirty_rows |= ((1 << len(masks)) - 1) << (j + 1)
+
+    def unfix(self, masks, y):
+        """Undoes fix(masks, y): removes those cells from the board."""
+        top = self.height - 1 - y
+        stack, cols = self._stack, self.cols
+        touched = 0
+        j = top
+        for mask in masks:
+            stack[j] &= ~mask
+            bit = ~(1 << j)
+            touched |= mask
+            while mask:
+                low = mask & -mask
+                cols[low.bit_length() - 1] &= bit
+                mask ^= low
+            j -= 1
+        self._dirty_columns |= touched
+        self._dirty_rows |= ((1 << len(masks)) - 1) << (j + 1)
+        self._trim()
+
+    @staticmethod
+    def _blocks(js):
+        """Groups stack indices into runs of adjacent rows: [(lowest index, count)], in the order given."""
+        blocks = []
+        for j in js:
+            if blocks and j == blocks[-1][0] - 1: # Descending run
+                blocks[-1] = (j, blocks[-1][1] + 1)
+            elif blocks and j == blocks[-1][0] + blocks[-1][1]: # Ascending run
+                blocks[-1] = (blocks[-1][0], blocks[-1][1] + 1)
+            else:
+                blocks.append((j, 1))
+        return blocks
+
+    def _mark_rows_from(self, j):
+        """Marks stored rows j and up as changed, e.g. after they have shifted."""
+        self._dirty_rows |= ((1 << len(self._stack)) - 1) >> j << j
+
+    def clear_rows(self, candidates):
+        """
+        Clears whichever of the candidate rows (top-down indices) are full, compacting
+        the board in place. Returns the cleared row indices (as they were before the
+        clear), top first. Only the stored rows above a cleared one move, and each
+        column mask is compacted once per run of adjacent cleared rows.
+        """
+        stack, full_row, height = self._stack, self.full_row, self.height
+        cleared = sorted(r for r in set(candidates)
+                         if 0 <= height - 1 - r < len(stack) and stack[height - 1 - r] == full_row)
+        if not cleared:
+            return cleared
+        transitions, hashes = self._row_transitions, self._row_hashes
+        for lo, count in self._blocks([height - 1 - r for r in cleared]): # Highest rows first
+            hi = lo + count
+            for j in range(lo, hi):
+                self._row_transitions_total -= transitions[j]
+                self._zobrist ^= hashes[j]
+            del stack[lo:hi], transitions[lo:hi], hashes[lo:hi]
+            below = (1 << lo) - 1
+            self.cols = [(col & below) | (col >> hi << lo) for col in self.cols]
+        self._dirty_columns = full_row
+        self._mark_rows_from(height - 1 - cleared[-1])
+        self._trim()
+        return cleared
+
+    def restore_rows(self, cleared):
+        """Undoes clear_rows: re-inserts full rows at the indices it returned."""
+        if not cleared:
+            return
+        stack, full_row, height = self._stack, self.full_row, self.height
+        for lo, count in self._blocks([height - 1 - r for r in reversed(cleared)]): # Lowest rows first
+            self._grow(lo - 1)
+            stack[lo:lo] = [full_row] * count
+            self._row_transitions[lo:lo] = [0] * count # Full rows have no transitions
+            self._row_hashes[lo:lo] = [0] * count
+            below, block = (1 << lo) - 1, ((1 << count) - 1) << lo
+            self.cols = [(col & below) | block | (col >> lo << (lo + count)) for col in self.cols]
+        self._dirty_columns = full_row
+        self._mark_rows_from(height - 1 - cleared[-1])
+
+    def clear_full_rows(self):
+        """Removes full rows in place, shifting the rest down. Returns the count. Only stored rows are read."""
+        full_row, top = self.full_row, self.height - 1
+        full = [top - j for j, row in enumerate(self._stack) if row == full_row]
+        return len(self.clear_rows(full)) if full else 0
+
+def board_features(board):
+    """Returns BoardFeatures for a BitBoard (maintained) or a list board (computed by a full scan)."""
+    if not isinstance(board, BitBoard):
+        board = BitBoard.from_rows(board)
+    return board.features()
+
+def board_size(board):
+    """Returns (width, height) of a BitBoard or a list board."""
+    if isinstance(board, BitBoard):
+        return board.width, board.height
+    return len(board[0]), len(board)
+
+# Shape names in TETROMINOES order, and each shape's rotations as nested tuples
+SHAPE_NAMES = tuple(TETROMINOES)
+SHAPES = {name: tuple(tuple(tuple(row) for row in shape) for shape in rotations)
+          for name, rotations in TETROMINOES.items()}
+
+class Piece:
+    """
+    Compact falling piece: the shape name, rotation and position in slots, with
+    the shape data shared from SHAPES rather than stored per piece. It also
+    reads and writes like the dicts new_tetrimino() returns (piece['x'] += 1,
+    piece['shape'], 'y' in piece, dict(piece)), so code written for dict pieces
+    accepts it unchanged.
+    """
+    __slots__ = ('shape_name', 'rotation', 'x', 'y')
+    KEYS = ('shape_name', 'shape', 'rotation', 'x', 'y')
+
+    def __init__(self, shape_name, rotation=0, x=0, y=0):
+        self.shape_name = shape_name
+        self.rotation = rotation
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def spawn(cls, shape_name, board_width=BOARD_WIDTH):
+        """Creates the given shape at its spawn position."""
+        return cls(shape_name, 0, board_width // 2 - PIECE_TABLE[shape_name][0].width // 2, 0)
+
+    @classmethod
+    def from_dict(cls, piece_obj):
+        """Converts a dict piece (or another Piece) to a Piece."""
+        return cls(piece_obj['shape_name'], piece_obj['rotation'], piece_obj['x'], piece_obj['y'])
+
+    @property
+    def shape(self):
+        return SHAPES[self.shape_name]
+
+    def __getitem__(self, key):
+        if key in Piece.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in Piece.__slots__: # 'shape' follows shape_name and cannot be set
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in Piece.KEYS
+
+    def keys(self):
+        return Piece.KEYS
+
+    def as_dict(self):
+        """Returns the piece as a dict like new_tetrimino()'s."""
+        return {key: self[key] for key in Piece.KEYS}
+
+    def copy(self):
+        return Piece(self.shape_name, self.rotation, self.x, self.y)
+
+    def __eq__(self, other):
+        """Equal to a Piece or dict piece with the same shape_name, rotation, x and y ('shape' is ignored)."""
+        if isinstance(other, Piece):
+            return (self.shape_name, self.rotation, self.x, self.y) == \
+                   (other.shape_name, other.rotation, other.x, other.y)
+        if isinstance(other, dict):
+            return (self.shape_name, self.rotation, self.x, self.y) == \
+                   tuple(other.get(key) for key in Piece.__slots__)
+        return NotImplemented
+
+    __hash__ = None # Mutable
+
+    def __repr__(self):
+        return f"Piece({self.shape_name!r}, rotation={self.rotation}, x={self.x}, y={self.y})"
 
 # Function to generate a new random Tetrimino
-def new_tetrimino():
-    """Generates a new random Tetrimino."""
-    shape = random.choice(list(TETROMINOES.keys()))
+def new_tetrimino(board_width=BOARD_WIDTH, rng=random):
+    """Generates a new random Tetrimino, centred on a board of the given width, drawn from rng."""
+    return spawn_piece(rng.choice(SHAPE_NAMES), board_width)
+
+def spawn_piece(shape, board_width=BOARD_WIDTH):
+    """Creates the given Tetrimino at its spawn position, as a dict."""
     piece_data = {
         'shape_name': shape, # Store the name for easy lookup
         'shape': TETROMINOES[shape],
         'rotation': 0,
-        'x': BOARD_WIDTH // 2 - len(TETROMINOES[shape][0][0]) // 2,
+        'x': board_width // 2 - len(TETROMINOES[shape][0][0]) // 2,
         'y': 0
     }
     return piece_data
@@ -63,273 +627,971 @@ def get_piece_shape(piece):
     """Returns the actual shape (2D list) of the piece based on its current rotation."""
     return piece['shape'][piece['rotation'] % len(piece['shape'])]
 
+def _unpack_piece(piece_obj):
+    """(shape_name, rotation, x, y) of a Piece or a dict piece, using attributes when possible."""
+    if piece_obj.__class__ is Piece:
+        return piece_obj.shape_name, piece_obj.rotation, piece_obj.x, piece_obj.y
+    return piece_obj['shape_name'], piece_obj['rotation'], piece_obj['x'], piece_obj['y']
+
 def check_collision(board, piece_obj, new_x=None, new_y=None, new_rotation=None):
     """
     Checks if the piece_obj collides with board boundaries or existing blocks
     at the given new_x, new_y, and new_rotation.
     If new_x, new_y, or new_rotation are None, they default to the piece_obj's current values.
     """
-    x = new_x if new_x is not None else piece_obj['x']
-    y = new_y if new_y is not None else piece_obj['y']
-    
-    # Determine the shape to check
-    if new_rotation is not None:
-        shape_to_check = piece_obj['shape'][new_rotation % len(piece_obj['shape'])]
+    # Inlined _unpack_piece: this is the hottest call in the game
+    if piece_obj.__class__ is Piece:
+        name, rotation, x, y = piece_obj.shape_name, piece_obj.rotation, piece_obj.x, piece_obj.y
     else:
-        shape_to_check = get_piece_shape(piece_obj)
-
-    for r, row_data in enumerate(shape_to_check):
-        for c, cell in enumerate(row_data):
-            if cell:  # If this part of the Tetrimino shape is solid
-                board_r, board_c = y + r, x + c
-                # Check boundaries
-                if not (0 <= board_r < BOARD_HEIGHT and 0 <= board_c < BOARD_WIDTH):
-                    return True  # Out of bounds
-                # Check collision with existing blocks on the board
-                if board[board_r][board_c] != 0:
-                    return True  # Collision with another block
+        name, rotation, x, y = piece_obj['shape_name'], piece_obj['rotation'], piece_obj['x'], piece_obj['y']
+    if new_x is not None:
+        x = new_x
+    if new_y is not None:
+        y = new_y
+    if new_rotation is not None:
+        rotation = new_rotation
+
+    if type(board) is BitBoard: # Indexes the precompiled masks, with no tuple key or cell loop
+        rotations = board.masks_by_x[name]
+        by_x = rotations[rotation % len(rotations)]
+        return not 0 <= x < len(by_x) or board.collides(by_x[x], y)
+
+    rotations = PIECE_TABLE[name]
+    rotation %= len(rotations)
+    height, width = len(board), len(board[0])
+    for r, c in rotations[rotation].cells:
+        board_r, board_c = y + r, x + c
+        # Check boundaries
+        if not (0 <= board_r < height and 0 <= board_c < width):
+            return True  # Out of bounds
+        # Check collision with existing blocks on the board
+        if board[board_r][board_c] != 0:
+            return True  # Collision with another block
     return False
 
 def fix_piece_to_board(board, piece_obj):
-    """Fixes the current piece onto the board."""
-    shape = get_piece_shape(piece_obj)
-    for r, row_data in enumerate(shape):
-        for c, cell in enumerate(row_data):
-            if cell:
-                board[piece_obj['y'] + r][piece_obj['x'] + c] = 1 # Mark with 1, or piece_obj['shape_name'] for colors
+    """Fixes the current piece onto the board. Returns the board rows it occupies."""
+    name, rotation, x, y = _unpack_piece(piece_obj)
+    if type(board) is BitBoard:
+        rotations = board.masks_by_x[name]
+        if x < 0:
+            raise IndexError("piece is outside the board")
+        masks = rotations[rotation % len(rotations)][x]
+        board.fix(masks, y)
+        return range(y, y + len(masks))
+    rotations = PIECE_TABLE[name]
+    rotation %= len(rotations)
+    for r, c in rotations[rotation].cells:
+        board[y + r][x + c] = 1 # Mark with 1, or piece_obj['shape_name'] for colors
+    return range(y, y + rotations[rotation].height)
+
+def remove_piece_from_board(board, piece_obj):
+    """Undoes fix_piece_to_board: empties the cells the piece occupies."""
+    name, rotation, x, y = _unpack_piece(piece_obj)
+    rotations = PIECE_TABLE[name]
+    rotation %= len(rotations)
+    if isinstance(board, BitBoard):
+        board.unfix(board.masks[(name, rotation, x)], y)
+    else:
+        for r, c in rotations[rotation].cells:
+            board[y + r][x + c] = 0
+
+def rotate_piece(board, piece_obj):
+    """
+    Rotates piece_obj in place, trying the precompiled kick candidates
+    (no kick, one left, one right) in order. Returns True if it rotated.
+    """
+    name, rotation, x, y = _unpack_piece(piece_obj)
+    rotation %= len(PIECE_TABLE[name])
+    if isinstance(board, BitBoard):
+        for new_rotation, new_x, masks in board.kicks.get((name, rotation, x), ()):
+            if not board.collides(masks, y):
+                piece_obj['rotation'], piece_obj['x'] = new_rotation, new_x
+                return True
+        return False
+    for new_rotation, dx in PIECE_TABLE[name][rotation].kicks:
+        if not check_collision(board, piece_obj, new_x=x + dx, new_rotation=new_rotation):
+            piece_obj['rotation'], piece_obj['x'] = new_rotation, x + dx
+            return True
+    return False
 
 # Function to clear completed lines
+def clear_rows(board, rows):
+    """
+    Clears whichever of the given rows are full (e.g. the rows returned by
+    fix_piece_to_board) and compacts the board in place: only those rows are
+    checked, and cleared row lists are emptied and reused as the new top rows.
+    Returns the cleared row indices (as they were before the clear), top first.
+    """
+    if isinstance(board, BitBoard):
+        return board.clear_rows(rows)
+    cleared = sorted(r for r in set(rows) if 0 not in board[r])
+    if cleared:
+        recycled = [board.pop(r) for r in reversed(cleared)]
+        for row in recycled:
+            row[:] = [0] * len(row)
+        board[0:0] = recycled
+    return cleared
+
+def restore_cleared_rows(board, cleared):
+    """Undoes clear_rows: re-inserts full rows at the indices it returned."""
+    if isinstance(board, BitBoard):
+        board.restore_rows(cleared)
+        return
+    recycled = board[:len(cleared)]
+    del board[:len(cleared)]
+    for r, row in zip(cleared, recycled):
+        row[:] = [1] * len(row)
+        board.insert(r, row)
+
 def clear_lines(board):
-    """Clears completed lines and shifts blocks down."""
-    lines_cleared = 0
-    new_board = [row for row in board if not all(cell != 0 for cell in row)]
-    lines_cleared = BOARD_HEIGHT - len(new_board)
-    for _ in range(lines_cleared):
-        new_board.insert(0, [0 for _ in range(BOARD_WIDTH)])
-    return new_board, lines_cleared
+    """
+    Clears completed lines and shifts blocks down.
+    The board is compacted in place and returned with the number of lines cleared.
+    A BitBoard only checks its stored rows, so tall boards cost no more than short ones.
+    """
+    if type(board) is BitBoard:
+        return board, board.clear_full_rows()
+    return board, len(clear_rows(board, range(len(board))))
 
-# Main game loop structure
-def main():
-    board = create_board()
-    current_piece = new_tetrimino()
-    game_over = False
-    score = 0
-
-    # Basic game timer / speed
-    import time
-    fall_time = 0
-    fall_speed = 0.5  # seconds per drop
-
-    # Game display function
-    def draw_board(board_state, piece=None, current_score=0):
-        # Screen clearing (ANSI escape sequence)
-        print("\033c", end="") 
-        # Alternatively, for wider compatibility if ANSI fails:
-        # import os
-        # os.system('cls' if os.name == 'nt' else 'clear')
-        # Or print many newlines:
-        # print('\n' * 50)
-
-        header = "Tetris! Controls: a=left, d=right, w=rotate, s=down, q=quit"
-        score_display = f"Score: {current_score}"
-        
-        display_board = [row[:] for row in board_state]
-        if piece:
-            shape = get_piece_shape(piece)
-            for r_idx, row_data in enumerate(shape):
-                for c_idx, cell_val in enumerate(row_data):
-                    if cell_val: # Part of the Tetrimino
-                        # Check bounds before trying to draw on display_board
-                        if 0 <= piece['y'] + r_idx < BOARD_HEIGHT and \
-                           0 <= piece['x'] + c_idx < BOARD_WIDTH:
-                            display_board[piece['y'] + r_idx][piece['x'] + c_idx] = '□' # Current piece
-                        # else: part of piece is out of bounds (e.g. during rotation near edge)
-        
-        print(header)
-        print("="*(BOARD_WIDTH*2 + 2))
-        for r in range(BOARD_HEIGHT):
-            row_str = "|"
-            for c in range(BOARD_WIDTH):
-                cell = display_board[r][c]
-                if cell == 0:
-                    row_str += "・" # Empty cell
-                elif cell == '□': # Current falling piece
-                     row_str += "□ "
-                else: # Fixed piece (should be 1 from fix_piece_to_board)
-                    row_str += "■ " 
-            row_str += "|"
-            print(row_str)
-        print("="*(BOARD_WIDTH*2 + 2))
-        print(score_display)
-
-    last_time = time.time()
-
-    # Initial draw
-    draw_board(board, current_piece, score)
-
-    while not game_over:
-        current_time = time.time()
-        delta_time = current_time - last_time
-        last_time = current_time
-        fall_time += delta_time
-
-        # --- Player Input (simple non-blocking for console) ---
-        # This input method is very basic and blocking.
-        # For a real game, you'd use a library like pygame for event handling.
-        # We'll simulate a tick-based input for now.
-        action = '' # Get input here if using a proper input library
-
-        # --- Automatic Piece Dropping ---
-        if fall_time >= fall_speed:
-            fall_time = 0
-            if not check_collision(board, current_piece, new_y=current_piece['y'] + 1):
-                current_piece['y'] += 1
+# Player actions understood by Game.step (the same keys main() reads)
+ACTION_LEFT = 'a'
+ACTION_RIGHT = 'd'
+ACTION_ROTATE = 'w'
+ACTION_DOWN = 's'
+
+def _search_placements(board, name, starts):
+    """
+    Breadth-first search over (rotation, x, y) states reachable from the start
+    states on a BitBoard with left, right, rotate (with kicks) and soft drop.
+    Returns (visited, resting): visited maps each state to (previous state,
+    action), None for starts, and resting lists the states that cannot move
+    down, in BFS order.
+    """
+    visited = dict.fromkeys(starts, (None, None))
+    resting = []
+    queue = deque(visited)
+    collides, all_masks, all_kicks = board.collides, board.masks, board.kicks
+    while queue:
+        state = queue.popleft()
+        rotation, x, y = state
+        if collides(all_masks[(name, rotation, x)], y + 1):
+            resting.append(state)
+        elif (rotation, x, y + 1) not in visited:
+            visited[(rotation, x, y + 1)] = (state, ACTION_DOWN)
+            queue.append((rotation, x, y + 1))
+        for action, dx in ((ACTION_LEFT, -1), (ACTION_RIGHT, 1)):
+            nxt = (rotation, x + dx, y)
+            if nxt not in visited:
+                moved = all_masks.get((name, rotation, x + dx))
+                if moved is not None and not collides(moved, y):
+                    visited[nxt] = (state, action)
+                    queue.append(nxt)
+        for new_rotation, new_x, kicked in all_kicks[(name, rotation, x)]:
+            if not collides(kicked, y):
+                nxt = (new_rotation, new_x, y)
+                if nxt not in visited:
+                    visited[nxt] = (state, ACTION_ROTATE)
+                    queue.append(nxt)
+                break # Only the first kick candidate that fits is taken
+    return visited, resting
+
+def _hard_drop_placements(board, name):
+    """
+    Resting placements by straight drops, computed from the board's maintained
+    column heights. Only valid when the piece starts in the empty rows above
+    the stack (so every rotation and column is reachable) and the board has no
+    holes (so nothing can be tucked under a ledge).
+    """
+    heights, height = board.heights, board.height
+    placements = []
+    for rotation, geometry in enumerate(PIECE_TABLE[name]):
+        bottom = geometry.bottom
+        for x in range(board.width - geometry.width + 1):
+            rest_y = min(height - 1 - heights[x + c] - bottom[c] for c in range(geometry.width))
+            placements.append((rotation, x, rest_y))
+    return placements
+
+def enumerate_placements(board, piece_obj):
+    """
+    Returns every distinct resting placement (rotation, x, y) that piece_obj can
+    reach from its current position with the moves main() supports: left, right,
+    rotate with the ±1 wall kick, and soft drop. Placements are found with a
+    BFS over bitboard masks, or directly from column surfaces when the board has
+    no overhangs. The BFS starts just above the stack rather than at the piece,
+    so tall boards cost no more than short ones.
+    """
+    if not isinstance(board, BitBoard):
+        board = BitBoard.from_rows(board)
+    name, rotation, x, y = _unpack_piece(piece_obj)
+    rotation %= len(PIECE_TABLE[name])
+    masks = board.masks.get((name, rotation, x))
+    if masks is None or board.collides(masks, y):
+        return []
+    # Rows from free_y up are empty for at least the tallest piece's height,
+    # so every rotation and column can be reached there by moving and rotating.
+    free_y = board.height - max(board.heights) - 4
+    if free_y < y:
+        return _search_placements(board, name, [(rotation, x, y)])[1]
+    if not board.hole_count:
+        return _hard_drop_placements(board, name)
+    starts = [(r, sx, free_y) for r, geometry in enumerate(PIECE_TABLE[name])
+              for sx in range(board.width - geometry.width + 1)]
+    return _search_placements(board, name, starts)[1]
+
+# Points awarded for clearing 1, 2, 3 or 4+ lines with one piece
+LINE_CLEAR_SCORES = (0, 100, 300, 500, 800)
+SOFT_DROP_SCORE = 1
+
+def score_for_lines(lines_cleared):
+    """Returns the points for clearing lines_cleared lines with one piece."""
+    return LINE_CLEAR_SCORES[min(lines_cleared, len(LINE_CLEAR_SCORES) - 1)]
+
+# Events a Game reports to its listeners, and the fields of each event's data
+EVENT_SPAWN, EVENT_MOVE, EVENT_ROTATE, EVENT_LOCK, EVENT_LINES, EVENT_SCORE, EVENT_GAME_OVER = (
+    'spawn', 'move', 'rotate', 'lock', 'lines', 'score', 'game_over')
+EVENT_FIELDS = {
+    EVENT_SPAWN: ('shape', 'x', 'y'),
+    EVENT_MOVE: ('x', 'y'), # After a successful left/right/down move or a gravity drop
+    EVENT_ROTATE: ('rotation', 'x'),
+    EVENT_LOCK: ('shape', 'rotation', 'x', 'y'),
+    EVENT_LINES: ('rows',), # Cleared row indices, top first, as they were before the clear
+    EVENT_SCORE: ('score', 'delta'),
+    EVENT_GAME_OVER: ('score',),
+}
+# kind: one of EVENT_FIELDS; ticks: Game.ticks when it happened; data: tuple of EVENT_FIELDS[kind]
+GameEvent = namedtuple('GameEvent', 'kind ticks data')
+
+# Everything needed to resume a Game: see Game.state() and Game.restore()
+GameState = namedtuple('GameState', 'board piece next_queue score lines pieces ticks game_over rng_state')
+
+class Game:
+    """
+    Headless, steppable game state: board, falling piece, score and the
+    gravity/lock/scoring rules. It does no I/O and never sleeps, so it runs
+    at CPU speed; main() is a terminal front end over it.
+
+    Callables in self.listeners are called with a GameEvent for every spawn,
+    move, rotation, lock, line clear, score change and game over (undo() is
+    not reported). With no listeners the only cost is an empty-list check.
+    """
+
+    def __init__(self, board=None, width=BOARD_WIDTH, height=BOARD_HEIGHT, seed=None, listeners=()):
+        """
+        Plays on the given board, or on a new BitBoard of width x height.
+        Shapes are drawn from self.rng, a random.Random seeded with seed; without
+        a seed one is taken from the global random module, and kept in self.seed
+        so the game can be reproduced. listeners also receive the first spawn.
+        """
+        self.board = board if board is not None else BitBoard(width=width, height=height)
+        self.width, self.height = board_size(self.board)
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self._piece = None
+        self.next_queue = deque() # Upcoming shape names; random shapes are drawn when empty
+        self.score = 0
+        self.lines = 0
+        self.pieces = 0
+        self.ticks = 0
+        self.game_over = False
+        self.cleared_rows = [] # Row indices cleared by the last lock, for scoring and animations
+        self._undo_log = []
+        self.listeners = list(listeners)
+        self._spawn()
+
+    def subscribe(self, listener):
+        """Adds listener(event) to the listeners and returns it."""
+        self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def event_queue(self):
+        """
+        Subscribes and returns a deque that collects the game's events; pop
+        them with popleft() (or tetris_events.drain()) between steps.
+        """
+        events = deque()
+        self.subscribe(events.append)
+        return events
+
+    def _emit(self, kind, *data):
+        event = GameEvent(kind, self.ticks, data)
+        for listener in self.listeners:
+            listener(event)
+
+    @property
+    def current_piece(self):
+        """The falling Piece. Dict pieces assigned here are converted to Piece."""
+        return self._piece
+
+    @current_piece.setter
+    def current_piece(self, piece_obj):
+        piece = piece_obj if isinstance(piece_obj, Piece) else Piece.from_dict(piece_obj)
+        piece.rotation %= len(PIECE_TABLE[piece.shape_name]) # So its masks can be looked up directly
+        self._piece = piece
+
+    def _collides(self, piece, x, y):
+        """
+        check_collision for the falling piece moved to (x, y). On a BitBoard the
+        precompiled masks go straight to BitBoard.collides, skipping the piece
+        unpacking and board dispatch of check_collision.
+        """
+        board = self.board
+        if board.__class__ is BitBoard:
+            masks = board.masks.get((piece.shape_name, piece.rotation, x))
+            return masks is None or board.collides(masks, y) # No masks: past a wall
+        return check_collision(board, piece, new_x=x, new_y=y)
+
+    def _spawn(self):
+        name = self.next_queue.popleft() if self.next_queue else self.rng.choice(SHAPE_NAMES)
+        self._piece = Piece.spawn(name, self.width)
+        if self.listeners:
+            self._emit(EVENT_SPAWN, name, self._piece.x, self._piece.y)
+        if self._collides(self._piece, self._piece.x, self._piece.y):
+            self.game_over = True
+            if self.listeners:
+                self._emit(EVENT_GAME_OVER, self.score)
+
+    def state(self):
+        """
+        Returns an immutable GameState: board snapshot, piece, queue, counters and
+        rng state. List boards are snapshotted through a BitBoard copy.
+        """
+        p = self._piece
+        board = self.board if isinstance(self.board, BitBoard) else BitBoard.from_rows(self.board)
+        return GameState(board.snapshot(), (p.shape_name, p.rotation, p.x, p.y), tuple(self.next_queue),
+                         self.score, self.lines, self.pieces, self.ticks, self.game_over, self.rng.getstate())
+
+    def restore(self, state):
+        """
+        Puts the game back in a GameState taken from a game of the same size,
+        keeping the kind of board it plays on. Clears the undo log.
+        """
+        board = BitBoard.from_snapshot(state.board)
+        self.board = board if isinstance(self.board, BitBoard) else board.to_rows()
+        self._piece = Piece(*state.piece)
+        self.next_queue = deque(state.next_queue)
+        self.score, self.lines, self.pieces, self.ticks = state.score, state.lines, state.pieces, state.ticks
+        self.game_over = state.game_over
+        self.rng.setstate(state.rng_state)
+        self.cleared_rows = []
+        self._undo_log = []
+
+    def preview(self, n):
+        """Returns the next n shape names, drawing random ones into next_queue as needed."""
+        while len(self.next_queue) < n:
+            self.next_queue.append(self.rng.choice(SHAPE_NAMES))
+        return tuple(self.next_queue)[:n]
+
+    def _lock(self):
+        """Fixes the falling piece, clears lines, scores and spawns the next piece."""
+        self.cleared_rows = clear_rows(self.board, fix_piece_to_board(self.board, self._piece))
+        lines_cleared = len(self.cleared_rows)
+        self.pieces += 1
+        self.lines += lines_cleared
+        points = score_for_lines(lines_cleared)
+        self.score += points
+        if self.listeners:
+            piece = self._piece
+            self._emit(EVENT_LOCK, piece.shape_name, piece.rotation, piece.x, piece.y)
+            if lines_cleared:
+                self._emit(EVENT_LINES, tuple(self.cleared_rows))
+            if points:
+                self._emit(EVENT_SCORE, self.score, points)
+        self._spawn()
+        return lines_cleared
+
+    def step(self, action):
+        """
+        Applies one player action (ACTION_LEFT/RIGHT/ROTATE/DOWN). Unknown
+        actions are ignored. Returns the number of lines cleared if the action
+        locked the piece, otherwise 0.
+        """
+        if self.game_over:
+            return 0
+        piece = self._piece
+        if action == ACTION_LEFT:
+            if not self._collides(piece, piece.x - 1, piece.y):
+                piece.x -= 1
+                if self.listeners:
+                    self._emit(EVENT_MOVE, piece.x, piece.y)
+        elif action == ACTION_RIGHT:
+            if not self._collides(piece, piece.x + 1, piece.y):
+                piece.x += 1
+                if self.listeners:
+                    self._emit(EVENT_MOVE, piece.x, piece.y)
+        elif action == ACTION_ROTATE:
+            if rotate_piece(self.board, piece) and self.listeners:
+                self._emit(EVENT_ROTATE, piece.rotation, piece.x)
+        elif action == ACTION_DOWN: # Soft drop, locks when the piece is resting
+            if not self._collides(piece, piece.x, piece.y + 1):
+                piece.y += 1
+                self.score += SOFT_DROP_SCORE
+                if self.listeners:
+                    self._emit(EVENT_MOVE, piece.x, piece.y)
+                    self._emit(EVENT_SCORE, self.score, SOFT_DROP_SCORE)
+            else:
+                return self._lock()
+        return 0
+
+    def apply(self, rotation, x, y, undoable=True):
+        """
+        Locks the falling piece at a placement (e.g. from enumerate_placements)
+        and, unless undoable is False, records how to undo it. Returns the
+        number of lines cleared; after game over it does nothing and returns 0.
+        """
+        if self.game_over:
+            return 0
+        piece = self._piece
+        if undoable:
+            self._undo_log.append((
+                piece, (piece.rotation, piece.x, piece.y),
+                self.score, self.lines, self.pieces, self.game_over, self.cleared_rows,
+            ))
+        piece.rotation, piece.x, piece.y = rotation, x, y
+        return self._lock()
+
+    def undo(self):
+        """
+        Reverts the most recent apply(): the board, counters and falling piece
+        are restored, and the piece spawned by that apply() is put back at the
+        front of next_queue so the sequence of shapes is unchanged.
+        """
+        piece, position, self.score, self.lines, self.pieces, self.game_over, cleared_rows = self._undo_log.pop()
+        restore_cleared_rows(self.board, self.cleared_rows)
+        remove_piece_from_board(self.board, piece)
+        self.next_queue.appendleft(self._piece.shape_name)
+        piece.rotation, piece.x, piece.y = position
+        self._piece, self.cleared_rows = piece, cleared_rows
+
+    def tick(self, n=1):
+        """
+        Advances gravity by n drops; a piece that cannot fall locks.
+        Stops early on game over. Returns the total lines cleared.
+        """
+        lines_cleared = 0
+        for _ in range(n):
+            if self.game_over:
+                break
+            self.ticks += 1
+            piece = self._piece
+            if not self._collides(piece, piece.x, piece.y + 1):
+                piece.y += 1
+                if self.listeners:
+                    self._emit(EVENT_MOVE, piece.x, piece.y)
             else:
-                fix_piece_to_board(board, current_piece)
-                board, lines_cleared_count = clear_lines(board)
-                score += lines_cleared_count * 100 # Basic scoring
-                current_piece = new_tetrimino()
-                if check_collision(board, current_piece):
-                    game_over = True
-                    print("GAME OVER!")
-                    break
-        
-        # --- Manual Player Controls (Example - needs better input handling) ---
-        # This is just a placeholder to show where controls would go.
-        # In a real console game, you might use select() or curses.
-        # For now, we will process one action per "frame" if available
-        # from a hypothetical input queue or a very quick input()
-        
-        # Re-draw the board for every major event or periodically
-        # For this console version, we might draw less frequently or after each action.
-        # For now, let's assume we get one input per "tick" or an empty string
-        
-        # --- Player Input Handling ---
-        # This section simulates non-blocking input for a console application.
-        # In a real GUI application, event handling would be different.
-        # For this console version, we'll use a simple input prompt.
-        # To make it feel more like a game, we'll process input quickly
-        # and then let the automatic drop handle the passage of time.
-        # A more advanced console version might use `select` or `curses`.
-
-        # Instead of blocking input() inside the main loop's time-sensitive part,
-        # we are currently using time.sleep(0.1) and the automatic drop.
-        # For manual control, we will rely on the user typing commands quickly.
-        # This is a limitation of standard console input.
-        # The previously commented out input block is a better place for interactive control,
-        # but it makes the game turn-based rather than real-time.
-
-        # Let's try to integrate a simple, quick input check.
-        # For a better experience, one would typically use a library like `pygame` for input and graphics.
-        # The following is a conceptual placeholder for where real input handling would go.
-        # To make the provided code runnable and testable without complex input setup,
-        # the game relies on automatic drop. Player actions would be manually triggered
-        # by uncommenting and adapting an input method.
-
-        # For now, to test player controls, we can temporarily uncomment the blocking input,
-        # but it's not ideal for the final game feel.
-        # Let's assume for this subtask, the logic for player actions is the focus.
-
-        # --- Automatic Piece Dropping --- (This part is fine)
-        if fall_time >= fall_speed:
-            fall_time = 0
-            if not check_collision(board, current_piece, new_y=current_piece['y'] + 1):
-                current_piece['y'] += 1
+                lines_cleared += self._lock()
+        return lines_cleared
+
+# Terminal rendering
+EMPTY_CELL, PIECE_CELL, FIXED_CELL = 0, 1, 2
+CELL_GLYPHS = ("・", "□ ", "■ ") # Every glyph is two terminal columns wide
+HEADER = "Tetris! Controls: a=left, d=right, w=rotate, s=down, q=quit"
+
+def frame_cells(board, piece=None):
+    """
+    Returns the board as a list of rows of EMPTY_CELL/PIECE_CELL/FIXED_CELL,
+    with the falling piece (if any) drawn over the fixed blocks.
+    """
+    width, height = board_size(board)
+    cells = [[FIXED_CELL if cell else EMPTY_CELL for cell in board[r]] for r in range(height)]
+    if piece:
+        name, rotation, px, py = _unpack_piece(piece)
+        for dr, dc in PIECE_TABLE[name][rotation].cells:
+            if 0 <= py + dr < height and 0 <= px + dc < width:
+                cells[py + dr][px + dc] = PIECE_CELL
+    return cells
+
+class Renderer:
+    """
+    Draws frames to a terminal with ANSI escapes. The first frame (or one whose
+    size differs from the last) is drawn in full; after that only the cells and
+    status lines that changed are sent, each run of changed cells preceded by a
+    single cursor move. A frame is written with one write() and one flush().
+    Redraws closer together than 1/max_fps seconds are skipped unless forced.
+    """
+
+    def __init__(self, out=None, max_fps=30, clock=None):
+        self.out = sys.stdout if out is None else out
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.clock = time.monotonic if clock is None else clock
+        self.last_draw = None
+        self._cells = None # Cells of the frame on screen
+        self._status = None
+        self.frames = self.skipped = 0
+
+    def invalidate(self):
+        """Forgets the frame on screen, so the next draw repaints everything."""
+        self._cells = self._status = None
+
+    def draw(self, board, piece=None, status="", force=False):
+        """
+        Draws board and piece with a status line underneath. Returns False if
+        the frame was skipped by the frame-rate cap, True otherwise.
+        """
+        now = self.clock()
+        if not force and self.last_draw is not None and now - self.last_draw < self.min_interval:
+            self.skipped += 1
+            return False
+        self.last_draw = now
+        cells = frame_cells(board, piece)
+        height, width = len(cells), len(cells[0])
+        prev = self._cells
+        out = []
+        if prev is None or len(prev) != height or len(prev[0]) != width:
+            border = "=" * (width * 2 + 2)
+            out.append("\033[H\033[2J")
+            out.append(HEADER + "\n" + border + "\n")
+            for row in cells:
+                out.append("|" + "".join([CELL_GLYPHS[c] for c in row]) + "|\n")
+            out.append(border + "\n" + status + "\n")
+        else:
+            # Board row r is terminal line r + 3 (after the header and border);
+            # cell c starts at column 2c + 2 (after the left wall)
+            for r in range(height):
+                row, old = cells[r], prev[r]
+                if row == old:
+                    continue
+                c = 0
+                while c < width:
+                    if row[c] == old[c]:
+                        c += 1
+                        continue
+                    out.append(f"\033[{r + 3};{2 * c + 2}H")
+                    while c < width and row[c] != old[c]: # The cursor advances by itself
+                        out.append(CELL_GLYPHS[row[c]])
+                        c += 1
+            if status != self._status:
+                out.append(f"\033[{height + 4};1H{status}\033[K")
+            out.append(f"\033[{height + 5};1H\033[K") # Park the cursor on a blank line below the frame
+        self._cells, self._status = cells, status
+        self.frames += 1
+        self.out.write("".join(out))
+        self.out.flush()
+        return True
+
+# Real-time play
+GRAVITY_INTERVAL = 0.5 # Seconds per gravity drop
+LOCK_DELAY = 0.5 # Seconds a resting piece waits before it locks
+MAX_LOCK_RESETS = 15 # Moves that may restart the lock delay before the piece locks anyway
+
+# Keys read in raw mode, mapped to actions; arrow keys arrive as escape sequences
+KEY_ACTIONS = {
+    'a': ACTION_LEFT, 'd': ACTION_RIGHT, 'w': ACTION_ROTATE, 's': ACTION_DOWN,
+    '\033[D': ACTION_LEFT, '\033[C': ACTION_RIGHT, '\033[A': ACTION_ROTATE, '\033[B': ACTION_DOWN,
+}
+QUIT_KEYS = ('q', '\003')
+
+def percentile(values, p):
+    """p-th percentile (0-100) of values by nearest rank, or None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+class FixedTimestep:
+    """
+    Schedules steps every `interval` seconds from `start`. due(now) returns
+    how many steps have come due since the last call; step k is due at
+    start + k * interval, so a late caller catches up without drift. When more
+    than max_catch_up steps are due at once (the process was suspended, say)
+    the extra ones are counted in `dropped` and the schedule restarts at now.
+    """
+
+    def __init__(self, interval, start, max_catch_up=5):
+        self.interval = interval
+        self.max_catch_up = max_catch_up
+        self.restart(start)
+        self.dropped = 0
+
+    def restart(self, now):
+        """Makes the next step due one interval after now."""
+        self.start, self.step_count = now, 1
+
+    @property
+    def next_time(self):
+        return self.start + self.step_count * self.interval
+
+    def due(self, now):
+        if now < self.next_time:
+            return 0
+        steps = int((now - self.start) / self.interval) - self.step_count + 1
+        if steps > self.max_catch_up:
+            self.dropped += steps - self.max_catch_up
+            self.restart(now)
+            return self.max_catch_up
+        self.step_count += steps
+        return steps
+
+class TerminalKeys:
+    """
+    Context manager that puts a terminal in cbreak mode (keys are delivered
+    as they are pressed, without echo) and restores it on exit. Calling it
+    waits up to `timeout` seconds for input and returns the keys read, with
+    arrow-key escape sequences kept whole.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = sys.stdin if stream is None else stream
+        self._saved = None
+
+    def __enter__(self):
+        self.fd = self.stream.fileno()
+        self._saved = termios.tcgetattr(self.fd)
+        tty.setcbreak(self.fd)
+        return self
+
+    def __exit__(self, *exc):
+        termios.tcsetattr(self.fd, termios.TCSADRAIN, self._saved)
+
+    def __call__(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not ready:
+            return []
+        data = os.read(self.fd, 64).decode(errors='ignore')
+        keys, i = [], 0
+        while i < len(data):
+            if data.startswith('\033[', i) and i + 2 < len(data):
+                keys.append(data[i:i + 3])
+                i += 3
             else:
-                fix_piece_to_board(board, current_piece)
-                board, lines_cleared_count = clear_lines(board)
-                
-                # Update score based on lines cleared
-                if lines_cleared_count == 1:
-                    score += 100
-                elif lines_cleared_count == 2:
-                    score += 300
-                elif lines_cleared_count == 3:
-                    score += 500
-                elif lines_cleared_count >= 4: # Tetris or more
-                    score += 800
-                
-                if lines_cleared_count > 0:
-                    # Potentially increase speed or score multiplier here
-                    pass
-                current_piece = new_tetrimino()
-                if check_collision(board, current_piece): # Check collision for the new piece
-                    game_over = True
-                    draw_board(board, None, score) # Draw final board state without current piece
-                    print("GAME OVER!")
-                    break # Exit main loop
-        
-        # Draw the board and current piece state before asking for input
-        if not game_over:
-            draw_board(board, current_piece, score)
-
-        # --- Process Player Input ---
-        # Using blocking input() for console playability.
-        if not game_over: # Only ask for input if game is still running
-            action = input("Action: ").lower()
+                keys.append(data[i])
+                i += 1
+        return keys
+
+class RealtimeLoop:
+    """
+    Runs a Game in real time. Gravity follows a FixedTimestep; a piece that
+    cannot fall locks once it has rested for lock_delay seconds, and each
+    move or rotation while resting restarts that delay up to max_lock_resets
+    times. Between events the loop waits in read_keys(timeout), so input is
+    handled as soon as it arrives.
+
+    Frames go through the renderer's frame-rate cap. For every key, the time
+    from reading it to the first frame drawn after it was handled is kept in
+    `latencies` (seconds).
+    """
+
+    def __init__(self, game, renderer, read_keys, clock=time.monotonic,
+                 gravity_interval=GRAVITY_INTERVAL, lock_delay=LOCK_DELAY, max_lock_resets=MAX_LOCK_RESETS,
+                 instrument=NULL_INSTRUMENT):
+        self.game = game
+        self.renderer = renderer
+        self.read_keys = read_keys
+        self.instrument = instrument
+        self.clock = clock
+        self.gravity = FixedTimestep(gravity_interval, clock())
+        self.lock_delay = lock_delay
+        self.max_lock_resets = max_lock_resets
+        self.latencies = []
+        self.quit = False
+        self._landed_at = None # When the falling piece came to rest, or None while it can fall
+        self._lock_resets = 0
+        self._pieces = game.pieces
+        self._pending = [] # Read times of keys not yet shown on screen
+        self._dirty = True
+
+    def _resting(self):
+        piece = self.game.current_piece
+        return check_collision(self.game.board, piece, new_y=piece.y + 1)
+
+    def _new_piece(self):
+        """Resets lock-delay state if a new piece has spawned since the last check."""
+        if self.game.pieces != self._pieces:
+            self._pieces = self.game.pieces
+            self._landed_at, self._lock_resets = None, 0
+
+    def handle_key(self, key, now):
+        """Applies one key; returns False for a quit key."""
+        if key in QUIT_KEYS:
+            self.quit = True
+            return False
+        action = KEY_ACTIONS.get(key, KEY_ACTIONS.get(key.lower()))
+        if action is None:
+            return True
+        piece = self.game.current_piece
+        before = (piece.rotation, piece.x, piece.y)
+        self.game.step(action)
+        self._new_piece()
+        if (piece.rotation, piece.x, piece.y) != before and self._landed_at is not None:
+            if self._lock_resets < self.max_lock_resets:
+                self._lock_resets += 1
+                self._landed_at = now
+        self._dirty = True
+        return True
+
+    def update(self, now):
+        """Runs the gravity steps and lock that are due at now."""
+        game = self.game
+        for _ in range(self.gravity.due(now)):
+            if game.game_over:
+                return
+            if not self._resting():
+                game.tick()
+                self._dirty = True
+        if game.game_over:
+            return
+        if not self._resting():
+            self._landed_at = None
+        elif self._landed_at is None:
+            self._landed_at = now
+        elif now - self._landed_at >= self.lock_delay:
+            game.tick() # The piece cannot fall, so this locks it
+            self._new_piece()
+            self.gravity.restart(now)
+            self._dirty = True
+
+    def _next_deadline(self, now):
+        deadline = self.gravity.next_time
+        if self._landed_at is not None:
+            deadline = min(deadline, self._landed_at + self.lock_delay)
+        if self._dirty and self.renderer.last_draw is not None:
+            deadline = min(deadline, self.renderer.last_draw + self.renderer.min_interval)
+        return max(0.0, deadline - now)
+
+    def draw(self):
+        if not self._dirty:
+            return
+        game = self.game
+        piece = None if game.game_over else game.current_piece
+        if self.renderer.draw(game.board, piece, f"Score: {game.score}  Lines: {game.lines}"):
+            self._dirty = False
+            if self._pending:
+                drawn = self.clock()
+                for t in self._pending:
+                    self.latencies.append(drawn - t)
+                    self.instrument.record('input_to_draw', drawn - t)
+                self._pending.clear()
+
+    def run_once(self):
+        """Waits for input or the next scheduled event, then updates and draws."""
+        instrument = self.instrument
+        instrument.frame_start()
+        keys = self.read_keys(self._next_deadline(self.clock()))
+        instrument.mark('input')
+        now = self.clock()
+        for key in keys:
+            if not self.handle_key(key, now):
+                instrument.frame_end()
+                return
+            self._pending.append(now)
+        self.update(self.clock())
+        instrument.mark('simulation')
+        self.draw()
+        instrument.mark('render')
+        instrument.frame_end()
+
+    def run(self):
+        """Plays until game over or a quit key."""
+        self.draw()
+        while not self.game.game_over and not self.quit:
+            self.run_once()
+        self._dirty = True
+        self.draw()
+
+# Headless self-play
+SIMULATE_MAX_PIECES = 10000 # Games still running after this many pieces are stopped
+
+# One simulated game: its seed, results and wall-clock seconds
+GameResult = namedtuple('GameResult', 'seed score lines pieces duration')
 
+def random_policy(game, rng):
+    """Picks any reachable placement of the falling piece."""
+    return rng.choice(enumerate_placements(game.board, game.current_piece))
+
+def lowest_policy(game, rng):
+    """Picks a placement that rests as low as possible, breaking ties at random."""
+    rotations = PIECE_TABLE[game.current_piece.shape_name]
+    placements = enumerate_placements(game.board, game.current_piece)
+    bottoms = [y + rotations[rotation].height for rotation, x, y in placements]
+    deepest = max(bottoms)
+    return rng.choice([p for p, bottom in zip(placements, bottoms) if bottom == deepest])
+
+POLICIES = {'random': random_policy, 'lowest': lowest_policy}
+
+def resolve_policy(spec):
+    """
+    Returns the policy named by spec: a key of POLICIES or 'module:function'.
+    A policy is called as policy(game, rng) and returns a (rotation, x, y)
+    placement for game.current_piece; rng is a random.Random seeded per game.
+    """
+    if spec in POLICIES:
+        return POLICIES[spec]
+    module_name, sep, attr = spec.partition(':')
+    if not sep:
+        raise ValueError(f"unknown policy {spec!r}; use one of {sorted(POLICIES)} or module:function")
+    import importlib
+    return getattr(importlib.import_module(module_name), attr)
+
+def game_seed(seed, index):
+    """Seed of game number index in a run started with seed."""
+    return seed << 32 | index
+
+def play_game(seed, policy, max_pieces=SIMULATE_MAX_PIECES, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """Plays one headless game with policy and returns its GameResult."""
+    start = time.perf_counter()
+    game = Game(width=width, height=height, seed=seed)
+    rng = random.Random(seed)
+    while not game.game_over and game.pieces < max_pieces:
+        game.apply(*policy(game, rng), undoable=False)
+    return GameResult(seed, game.score, game.lines, game.pieces, time.perf_counter() - start)
+
+_worker_args = None
+
+def _init_worker(policy_spec, max_pieces, width, height):
+    global _worker_args
+    _worker_args = (resolve_policy(policy_spec), max_pieces, width, height)
+
+def _play_chunk(chunk):
+    seed, start, stop = chunk
+    return [play_game(game_seed(seed, i), *_worker_args) for i in range(start, stop)]
+
+def simulate(games, workers=1, seed=0, policy='lowest', max_pieces=SIMULATE_MAX_PIECES,
+             width=BOARD_WIDTH, height=BOARD_HEIGHT, chunk_size=None):
+    """
+    Plays `games` headless games and yields lists of GameResult as chunks
+    finish (in completion order). Game i is seeded with game_seed(seed, i),
+    so results don't depend on the number of workers. With workers > 1 the
+    games run on a process pool whose workers are started once and resolve
+    the policy (a POLICIES name or 'module:function') once.
+    """
+    if chunk_size is None:
+        chunk_size = max(1, min(256, games // (workers * 8)))
+    chunks = [(seed, start, min(start + chunk_size, games)) for start in range(0, games, chunk_size)]
+    if workers <= 1:
+        _init_worker(policy, max_pieces, width, height)
+        for chunk in chunks:
+            yield _play_chunk(chunk)
+        return
+    import multiprocessing
+    with multiprocessing.Pool(workers, _init_worker, (policy, max_pieces, width, height)) as pool:
+        yield from pool.imap_unordered(_play_chunk, chunks)
+
+def summarize(results, elapsed):
+    """Summary statistics of a list of GameResult played in elapsed wall-clock seconds."""
+    scores = sorted(r.score for r in results)
+    n = len(results)
+    pieces = sum(r.pieces for r in results)
+    mean = sum(scores) / n
+    return {
+        'games': n,
+        'score_mean': mean,
+        'score_stdev': (sum((s - mean) ** 2 for s in scores) / n) ** 0.5,
+        'score_min': scores[0],
+        'score_p50': percentile(scores, 50),
+        'score_p90': percentile(scores, 90),
+        'score_max': scores[-1],
+        'lines_mean': sum(r.lines for r in results) / n,
+        'pieces_mean': pieces / n,
+        'game_seconds_mean': sum(r.duration for r in results) / n,
+        'games_per_second': n / elapsed if elapsed else float('inf'),
+        'pieces_per_second': pieces / elapsed if elapsed else float('inf'),
+    }
+
+def simulate_main(argv):
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(prog='tetris.py simulate', description="Play headless games in parallel.")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--policy', default='lowest', help=f"one of {sorted(POLICIES)} or module:function")
+    parser.add_argument('--max-pieces', type=int, default=SIMULATE_MAX_PIECES)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--output', help="write one JSON line per game to this file")
+    args = parser.parse_args(argv)
+    resolve_policy(args.policy) # Fail here rather than in every worker
+
+    out = open(args.output, 'w') if args.output else None
+    results = []
+    start = time.perf_counter()
+    try:
+        for chunk in simulate(args.games, args.workers, args.seed, args.policy, args.max_pieces,
+                              chunk_size=args.chunk_size):
+            results.extend(chunk)
+            if out:
+                out.write(''.join(json.dumps(r._asdict()) + '\n' for r in chunk))
+            print(f"\r{len(results)}/{args.games} games", end='', file=sys.stderr, flush=True)
+    finally:
+        if out:
+            out.close()
+    print(file=sys.stderr)
+    if results:
+        for key, value in summarize(results, time.perf_counter() - start).items():
+            print(f"{key:>18}: {value:.2f}" if isinstance(value, float) else f"{key:>18}: {value}")
+
+# Main game loop structure
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['simulate']:
+        simulate_main(argv[1:])
+        return
+    import argparse
+    parser = argparse.ArgumentParser(description="Play Tetris in the terminal. 'simulate --help' for self-play.")
+    parser.add_argument('--instrument', action='store_true', help="time frames and hot functions; report on exit")
+    parser.add_argument('--instrument-json', metavar='PATH', help="also write snapshots of the timings to PATH")
+    parser.add_argument('--instrument-interval', type=float, default=5.0, help="seconds between snapshots")
+    args = parser.parse_args(argv)
+
+    instrument = NULL_INSTRUMENT
+    if args.instrument or args.instrument_json:
+        from tetris_instrument import Instrumentation
+        instrument = Instrumentation(args.instrument_json, args.instrument_interval)
+        instrument.wrap(sys.modules[__name__])
+
+    game = Game()
+    renderer = Renderer()
+
+    if termios is not None and sys.stdin.isatty():
+        loop = RealtimeLoop(game, renderer, None, instrument=instrument)
+        renderer.out.write("\033[?25l") # Hide the cursor while playing
+        try:
+            with TerminalKeys() as keys:
+                loop.read_keys = keys
+                loop.run()
+        finally:
+            renderer.out.write("\033[?25h")
+        if loop.latencies:
+            print(f"Input latency: p50 {percentile(loop.latencies, 50) * 1000:.1f} ms, "
+                  f"p99 {percentile(loop.latencies, 99) * 1000:.1f} ms over {len(loop.latencies)} keys")
+        if loop.gravity.dropped:
+            print(f"Gravity steps dropped while catching up: {loop.gravity.dropped}")
+    else:
+        # Line input for pipes and terminals without termios: input blocks,
+        # and the gravity drops that came due meanwhile run after each line.
+        gravity = FixedTimestep(GRAVITY_INTERVAL, time.monotonic())
+        while not game.game_over:
+            instrument.frame_start()
+            renderer.draw(game.board, game.current_piece, f"Score: {game.score}", force=True)
+            instrument.mark('render')
+            try:
+                action = input("Action: ").lower()
+            except EOFError: # Input ended, e.g. the end of a pipe: quit
+                print()
+                action = 'q'
+            instrument.mark('input')
             if action == 'q':
-                game_over = True
                 print("Quitting game.")
-                # break # Will be caught by the loop condition
-            elif action == 'a': # Move Left
-                if not check_collision(board, current_piece, new_x=current_piece['x'] - 1):
-                    current_piece['x'] -= 1
-            elif action == 'd': # Move Right
-                if not check_collision(board, current_piece, new_x=current_piece['x'] + 1):
-                    current_piece['x'] += 1
-            elif action == 'w': # Rotate
-                new_rot = (current_piece['rotation'] + 1) % len(current_piece['shape'])
-                if not check_collision(board, current_piece, new_rotation=new_rot):
-                    current_piece['rotation'] = new_rot
-                elif not check_collision(board, current_piece, new_x=current_piece['x']-1, new_rotation=new_rot): # Wall kick left
-                    current_piece['x'] -=1
-                    current_piece['rotation'] = new_rot
-                elif not check_collision(board, current_piece, new_x=current_piece['x']+1, new_rotation=new_rot): # Wall kick right
-                    current_piece['x'] +=1
-                    current_piece['rotation'] = new_rot
-
-            elif action == 's': # Soft drop
-                if not check_collision(board, current_piece, new_y=current_piece['y'] + 1):
-                    current_piece['y'] += 1
-                    score += 1 # Score for soft drop
-                else: # If soft drop causes collision, fix the piece
-                    fix_piece_to_board(board, current_piece)
-                    board, lines_cleared_count = clear_lines(board)
-                    # Update score based on lines cleared
-                    if lines_cleared_count == 1:
-                        score += 100
-                    elif lines_cleared_count == 2:
-                        score += 300
-                    elif lines_cleared_count == 3:
-                        score += 500
-                    elif lines_cleared_count >= 4:
-                        score += 800
-
-                    if lines_cleared_count > 0:
-                        pass # Speed increase could happen here
-                    current_piece = new_tetrimino()
-                    if check_collision(board, current_piece):
-                        game_over = True
-                        draw_board(board, None, score) # Draw final state
-                        print("GAME OVER!")
-                        # break # Will be caught by loop condition
-            
-            # After player action, redraw immediately if game not over
-            if not game_over:
-                draw_board(board, current_piece, score)
-        
-        # Small pause to make the game playable in console, adjust as needed
-        # This also makes the input prompt more readable as it won't fight with auto-drop render
-        if not game_over: # Avoid sleep if game just ended
-            time.sleep(0.05) 
-
-    # Final score display, happens after loop termination
-    # draw_board(board, None, score) # Ensure final board is shown
-    print(f"Final Score: {score}")
+                break
+            game.step(action)
+            game.tick(gravity.due(time.monotonic()))
+            instrument.mark('simulation')
+            instrument.frame_end()
 
-if __name__ == '__main__':
-    main()
+    if game.game_over:
+        renderer.draw(game.board, None, f"Score: {game.score}", force=True) # Final board without the piece
+        print("GAME OVER!")
+    print(f"Final Score: {game.score}")
+    if instrument.enabled:
+        instrument.unwrap()
+        if args.instrument_json:
+            instrument.export()
+        print(instrument.report())
 
 if __name__ == '__main__':
-    main()
+    # Run the importable module rather than this __main__ copy, so module:function
+    # policies that import tetris see the same classes (BitBoard, Piece, ...).
+    import tetris
+    tetris.main()
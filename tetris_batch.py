@@ -0,0 +1,154 @@
+"""
+Vectorized batch environment: N Tetris games held in one NumPy array and
+stepped together. Collision tests, locking, line clears, scores and
+game-over flags are computed with array operations over all games at once,
+using the piece geometry and scoring rules from tetris.py.
+"""
+import numpy as np
+
+from tetris import (
+    BOARD_WIDTH, BOARD_HEIGHT, PIECE_TABLE, LINE_CLEAR_SCORES, SOFT_DROP_SCORE
+)
+
+SHAPE_NAMES = tuple(PIECE_TABLE)
+
+# Actions for BatchGame.step, as small ints so a whole batch fits in one array
+NOOP, LEFT, RIGHT, ROTATE, DOWN = range(5)
+
+# Rotations are stored modulo 4; shapes with 1 or 2 rotations repeat, so
+# (rotation + 1) % 4 always lands on the same shape as Game's rotate.
+NUM_ROTATIONS = 4
+KICK_OFFSETS = (0, -1, 1)
+
+def _build_cell_table():
+    """(shape, rotation, cell, (row, col)) offsets for every shape in PIECE_TABLE."""
+    cells = np.zeros((len(SHAPE_NAMES), NUM_ROTATIONS, 4, 2), dtype=np.int64)
+    for s, name in enumerate(SHAPE_NAMES):
+        rotations = PIECE_TABLE[name]
+        for rotation in range(NUM_ROTATIONS):
+            cells[s, rotation] = rotations[rotation % len(rotations)].cells
+    return cells
+
+CELL_OFFSETS = _build_cell_table()
+SHAPE_WIDTHS = np.array([PIECE_TABLE[name][0].width for name in SHAPE_NAMES])
+SCORE_TABLE = np.array(LINE_CLEAR_SCORES, dtype=np.int64)
+
+class BatchGame:
+    """
+    N independent games stored as a (N, height, width) bool array plus
+    per-game piece, score and game-over arrays. step() and tick() mirror
+    Game.step() and Game.tick() for every game at once; finished games are
+    frozen until reset().
+    """
+
+    def __init__(self, n, seed=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.n = n
+        self.width, self.height = width, height
+        self.rng = np.random.default_rng(seed)
+        self.spawn_x = width // 2 - SHAPE_WIDTHS // 2
+        self.boards = np.zeros((n, height, width), dtype=bool)
+        self.shape = np.zeros(n, dtype=np.int64)
+        self.rotation = np.zeros(n, dtype=np.int64)
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lines = np.zeros(n, dtype=np.int64)
+        self.pieces = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self._spawn(np.arange(n))
+
+    def reset(self, mask=None):
+        """Restarts the games selected by the bool mask (default: finished games)."""
+        idx = np.flatnonzero(self.game_over if mask is None else mask)
+        self.boards[idx] = False
+        self.score[idx] = 0
+        self.lines[idx] = 0
+        self.pieces[idx] = 0
+        self.game_over[idx] = False
+        self._spawn(idx)
+
+    def _collides(self, idx, shape, rotation, x, y):
+        """Bool array: does each game in idx collide with the given piece placement?"""
+        offsets = CELL_OFFSETS[shape, rotation]
+        rows = y[:, None] + offsets[..., 0]
+        cols = x[:, None] + offsets[..., 1]
+        out_of_bounds = (rows < 0) | (rows >= self.height) | (cols < 0) | (cols >= self.width)
+        hit = self.boards[idx[:, None], rows.clip(0, self.height - 1), cols.clip(0, self.width - 1)]
+        return (out_of_bounds | hit).any(axis=1)
+
+    def _spawn(self, idx):
+        shape = self.rng.integers(len(SHAPE_NAMES), size=len(idx))
+        self.shape[idx] = shape
+        self.rotation[idx] = 0
+        self.x[idx] = self.spawn_x[shape]
+        self.y[idx] = 0
+        self.game_over[idx] = self._collides(idx, shape, self.rotation[idx], self.x[idx], self.y[idx])
+
+    def _lock(self, idx):
+        """Fixes the pieces of games idx, clears lines, scores and spawns. Returns lines per game."""
+        offsets = CELL_OFFSETS[self.shape[idx], self.rotation[idx]]
+        self.boards[idx[:, None], self.y[idx, None] + offsets[..., 0], self.x[idx, None] + offsets[..., 1]] = True
+
+        full = self.boards[idx].all(axis=2)
+        counts = full.sum(axis=1)
+        cleared = counts > 0
+        if cleared.any():
+            games, full = idx[cleared], full[cleared]
+            # Stable sort puts cleared rows first and keeps the rest in order;
+            # the first `count` rows of each board are then blanked.
+            order = np.argsort(~full, axis=1, kind='stable')
+            boards = np.take_along_axis(self.boards[games], order[:, :, None], axis=1)
+            boards[np.arange(self.height)[None, :] < counts[cleared, None]] = False
+            self.boards[games] = boards
+
+        self.pieces[idx] += 1
+        self.lines[idx] += counts
+        self.score[idx] += SCORE_TABLE[np.minimum(counts, len(SCORE_TABLE) - 1)]
+        self._spawn(idx)
+        return counts
+
+    def _try_move(self, idx, dx, dy):
+        """Moves games idx by (dx, dy) where that doesn't collide. Returns the bool mask of moved games."""
+        ok = ~self._collides(idx, self.shape[idx], self.rotation[idx], self.x[idx] + dx, self.y[idx] + dy)
+        moved = idx[ok]
+        self.x[moved] += dx
+        self.y[moved] += dy
+        return ok
+
+    def step(self, actions):
+        """
+        Applies one action per game (NOOP/LEFT/RIGHT/ROTATE/DOWN, an int array of
+        length n). Returns an int array of lines cleared by pieces that locked.
+        """
+        actions = np.asarray(actions)
+        live = ~self.game_over
+        lines_cleared = np.zeros(self.n, dtype=np.int64)
+
+        self._try_move(np.flatnonzero(live & (actions == LEFT)), -1, 0)
+        self._try_move(np.flatnonzero(live & (actions == RIGHT)), 1, 0)
+
+        pending = np.flatnonzero(live & (actions == ROTATE))
+        new_rotation = (self.rotation[pending] + 1) % NUM_ROTATIONS
+        for dx in KICK_OFFSETS:
+            ok = ~self._collides(pending, self.shape[pending], new_rotation, self.x[pending] + dx, self.y[pending])
+            rotated = pending[ok]
+            self.rotation[rotated] = new_rotation[ok]
+            self.x[rotated] += dx
+            pending, new_rotation = pending[~ok], new_rotation[~ok]
+
+        down = np.flatnonzero(live & (actions == DOWN))
+        moved = self._try_move(down, 0, 1)
+        self.score[down[moved]] += SOFT_DROP_SCORE
+        landed = down[~moved]
+        if len(landed):
+            lines_cleared[landed] = self._lock(landed)
+        return lines_cleared
+
+    def tick(self):
+        """Advances gravity by one drop for every live game. Returns lines cleared per game."""
+        live = np.flatnonzero(~self.game_over)
+        lines_cleared = np.zeros(self.n, dtype=np.int64)
+        landed = live[~self._try_move(live, 0, 1)]
+        if len(landed):
+            lines_cleared[landed] = self._lock(landed)
+        return lines_cleared
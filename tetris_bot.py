@@ -0,0 +1,221 @@
+"""
+Heuristic bot: picks a placement for the falling piece by searching over it,
+the preview and (past the preview) the seven possible shapes.
+
+Boards are scored with a weighted sum of BitBoard's cached features plus a
+reward for cleared lines. Known pieces are max nodes, where
+only the beam_width best placements by that score are searched further;
+unknown pieces are chance nodes averaging over every shape (expectimax).
+Searches deepen one piece at a time until `depth` or the time budget runs out,
+and positions already valued are looked up in a transposition cache keyed by
+the board's Zobrist hash.
+
+    python tetris_bot.py --games 5 --depth 2      # decision latency and throughput
+
+As a simulate policy (any module:function works the same way):
+
+    python tetris.py simulate --games 100 --policy tetris_bot:policy
+"""
+import argparse
+import time
+from collections import namedtuple
+
+from tetris import BitBoard, Game, Piece, PIECE_TABLE, SHAPE_NAMES, enumerate_placements, percentile
+
+# Weight per BoardFeatures value, plus `lines` per line cleared by a placement
+Weights = namedtuple('Weights', 'lines aggregate_height max_height holes bumpiness '
+                                'row_transitions column_transitions wells')
+DEFAULT_WEIGHTS = Weights(lines=0.76, aggregate_height=-0.51, max_height=-0.05, holes=-0.36,
+                          bumpiness=-0.18, row_transitions=-0.05, column_transitions=-0.1, wells=-0.05)
+
+LOSS = -1e9 # Value of a position where the next piece cannot spawn
+DEPTH = 2
+BEAM_WIDTH = 6
+CACHE_SIZE = 200000
+
+class _Timeout(Exception):
+    pass
+
+def evaluate(board, weights=DEFAULT_WEIGHTS):
+    """Weighted feature score of a BitBoard (higher is better), without the lines term."""
+    return (weights.aggregate_height * board.aggregate_height
+            + weights.max_height * max(board.heights)
+            + weights.holes * board.hole_count
+            + weights.bumpiness * board.bumpiness
+            + weights.row_transitions * board.row_transitions
+            + weights.column_transitions * board.column_transitions
+            + weights.wells * board.wells)
+
+class Bot:
+    """
+    Chooses placements with a depth-limited search. The first `preview`
+    upcoming shapes (default depth - 1) are taken from the game's queue; deeper
+    pieces are averaged over all shapes. time_budget, in seconds per move,
+    stops iterative deepening early; the best move of the deepest completed
+    search is used. A Bot can be passed to simulate() as a policy.
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, depth=DEPTH, beam_width=BEAM_WIDTH, time_budget=None,
+                 preview=None, cache_size=CACHE_SIZE):
+        self.weights = Weights(*weights)
+        self.depth = depth
+        self.beam_width = beam_width
+        self.time_budget = time_budget
+        self.preview = depth - 1 if preview is None else preview
+        self.cache_size = cache_size
+        self.cache = {} # (zobrist, known shapes, depth) -> value
+        self.nodes = self.cache_hits = 0
+        self.completed_depths = []
+        self._deadline = None
+
+    def __call__(self, game, rng=None):
+        return self.choose(game)
+
+    def _ranked(self, board, piece):
+        """
+        (value, lines reward, placement) for every placement of piece, best first,
+        where value is the reward plus the static score of the resulting board.
+        """
+        weights = self.weights
+        name = piece.shape_name
+        rotations = PIECE_TABLE[name]
+        masks = board.masks
+        ranked = []
+        for placement in enumerate_placements(board, piece):
+            rotation, x, y = placement
+            piece_masks = masks[(name, rotation, x)]
+            board.fix(piece_masks, y)
+            cleared = board.clear_rows(range(y, y + rotations[rotation].height))
+            reward = weights.lines * len(cleared)
+            ranked.append((reward + evaluate(board, weights), reward, placement))
+            board.restore_rows(cleared)
+            board.unfix(piece_masks, y)
+        ranked.sort(key=lambda entry: entry[0], reverse=True)
+        return ranked
+
+    def _max_node(self, board, piece, shapes, depth):
+        """(value, placement) of the best placement of piece, searching depth pieces deep."""
+        self.nodes += 1
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _Timeout
+        ranked = self._ranked(board, piece)
+        if not ranked:
+            return LOSS, None
+        if depth == 1:
+            return ranked[0][0], ranked[0][2]
+        name = piece.shape_name
+        rotations = PIECE_TABLE[name]
+        best = (LOSS, None)
+        for _, reward, placement in ranked[:self.beam_width]:
+            rotation, x, y = placement
+            piece_masks = board.masks[(name, rotation, x)]
+            board.fix(piece_masks, y)
+            cleared = board.clear_rows(range(y, y + rotations[rotation].height))
+            try:
+                value = reward + self._value(board, shapes, depth - 1)
+            finally:
+                board.restore_rows(cleared)
+                board.unfix(piece_masks, y)
+            if value > best[0] or best[1] is None:
+                best = (value, placement)
+        return best
+
+    def _spawn(self, board, name):
+        """The spawned piece, or None if it collides (game over)."""
+        piece = Piece.spawn(name, board.width)
+        return None if board.collides(board.masks[(name, 0, piece.x)], 0) else piece
+
+    def _value(self, board, shapes, depth):
+        """Value of board before the next piece: shapes[0] if known, else the average over all shapes."""
+        key = (board.zobrist, shapes, depth)
+        value = self.cache.get(key)
+        if value is not None:
+            self.cache_hits += 1
+            return value
+        if shapes:
+            piece = self._spawn(board, shapes[0])
+            value = LOSS if piece is None else self._max_node(board, piece, shapes[1:], depth)[0]
+        else:
+            total = 0.0
+            for name in SHAPE_NAMES:
+                piece = self._spawn(board, name)
+                total += LOSS if piece is None else self._max_node(board, piece, (), depth)[0]
+            value = total / len(SHAPE_NAMES)
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[key] = value
+        return value
+
+    def choose(self, game):
+        """Returns the (rotation, x, y) placement for game.current_piece, for Game.apply()."""
+        board = game.board if isinstance(game.board, BitBoard) else BitBoard.from_rows(game.board)
+        shapes = game.preview(self.preview) if self.preview else ()
+        piece = game.current_piece
+        self._deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        best, completed = None, 0
+        for depth in range(1, self.depth + 1):
+            try:
+                value, placement = self._max_node(board, piece, shapes[:depth - 1], depth)
+            except _Timeout:
+                break
+            best, completed = placement, depth
+        if best is None: # Out of time before even depth 1 finished: take the first placement
+            best = enumerate_placements(board, piece)[0]
+        self.completed_depths.append(completed)
+        self._deadline = None
+        return best
+
+_policy_bot = None
+
+def policy(game, rng):
+    """simulate() policy using a Bot with the default settings, one per process."""
+    global _policy_bot
+    if _policy_bot is None:
+        _policy_bot = Bot()
+    return _policy_bot.choose(game)
+
+def benchmark(games=3, seed=0, max_pieces=500, **bot_options):
+    """Plays games with a Bot and returns decision latency and throughput figures."""
+    bot = Bot(**bot_options)
+    latencies = []
+    pieces = lines = 0
+    start = time.perf_counter()
+    for i in range(games):
+        game = Game(seed=seed + i)
+        while not game.game_over and game.pieces < max_pieces:
+            t = time.perf_counter()
+            placement = bot.choose(game)
+            latencies.append(time.perf_counter() - t)
+            game.apply(*placement, undoable=False)
+        pieces += game.pieces
+        lines += game.lines
+    elapsed = time.perf_counter() - start
+    return {
+        'games': games,
+        'pieces': pieces,
+        'lines': lines,
+        'decisions_per_second': len(latencies) / elapsed,
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+        'latency_max_ms': max(latencies) * 1000,
+        'nodes_per_decision': bot.nodes / len(latencies),
+        'cache_hit_rate': bot.cache_hits / max(1, bot.cache_hits + bot.nodes),
+        'mean_completed_depth': sum(bot.completed_depths) / len(bot.completed_depths),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the heuristic Tetris bot.")
+    parser.add_argument('--games', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-pieces', type=int, default=500)
+    parser.add_argument('--depth', type=int, default=DEPTH)
+    parser.add_argument('--beam-width', type=int, default=BEAM_WIDTH)
+    parser.add_argument('--budget', type=float, default=None, help="seconds per move")
+    args = parser.parse_args(argv)
+    report = benchmark(args.games, args.seed, args.max_pieces, depth=args.depth,
+                       beam_width=args.beam_width, time_budget=args.budget)
+    for key, value in report.items():
+        print(f"{key:>22}: {value:.2f}" if isinstance(value, float) else f"{key:>22}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Memory-mapped datasets of (board, piece, action, reward) records for training.
+
+A dataset `path` is three files:
+
+  path.bin        fixed-size records (see record_dtype), preallocated and grown
+                  in chunks as records are appended, read through np.memmap
+  path.json       width, height, record count and capacity (the file is trimmed
+                  to the records written on close)
+  path.index.npy  record offset where each game starts
+
+Boards are bit-packed: cell (r, c) is bit r * width + c, little-endian, so a
+10x20 board takes 25 bytes. The writer appends through a small staging buffer;
+the reader maps the file read-only and only touches the pages of the records
+it samples, so datasets larger than RAM can be used directly.
+
+    python tetris_dataset.py export data/bot --games 1000 --policy tetris_bot:policy
+    python tetris_dataset.py info data/bot
+"""
+import argparse
+import json
+import os
+import random
+
+import numpy as np
+
+from tetris import BOARD_WIDTH, BOARD_HEIGHT, SHAPE_NAMES, Game, game_seed, resolve_policy, SIMULATE_MAX_PIECES
+
+GROW_RECORDS = 1 << 16 # Records added to the file each time it fills up
+STAGING_RECORDS = 4096 # Records buffered in memory before they are copied to the file
+
+def record_dtype(width, height):
+    """NumPy dtype of one record for boards of width x height."""
+    return np.dtype([
+        ('board', np.uint8, ((width * height + 7) // 8,)), # Board before the piece was placed
+        ('shape', np.uint8), # Index into SHAPE_NAMES
+        ('rotation', np.uint8), # Action: where the piece was placed
+        ('x', np.int16),
+        ('y', np.int16),
+        ('reward', np.float32), # Score gained by the placement
+    ])
+
+def pack_board(board):
+    """Bit-packs a BitBoard into the bytes of a record's board field."""
+    width = board.width
+    packed = 0
+    for r, row in enumerate(board.rows):
+        if row:
+            packed |= row << (r * width)
+    return packed.to_bytes((width * board.height + 7) // 8, 'little')
+
+def unpack_boards(packed, width, height):
+    """(N, height, width) uint8 cells from an (N, nbytes) array of packed boards."""
+    bits = np.unpackbits(packed, axis=-1, count=width * height, bitorder='little')
+    return bits.reshape(packed.shape[:-1] + (height, width))
+
+def _paths(path):
+    return path + '.bin', path + '.json', path + '.index.npy'
+
+class DatasetWriter:
+    """
+    Appends records to a dataset, creating it or (with append=True) adding to
+    an existing one. Call end_game() after each game's records and close()
+    (or use it as a context manager) to write the count and index.
+    """
+
+    def __init__(self, path, width=BOARD_WIDTH, height=BOARD_HEIGHT, append=False):
+        self.path = path
+        bin_path, meta_path, index_path = _paths(path)
+        if append and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            width, height = meta['width'], meta['height']
+            self.count, self.capacity = meta['count'], meta['capacity']
+            self.game_starts = np.load(index_path).tolist()
+        else:
+            self.count = self.capacity = 0
+            self.game_starts = []
+            open(bin_path, 'wb').close()
+        self.width, self.height = width, height
+        self.dtype = record_dtype(width, height)
+        self._file = open(bin_path, 'r+b')
+        self._records = None
+        self._map(self.capacity)
+        self._staging = np.zeros(STAGING_RECORDS, self.dtype)
+        self._staged = 0
+        self._game_start = self.count
+
+    def _map(self, capacity):
+        """Grows the file to capacity records and maps it."""
+        if self._records is not None:
+            self._records.flush()
+            del self._records
+        self._file.truncate(capacity * self.dtype.itemsize)
+        self.capacity = capacity
+        self._records = np.memmap(self._file, self.dtype, mode='r+', shape=(capacity,)) if capacity else None
+
+    def _flush_staging(self):
+        n = self._staged
+        if not n:
+            return
+        if self.count + n > self.capacity:
+            self._map(max(self.count + n, self.capacity + GROW_RECORDS))
+        self._records[self.count:self.count + n] = self._staging[:n]
+        self.count += n
+        self._staged = 0
+
+    def add(self, board, shape_name, rotation, x, y, reward):
+        """Appends one record: the BitBoard before the placement, the shape, the placement and its reward."""
+        self.add_packed(pack_board(board), shape_name, rotation, x, y, reward)
+
+    def add_packed(self, packed_board, shape_name, rotation, x, y, reward):
+        """add() with the board already packed by pack_board()."""
+        if self._staged == STAGING_RECORDS:
+            self._flush_staging()
+        record = self._staging[self._staged]
+        record['board'] = np.frombuffer(packed_board, np.uint8)
+        record['shape'] = SHAPE_NAMES.index(shape_name)
+        record['rotation'], record['x'], record['y'], record['reward'] = rotation, x, y, reward
+        self._staged += 1
+
+    def end_game(self):
+        """Marks the records added since the last end_game() as one game."""
+        if self.count + self._staged > self._game_start:
+            self.game_starts.append(self._game_start)
+            self._game_start = self.count + self._staged
+
+    def close(self):
+        """Flushes staged records, trims the preallocated space and writes the metadata and index."""
+        self._flush_staging()
+        if self._records is not None:
+            self._records.flush()
+            del self._records
+            self._records = None
+        self._file.truncate(self.count * self.dtype.itemsize)
+        self.capacity = self.count
+        self._file.close()
+        bin_path, meta_path, index_path = _paths(self.path)
+        np.save(index_path, np.array(self.game_starts, dtype=np.uint64))
+        with open(meta_path, 'w') as f:
+            json.dump({'width': self.width, 'height': self.height,
+                       'count': self.count, 'capacity': self.capacity}, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Dataset:
+    """Read-only, memory-mapped view of a dataset written by DatasetWriter."""
+
+    def __init__(self, path):
+        bin_path, meta_path, index_path = _paths(path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.width, self.height = meta['width'], meta['height']
+        self.dtype = record_dtype(self.width, self.height)
+        self.records = np.memmap(bin_path, self.dtype, mode='r', shape=(meta['count'],)) if meta['count'] else \
+            np.zeros(0, self.dtype)
+        self.game_starts = np.load(index_path, mmap_mode='r')
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def games(self):
+        return len(self.game_starts)
+
+    def game(self, i):
+        """The records of game i, as a view into the mapped file."""
+        stop = self.game_starts[i + 1] if i + 1 < len(self.game_starts) else len(self.records)
+        return self.records[int(self.game_starts[i]):int(stop)]
+
+    def sample(self, batch_size, rng=None):
+        """
+        A random minibatch as a dict of arrays: 'board' (B, height, width)
+        uint8 cells, plus 'shape', 'rotation', 'x', 'y' and 'reward'. Only
+        the sampled records are read from the file.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        index = np.sort(rng.integers(len(self.records), size=batch_size)) # Sorted for sequential page access
+        batch = self.records[index]
+        out = {name: batch[name] for name in self.dtype.names if name != 'board'}
+        out['board'] = unpack_boards(batch['board'], self.width, self.height)
+        return out
+
+def export_games(path, games, policy='lowest', seed=0, max_pieces=SIMULATE_MAX_PIECES,
+                 width=BOARD_WIDTH, height=BOARD_HEIGHT, append=False):
+    """Plays games with a simulate() policy and records every placement. Returns the record count."""
+    policy = resolve_policy(policy)
+    with DatasetWriter(path, width, height, append) as writer:
+        for i in range(games):
+            game = Game(width=writer.width, height=writer.height, seed=game_seed(seed, i))
+            rng = random.Random(game.seed)
+            while not game.game_over and game.pieces < max_pieces:
+                shape, score = game.current_piece.shape_name, game.score
+                rotation, x, y = policy(game, rng)
+                packed = pack_board(game.board) # Before apply() changes the board
+                game.apply(rotation, x, y, undoable=False)
+                writer.add_packed(packed, shape, rotation, x, y, game.score - score)
+            writer.end_game()
+    return writer.count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or inspect Tetris training datasets.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="play games and record every placement")
+    export.add_argument('path')
+    export.add_argument('--games', type=int, default=100)
+    export.add_argument('--policy', default='lowest')
+    export.add_argument('--seed', type=int, default=0)
+    export.add_argument('--max-pieces', type=int, default=SIMULATE_MAX_PIECES)
+    export.add_argument('--append', action='store_true')
+    info = commands.add_parser('info', help="print a dataset's size")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+    if args.command == 'export':
+        count = export_games(args.path, args.games, args.policy, args.seed, args.max_pieces, append=args.append)
+        print(f"{count} records")
+    else:
+        dataset = Dataset(args.path)
+        size = os.path.getsize(args.path + '.bin')
+        print(f"{len(dataset)} records in {dataset.games} games, {dataset.width}x{dataset.height}, "
+              f"{dataset.dtype.itemsize} bytes per record, {size} bytes on disk")
+
+if __name__ == '__main__':
+    main()
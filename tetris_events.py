@@ -0,0 +1,168 @@
+"""
+Event logs for Game's event stream.
+
+EventLog is a Game listener that hands events to a background writer thread,
+which encodes them in batches and writes each batch with one write() call, so
+the game loop only ever appends to a deque. Two formats are supported:
+
+  ndjson  one JSON object per line: {"kind", "ticks", <EVENT_FIELDS of the kind>,
+          "session" if set}
+  binary  b'TEVL', version byte 1, then per event: kind index (one byte),
+          ticks and each field as varints (signed fields zigzagged, shapes as
+          SHAPE_NAMES indices, row lists as a count followed by the rows)
+
+    with EventLog('game.ndjson', session='table-7') as log:
+        game = Game(listeners=[log])
+        ...
+
+read_events() reads either format back as GameEvent tuples.
+"""
+import collections
+import json
+import threading
+
+from tetris import EVENT_FIELDS, GameEvent, SHAPE_NAMES
+from tetris_replay import read_varint, write_varint, zigzag, unzigzag
+
+MAGIC = b'TEVL'
+VERSION = 1
+EVENT_KINDS = tuple(EVENT_FIELDS)
+BATCH_SIZE = 512 # Pending events that wake the writer before its flush interval
+FLUSH_INTERVAL = 0.25 # Longest time an event waits before it is written, in seconds
+MAX_PENDING = 1 << 20 # Events beyond this many unwritten ones are dropped (and counted)
+
+def drain(events):
+    """Yields and removes the events collected in a deque from Game.event_queue()."""
+    while events:
+        yield events.popleft()
+
+def encode_ndjson(event, session=None):
+    record = {'kind': event.kind, 'ticks': event.ticks}
+    record.update(zip(EVENT_FIELDS[event.kind], event.data))
+    if session is not None:
+        record['session'] = session
+    return json.dumps(record, separators=(',', ':')) + '\n'
+
+def encode_binary(buf, event):
+    """Appends the binary encoding of event to the bytearray buf."""
+    buf.append(EVENT_KINDS.index(event.kind))
+    write_varint(buf, event.ticks)
+    for name, value in zip(EVENT_FIELDS[event.kind], event.data):
+        if name == 'shape':
+            buf.append(SHAPE_NAMES.index(value))
+        elif name == 'rows':
+            write_varint(buf, len(value))
+            for row in value:
+                write_varint(buf, row)
+        else:
+            write_varint(buf, zigzag(value))
+
+def _decode_binary(data):
+    pos = len(MAGIC) + 1
+    while pos < len(data):
+        kind = EVENT_KINDS[data[pos]]
+        ticks, pos = read_varint(data, pos + 1)
+        values = []
+        for name in EVENT_FIELDS[kind]:
+            if name == 'shape':
+                values.append(SHAPE_NAMES[data[pos]])
+                pos += 1
+            elif name == 'rows':
+                count, pos = read_varint(data, pos)
+                rows = []
+                for _ in range(count):
+                    row, pos = read_varint(data, pos)
+                    rows.append(row)
+                values.append(tuple(rows))
+            else:
+                value, pos = read_varint(data, pos)
+                values.append(unzigzag(value))
+        yield GameEvent(kind, ticks, tuple(values))
+
+def read_events(path):
+    """Yields the GameEvents stored in an NDJSON or binary event log."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data.startswith(MAGIC):
+        yield from _decode_binary(data)
+        return
+    for line in data.splitlines():
+        record = json.loads(line)
+        kind = record['kind']
+        yield GameEvent(kind, record['ticks'], tuple(
+            tuple(record[name]) if name == 'rows' else record[name] for name in EVENT_FIELDS[kind]))
+
+class EventLog:
+    """
+    Game listener that appends events to a file from a background thread.
+    Calling it only appends to a deque (and wakes the writer once BATCH_SIZE
+    events are pending); the writer encodes whatever is pending at least
+    every flush_interval seconds and writes it in one call. close() writes
+    the rest and stops the thread. Files are opened for appending.
+    """
+
+    def __init__(self, path, format='ndjson', session=None, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING):
+        if format not in ('ndjson', 'binary'):
+            raise ValueError(f"unknown event log format {format!r}")
+        self.format = format
+        self.session = session
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = self.dropped = 0
+        self._pending = collections.deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = open(path, 'ab')
+        if format == 'binary' and self._file.tell() == 0:
+            self._file.write(MAGIC + bytes([VERSION]))
+        self._thread = threading.Thread(target=self._run, name='EventLog writer', daemon=True)
+        self._thread.start()
+
+    def __call__(self, event):
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        pending.append(event)
+        if len(pending) == BATCH_SIZE:
+            self._wake.set()
+
+    def _encode(self, events):
+        if self.format == 'ndjson':
+            session = self.session
+            return ''.join([encode_ndjson(event, session) for event in events]).encode()
+        buf = bytearray()
+        for event in events:
+            encode_binary(buf, event)
+        return bytes(buf)
+
+    def _write_pending(self):
+        pending = self._pending
+        events = [pending.popleft() for _ in range(len(pending))]
+        if events:
+            self._file.write(self._encode(events))
+            self._file.flush()
+            self.written += len(events)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write_pending()
+        self._write_pending()
+
+    def close(self):
+        """Writes all pending events, stops the writer thread and closes the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
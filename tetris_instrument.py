@@ -0,0 +1,182 @@
+"""
+Optional instrumentation for the game loop and hot functions.
+
+An Instrumentation splits each frame of RealtimeLoop into input wait,
+simulation and rendering, records frame times and input-to-draw latency in
+log-bucketed histograms, and can wrap module functions and methods
+(check_collision, BitBoard.collides, ...) to count calls and their cumulative
+time. Snapshots can be
+written to JSON periodically and a report printed on exit.
+
+When instrumentation is off the loop holds NULL_INSTRUMENT, whose methods do
+nothing, and no function is wrapped, so the cost is a few empty method calls
+per frame.
+
+    python tetris.py --instrument                         # report on exit
+    python tetris.py --instrument-json stats.json        # plus a snapshot every 5 s
+"""
+import functools
+import json
+import math
+import os
+import time
+
+BUCKETS_PER_OCTAVE = 8 # Histogram resolution: bucket bounds grow by 2 ** (1/8), about 9%
+HISTOGRAM_FLOOR = 1e-6 # Durations up to 1 µs share the first bucket
+HOT_FUNCTIONS = ('check_collision', 'BitBoard.collides', 'clear_rows', 'clear_lines', 'fix_piece_to_board',
+                 'enumerate_placements')
+EXPORT_INTERVAL = 5.0
+
+class Histogram:
+    """Durations in seconds, counted in logarithmic buckets, with count, total and max kept exactly."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        index = 0 if seconds <= HISTOGRAM_FLOOR else \
+            int(math.log2(seconds / HISTOGRAM_FLOOR) * BUCKETS_PER_OCTAVE) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (0-100), or None when empty."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, HISTOGRAM_FLOOR * 2 ** (index / BUCKETS_PER_OCTAVE))
+        return self.max
+
+    def summary(self):
+        ms = lambda seconds: None if seconds is None else seconds * 1000
+        return {'count': self.count, 'total_ms': self.total * 1000,
+                'p50_ms': ms(self.percentile(50)), 'p99_ms': ms(self.percentile(99)), 'max_ms': self.max * 1000}
+
+class NullInstrumentation:
+    """Does nothing; used when instrumentation is off."""
+    enabled = False
+
+    def frame_start(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def frame_end(self):
+        pass
+
+    def record(self, name, seconds):
+        pass
+
+NULL_INSTRUMENT = NullInstrumentation()
+
+class Instrumentation:
+    """
+    Collects frame phases and function timings. Per frame, call frame_start(),
+    mark(phase) at the end of each phase and frame_end(); with export_path
+    set, frame_end() writes a snapshot every export_interval seconds.
+    """
+    enabled = True
+
+    def __init__(self, export_path=None, export_interval=EXPORT_INTERVAL, clock=time.perf_counter):
+        self.clock = clock
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.histograms = {}
+        self.functions = {} # name -> [calls, cumulative seconds]
+        self.frames = 0
+        self._wrapped = []
+        self._frame_start = self._last = None
+        self._next_export = clock() + export_interval
+
+    def record(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def frame_start(self):
+        self._frame_start = self._last = self.clock()
+
+    def mark(self, phase):
+        now = self.clock()
+        self.record(phase, now - self._last)
+        self._last = now
+
+    def frame_end(self):
+        now = self.clock()
+        self.record('frame', now - self._frame_start)
+        self.frames += 1
+        if self.export_path and now >= self._next_export:
+            self._next_export = now + self.export_interval
+            self.export()
+
+    def wrap(self, module, names=HOT_FUNCTIONS):
+        """
+        Replaces module.<name> for each name with a wrapper counting calls and
+        cumulative (inclusive) time; dotted names such as 'BitBoard.collides'
+        wrap a method on a class of the module. Only calls looked up through
+        the module (or class) are seen, not references taken beforehand.
+        """
+        clock = self.clock
+        for name in names:
+            path, _, attr = name.rpartition('.')
+            owner = functools.reduce(getattr, path.split('.'), module) if path else module
+            func = getattr(owner, attr, None)
+            if func is None:
+                continue
+            stats = self.functions.setdefault(name, [0, 0.0])
+
+            @functools.wraps(func)
+            def wrapper(*args, _func=func, _stats=stats, **kwargs):
+                start = clock()
+                try:
+                    return _func(*args, **kwargs)
+                finally:
+                    _stats[0] += 1
+                    _stats[1] += clock() - start
+            setattr(owner, attr, wrapper)
+            self._wrapped.append((owner, attr, func))
+
+    def unwrap(self):
+        """Restores the functions replaced by wrap()."""
+        for owner, attr, func in reversed(self._wrapped):
+            setattr(owner, attr, func)
+        self._wrapped = []
+
+    def snapshot(self):
+        return {
+            'frames': self.frames,
+            'histograms': {name: h.summary() for name, h in self.histograms.items()},
+            'functions': {name: {'calls': calls, 'total_ms': total * 1000,
+                                 'mean_us': total / calls * 1e6 if calls else 0.0}
+                          for name, (calls, total) in self.functions.items()},
+        }
+
+    def export(self, path=None):
+        """Writes snapshot() as JSON, atomically, to path or export_path."""
+        path = path or self.export_path
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+    def report(self):
+        """The snapshot as a short text table."""
+        snapshot = self.snapshot()
+        lines = [f"{snapshot['frames']} frames"]
+        for name, h in snapshot['histograms'].items():
+            lines.append(f"  {name:<16} n={h['count']:<8} p50 {h['p50_ms']:8.3f} ms  p99 {h['p99_ms']:8.3f} ms  "
+                         f"max {h['max_ms']:8.3f} ms  total {h['total_ms']:10.1f} ms")
+        for name, f in snapshot['functions'].items():
+            lines.append(f"  {name:<22} {f['calls']:>10} calls {f['total_ms']:10.1f} ms  {f['mean_us']:8.2f} µs/call")
+        return '\n'.join(lines)
@@ -0,0 +1,148 @@
+"""
+Load test for tetris_server.py: opens many sessions against a local server,
+plays random actions, and reports tick jitter seen by the clients and how
+many sessions one fully busy server core could carry.
+
+    python tetris_loadtest.py --sessions 500 --duration 10
+
+By default a server is started as a subprocess on a free port; pass --port to
+test a server that is already running (its --tick-rate must match).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from tetris import percentile
+from tetris_server import TICK_RATE, apply_update
+
+class Client:
+    """One session: sends random actions and records when each update arrived."""
+
+    def __init__(self, rng, actions_per_second):
+        self.rng = rng
+        self.interval = 1.0 / actions_per_second
+        self.offsets = [] # Arrival time minus the update's scheduled tick time, before normalising
+        self.rows = []
+        self.updates = self.games = 0
+
+    async def run(self, host, port, tick_interval, deadline):
+        reader, writer = await asyncio.open_connection(host, port)
+        sender = asyncio.ensure_future(self._send(writer, deadline))
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break
+                message = json.loads(line)
+                if 't' not in message:
+                    continue
+                self.offsets.append(time.monotonic() - message['t'] * tick_interval)
+                self.rows = apply_update(self.rows, message)
+                self.updates += 1
+                self.games += len(message.get('over', ()))
+        finally:
+            sender.cancel()
+            writer.close()
+
+    async def _send(self, writer, deadline):
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.interval * self.rng.uniform(0.5, 1.5))
+            writer.write(('{"actions":"%s"}\n' % self.rng.choice('adwss')).encode())
+
+    def jitter(self):
+        """Per-update lateness relative to this session's earliest update, in seconds."""
+        if not self.offsets:
+            return []
+        base = min(self.offsets)
+        return [offset - base for offset in self.offsets]
+
+async def _stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"stats":true}\n')
+    while True:
+        message = json.loads(await reader.readline())
+        if 'stats' in message:
+            writer.close()
+            return message['stats']
+
+async def _start_server(tick_rate):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tetris_server.py'), '--port', '0', '--tick-rate', str(tick_rate),
+        stdout=asyncio.subprocess.PIPE)
+    line = (await process.stdout.readline()).decode()
+    host, port = line.rsplit(' ', 1)[1].strip().rsplit(':', 1)
+    return process, host, int(port)
+
+async def run_load_test(host, port, sessions, duration, tick_rate, actions_per_second, seed):
+    """Runs the test against host:port and returns the report as a dict."""
+    rng = random.Random(seed)
+    clients = [Client(random.Random(rng.random()), actions_per_second) for _ in range(sessions)]
+    tick_interval = 1.0 / tick_rate
+    deadline = time.monotonic() + duration
+    tasks = [asyncio.ensure_future(client.run(host, port, tick_interval, deadline)) for client in clients]
+    await asyncio.sleep(min(1.0, duration / 4)) # Let every session connect before measuring
+    before = await _stats(host, port)
+    await asyncio.sleep(max(0.0, deadline - time.monotonic() - 0.2))
+    after = await _stats(host, port)
+    await asyncio.gather(*tasks)
+
+    wall = after['wall'] - before['wall']
+    cores_used = (after['cpu'] - before['cpu']) / wall if wall > 0 else 0.0
+    jitter = [j for client in clients for j in client.jitter()]
+    updates = after['updates_sent'] - before['updates_sent']
+    return {
+        'sessions': after['sessions'] - 1, # Minus the stats connection itself
+        'duration': wall,
+        'server_cores_used': cores_used,
+        'sessions_per_core': (after['sessions'] - 1) / cores_used if cores_used else None,
+        'updates_per_second': updates / wall if wall > 0 else 0.0,
+        'bytes_per_update': (after['bytes_sent'] - before['bytes_sent']) / updates if updates else 0.0,
+        'skipped_updates': after['skipped_updates'] - before['skipped_updates'],
+        'dropped_actions': after['dropped_actions'] - before['dropped_actions'],
+        'client_jitter_p50_ms': (percentile(jitter, 50) or 0.0) * 1000,
+        'client_jitter_p99_ms': (percentile(jitter, 99) or 0.0) * 1000,
+        'server_tick_late_p50_ms': after['late_p50_ms'],
+        'server_tick_late_p99_ms': after['late_p99_ms'],
+        'games_finished': sum(client.games for client in clients),
+    }
+
+async def _main(args):
+    process = None
+    host, port = args.host, args.port
+    if port is None:
+        process, host, port = await _start_server(args.tick_rate)
+    try:
+        return await run_load_test(host, port, args.sessions, args.duration, args.tick_rate,
+                                   args.actions_per_second, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test tetris_server.py on localhost.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help="test a running server instead of starting one")
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE)
+    parser.add_argument('--actions-per-second', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+    report = asyncio.run(_main(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>24}: {value:.2f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+if __name__ == '__main__':
+    main()
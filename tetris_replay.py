@@ -0,0 +1,197 @@
+"""
+Compact binary replays of Game sessions and a headless replay engine.
+
+A replay stores the game's seed and the player's actions with the number of
+gravity ticks between them; everything else is re-simulated, so a game costs
+a few bytes per piece. Format (all integers are unsigned LEB128 varints):
+
+  b'TRPL', version byte 1
+  width, height, zigzag(seed)
+  events until the end of the data, each starting with (tick_delta << 3 | code):
+    code 0-3  Game.step with ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN
+    code 4    Game.apply, followed by (x << 2 | rotation) and y
+    code 7    no action; only the trailing ticks at the end of a recording
+  where tick_delta is the number of Game.tick() drops since the previous event.
+"""
+import argparse
+import bisect
+
+from tetris import Game, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN
+
+MAGIC = b'TRPL'
+VERSION = 1
+STEP_ACTIONS = (ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN)
+ACTION_CODES = {action: code for code, action in enumerate(STEP_ACTIONS)}
+APPLY, NOOP = 4, 7
+KEYFRAME_INTERVAL = 256 # Ticks between keyframes kept for seeking
+
+class ReplayError(ValueError):
+    """Raised for data that is not a valid replay."""
+
+def write_varint(buf, n):
+    """Appends n >= 0 to the bytearray buf as an unsigned LEB128 varint."""
+    while n > 0x7F:
+        buf.append(n & 0x7F | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def read_varint(data, pos):
+    """Decodes the varint at data[pos]; returns (value, position after it)."""
+    n = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("replay data ends inside a number")
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+def zigzag(n):
+    """Maps signed ints to unsigned ones: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ..."""
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+def unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+class ReplayRecorder:
+    """
+    Records a game as it is played. Drive the game through the recorder's
+    step(), apply() and tick(), which forward to the Game, then call
+    to_bytes(). The game must be fresh (no pieces locked, no ticks) and have
+    an int seed.
+    """
+
+    def __init__(self, game):
+        if not isinstance(game.seed, int):
+            raise ValueError("replays need a game with an int seed")
+        if game.ticks or game.pieces or any(any(row) for row in game.board):
+            raise ValueError("replays must start from a fresh game")
+        self.game = game
+        self._data = bytearray(MAGIC)
+        self._data.append(VERSION)
+        for n in (game.width, game.height, zigzag(game.seed)):
+            write_varint(self._data, n)
+        self._ticks = 0
+
+    def _event(self, code):
+        write_varint(self._data, (self.game.ticks - self._ticks) << 3 | code)
+        self._ticks = self.game.ticks
+
+    def step(self, action):
+        code = ACTION_CODES.get(action)
+        if code is not None and not self.game.game_over:
+            self._event(code)
+        return self.game.step(action)
+
+    def apply(self, rotation, x, y):
+        self._event(APPLY)
+        write_varint(self._data, x << 2 | rotation)
+        write_varint(self._data, y)
+        return self.game.apply(rotation, x, y, undoable=False) # Replays cannot record undo()
+
+    def tick(self, n=1):
+        return self.game.tick(n)
+
+    def to_bytes(self):
+        data = bytearray(self._data)
+        if self.game.ticks != self._ticks:
+            write_varint(data, (self.game.ticks - self._ticks) << 3 | NOOP)
+        return bytes(data)
+
+class Replay:
+    """
+    A decoded replay. run() re-simulates the whole game; seek(tick) returns
+    the game as it was after `tick` gravity ticks and the actions made up to
+    then, replaying from the nearest keyframe (built on first use, one every
+    keyframe_interval ticks).
+    """
+
+    def __init__(self, data, keyframe_interval=KEYFRAME_INTERVAL):
+        if data[:4] != MAGIC:
+            raise ReplayError("not a replay")
+        if data[4] != VERSION:
+            raise ReplayError(f"unsupported replay version {data[4]}")
+        pos = 5
+        self.width, pos = read_varint(data, pos)
+        self.height, pos = read_varint(data, pos)
+        seed, pos = read_varint(data, pos)
+        self.seed = unzigzag(seed)
+        self.events = [] # (tick, code, apply arguments or None)
+        tick = 0
+        while pos < len(data):
+            head, pos = read_varint(data, pos)
+            tick += head >> 3
+            code = head & 7
+            args = None
+            if code == APPLY:
+                packed, pos = read_varint(data, pos)
+                y, pos = read_varint(data, pos)
+                args = (packed & 3, packed >> 2, y)
+            elif code >= len(STEP_ACTIONS) and code != NOOP:
+                raise ReplayError(f"unknown event code {code}")
+            self.events.append((tick, code, args))
+        self.end_tick = tick
+        self.size = len(data)
+        self.keyframe_interval = keyframe_interval
+        self._keyframes = None # (tick, event index, GameState)
+
+    def new_game(self):
+        return Game(width=self.width, height=self.height, seed=self.seed)
+
+    def _advance(self, game, index, tick):
+        """Plays events from index on up to and including `tick`; returns the next event index."""
+        events = self.events
+        while index < len(events) and events[index][0] <= tick:
+            event_tick, code, args = events[index]
+            game.tick(event_tick - game.ticks)
+            if code == APPLY:
+                game.apply(*args, undoable=False)
+            elif code != NOOP:
+                game.step(STEP_ACTIONS[code])
+            index += 1
+        game.tick(min(tick, self.end_tick) - game.ticks)
+        return index
+
+    def run(self):
+        """Re-simulates the whole replay and returns the final Game."""
+        game = self.new_game()
+        self._advance(game, 0, self.end_tick)
+        return game
+
+    def _build_keyframes(self):
+        game = self.new_game()
+        index = 0
+        self._keyframes = [(0, 0, game.state())]
+        for tick in range(self.keyframe_interval, self.end_tick + 1, self.keyframe_interval):
+            index = self._advance(game, index, tick)
+            self._keyframes.append((tick, index, game.state()))
+
+    def seek(self, tick):
+        """Returns a new Game in the state at `tick` (clamped to the end of the replay)."""
+        if self._keyframes is None:
+            self._build_keyframes()
+        tick = max(0, min(tick, self.end_tick))
+        keyframe_tick, index, state = self._keyframes[bisect.bisect_right(self._keyframes, (tick, float('inf'))) - 1]
+        game = self.new_game()
+        game.restore(state)
+        self._advance(game, index, tick)
+        return game
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-simulate a Tetris replay file.")
+    parser.add_argument('replay')
+    parser.add_argument('--seek', type=int, default=None, help="show the board at this tick")
+    args = parser.parse_args(argv)
+    with open(args.replay, 'rb') as f:
+        replay = Replay(f.read())
+    game = replay.run() if args.seek is None else replay.seek(args.seek)
+    print(f"seed {replay.seed}, {replay.size} bytes, {len(replay.events)} events, {replay.end_tick} ticks")
+    print(f"tick {game.ticks}: score {game.score}, lines {game.lines}, pieces {game.pieces}"
+          f"{', game over' if game.game_over else ''}")
+    for row in game.board.to_rows():
+        print(''.join('#' if cell else '.' for cell in row))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Asyncio server hosting many Tetris sessions in one process.
+
+Each TCP connection is one session running a Game from tetris.py. A single
+scheduler task advances every session once per tick: queued player actions
+are applied, gravity runs every few ticks, and each session is sent at most
+one update per tick with only what changed since the last update it received.
+
+Protocol: newline-delimited JSON in both directions.
+
+  client -> server  {"actions": "adws"}   action keys, applied on the next tick
+                    {"stats": true}       ask for a stats message
+  server -> client  {"t": tick, ...}      state update; fields present only when changed:
+                      "size": [w, h]        first update for a game: the board is empty
+                                            apart from the rows listed in "rows"
+                      "rows": [[r, mask]]   changed rows (top-down index, bit c = column c)
+                      "piece": [name, rotation, x, y] or null
+                      "score", "lines"
+                      "over": [scores]      games that ended since the last update;
+                                            a new game starts at once
+                    {"stats": {...}}      server counters (see Server.stats)
+
+A client whose socket buffer is full is paused and simply sent nothing;
+since updates are deltas against the last update actually sent, the next
+update after it drains catches it up. In the other direction, actions sent
+faster than they are applied queue up to MAX_PENDING_ACTIONS per session;
+further ones are dropped and counted in the stats.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+from tetris import BOARD_WIDTH, BOARD_HEIGHT, Game, FixedTimestep, percentile
+
+TICK_RATE = 60 # Scheduler ticks per second
+GRAVITY_TICKS = 30 # Ticks per gravity drop
+MAX_ACTIONS_PER_TICK = 8 # Further queued actions wait for later ticks
+MAX_PENDING_ACTIONS = 256 # Actions queued beyond this many per session are dropped
+MAX_LINE = 4096 # Longest accepted request line; longer ones close the session
+WRITE_BUFFER_HIGH = 64 * 1024 # Pause a session's updates above this many buffered bytes
+
+def _dumps(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+def apply_update(rows, message):
+    """
+    Applies an update's board fields to rows (a list of top-down row masks)
+    and returns the rows, which are a new list when the update carries "size".
+    """
+    if 'size' in message:
+        rows = [0] * message['size'][1]
+    for r, mask in message.get('rows', ()):
+        rows[r] = mask
+    return rows
+
+class Session(asyncio.Protocol):
+    """One client connection and the Game it drives."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.paused = False
+        self.pending = deque()
+        self.finished = []
+        self._buffer = b''
+        self._new_game()
+
+    def _new_game(self):
+        self.game = Game(width=self.server.width, height=self.server.height)
+        self.sent_rows = None # Rows as of the last update sent, None before the first
+        self.sent_pieces = self.sent_piece = self.sent_score = self.sent_lines = None
+
+    # asyncio.Protocol callbacks
+    def connection_made(self, transport):
+        self.transport = transport
+        transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH)
+        self.server.sessions.add(self)
+
+    def connection_lost(self, exc):
+        self.server.sessions.discard(self)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+
+    def data_received(self, data):
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b'\n')
+        if len(self._buffer) > MAX_LINE:
+            self.transport.close()
+            return
+        for line in lines:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(request, dict):
+                continue
+            actions = request.get('actions')
+            if isinstance(actions, str):
+                room = max(MAX_PENDING_ACTIONS - len(self.pending), 0)
+                self.pending.extend(actions[:room])
+                self.server.dropped_actions += max(len(actions) - room, 0)
+            if request.get('stats'):
+                self.transport.write(_dumps({'stats': self.server.stats()}))
+
+    def update(self, tick, gravity):
+        """Advances the game by one scheduler tick and sends the resulting delta."""
+        game = self.game
+        for _ in range(min(len(self.pending), MAX_ACTIONS_PER_TICK)):
+            game.step(self.pending.popleft())
+        if gravity:
+            game.tick()
+        if game.game_over:
+            self.finished.append(game.score)
+            self._new_game()
+        if self.paused:
+            self.server.skipped_updates += 1
+            return
+        message = self.delta(tick)
+        if message is not None:
+            data = _dumps(message)
+            self.server.updates_sent += 1
+            self.server.bytes_sent += len(data)
+            self.transport.write(data)
+
+    def delta(self, tick):
+        """The update since the last one sent, or None if nothing changed."""
+        game = self.game
+        message = {}
+        if self.sent_rows is None:
+            message['size'] = [game.width, game.height]
+            self.sent_rows = [0] * game.height
+        if game.pieces != self.sent_pieces: # The board only changes when a piece locks
+            rows = game.board.rows
+            changed = [[r, mask] for r, (mask, old) in enumerate(zip(rows, self.sent_rows)) if mask != old]
+            if changed:
+                message['rows'] = changed
+            self.sent_rows, self.sent_pieces = rows, game.pieces
+        p = game.current_piece
+        piece = [p.shape_name, p.rotation, p.x, p.y]
+        if piece != self.sent_piece:
+            message['piece'] = self.sent_piece = piece
+        if game.score != self.sent_score:
+            message['score'] = self.sent_score = game.score
+        if game.lines != self.sent_lines:
+            message['lines'] = self.sent_lines = game.lines
+        if self.finished:
+            message['over'], self.finished = self.finished, []
+        if not message:
+            return None
+        message['t'] = tick
+        return message
+
+class Server:
+    """
+    Owns the sessions and the shared tick scheduler. Ticks follow a
+    FixedTimestep on the event loop clock; how late each tick started is kept
+    in `lateness` (seconds) for the stats message.
+    """
+
+    def __init__(self, tick_rate=TICK_RATE, gravity_ticks=GRAVITY_TICKS,
+                 width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.tick_interval = 1.0 / tick_rate
+        self.gravity_ticks = gravity_ticks
+        self.width, self.height = width, height
+        self.sessions = set()
+        self.ticks = 0
+        self.lateness = deque(maxlen=10000)
+        self.updates_sent = self.bytes_sent = self.skipped_updates = self.dropped_actions = 0
+        self.started = time.monotonic()
+        self._cpu_start = time.process_time()
+
+    def tick(self):
+        self.ticks += 1
+        gravity = self.ticks % self.gravity_ticks == 0
+        for session in list(self.sessions):
+            session.update(self.ticks, gravity)
+
+    async def run_scheduler(self):
+        loop = asyncio.get_running_loop()
+        steps = FixedTimestep(self.tick_interval, loop.time())
+        while True:
+            await asyncio.sleep(max(0.0, steps.next_time - loop.time()))
+            scheduled = steps.next_time
+            now = loop.time()
+            due = steps.due(now)
+            if due:
+                self.lateness.append(now - scheduled)
+            for _ in range(due):
+                self.tick()
+
+    def stats(self):
+        """Counters for load testing: CPU and wall seconds since start, tick lateness in ms."""
+        lateness = list(self.lateness)
+        return {
+            'sessions': len(self.sessions),
+            'ticks': self.ticks,
+            'wall': time.monotonic() - self.started,
+            'cpu': time.process_time() - self._cpu_start,
+            'late_p50_ms': (percentile(lateness, 50) or 0.0) * 1000,
+            'late_p99_ms': (percentile(lateness, 99) or 0.0) * 1000,
+            'updates_sent': self.updates_sent,
+            'bytes_sent': self.bytes_sent,
+            'skipped_updates': self.skipped_updates,
+            'dropped_actions': self.dropped_actions,
+        }
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """Starts listening and the scheduler; returns the asyncio server (see .sockets for the port)."""
+        loop = asyncio.get_running_loop()
+        listener = await loop.create_server(lambda: Session(self), host, port)
+        self._scheduler = asyncio.ensure_future(self.run_scheduler())
+        return listener
+
+    async def close(self, listener):
+        self._scheduler.cancel()
+        listener.close()
+        for session in list(self.sessions):
+            session.transport.close()
+        await listener.wait_closed()
+
+async def _main(args):
+    server = Server(args.tick_rate, args.gravity_ticks)
+    listener = await server.serve(args.host, args.port)
+    port = listener.sockets[0].getsockname()[1]
+    print(f"Tetris server listening on {args.host}:{port}", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host Tetris sessions over line-JSON TCP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE)
+    parser.add_argument('--gravity-ticks', type=int, default=GRAVITY_TICKS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
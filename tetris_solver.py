@@ -0,0 +1,330 @@
+"""
+Perfect-clear and finesse solver.
+
+PerfectClearSolver searches a known piece queue for a sequence of placements
+that leaves the board empty. A perfect clear of height h must fill exactly the
+h * width - filled empty cells of the bottom h rows, four per piece and
+without a cell above them, so only heights where that count is a multiple of
+4 and at most 4 * pieces are tried, lowest first. During the search:
+
+  - placements reaching above the remaining box are skipped
+  - the box is split into runs of columns that no piece can span (see
+    _segments_ok), and every run's empty cell count must stay a multiple of 4
+  - the empty cells must be coverable by the remaining shapes, ignoring order
+    and gravity; this exact-cover check is memoized on (cells, shape counts)
+  - (board, queue index, box height) states that failed are remembered, with
+    the board's snapshot (hashed by its Zobrist key) as the canonical form, so
+    transpositions are searched once
+
+Queues that have a perfect clear are usually answered in well under a second;
+proving that a 10-piece queue has none can take a few seconds, which
+time_budget bounds.
+
+finesse() returns the fewest key presses that bring a spawned piece to a
+placement, searching the moves enumerate_placements() uses (left, right,
+rotate with kicks, soft drop). Drops are free, since gravity makes them;
+among paths with the fewest presses the one pressing highest up is taken, so
+moves happen at the spawn unless a tuck needs them lower.
+
+    python tetris_solver.py IOJSZLTJLT
+    python tetris_solver.py OI --board rows.txt --time-budget 0.5
+"""
+import argparse
+import heapq
+import itertools
+import sys
+import time
+
+from tetris import (
+    BitBoard, Piece, PIECE_TABLE, SHAPE_NAMES, ACTION_LEFT, ACTION_RIGHT, ACTION_ROTATE, ACTION_DOWN,
+    enumerate_placements,
+)
+
+PC_MAX_HEIGHT = 4 # Tallest perfect clear tried by default
+
+class _Timeout(Exception):
+    pass
+
+_cover_tables = {}
+
+def cover_table(width, height):
+    """
+    For a box of width x height cells, numbered c * height + j for column c and
+    row j from the floor (column-major, so the lowest set bit of a cell mask is
+    its leftmost, lowest cell): a list giving, for each cell, the (shape index,
+    cell mask) of every piece placement whose lowest cell it is. A placement
+    may skip rows between its own (rows cleared before it was placed), so the
+    table over-approximates what play can reach. Built on first use.
+    """
+    table = _cover_tables.get((width, height))
+    if table is None:
+        table = [[] for _ in range(width * height)]
+        for shape, name in enumerate(SHAPE_NAMES):
+            masks = set()
+            for geometry in PIECE_TABLE[name]:
+                pattern = geometry.masks[::-1] # Bottom row first
+                for x in range(width - geometry.width + 1):
+                    for rows in itertools.combinations(range(height), len(pattern)):
+                        mask = 0
+                        for j, row in zip(rows, pattern):
+                            for c in range(width):
+                                if row << x >> c & 1:
+                                    mask |= 1 << (c * height + j)
+                        masks.add(mask)
+            for mask in masks:
+                table[(mask & -mask).bit_length() - 1].append((shape, mask))
+        _cover_tables[(width, height)] = table
+    return table
+
+def _copy(board):
+    if isinstance(board, BitBoard):
+        return BitBoard.from_snapshot(board.snapshot())
+    return BitBoard.from_rows(board)
+
+def _segments_ok(board, height):
+    """
+    True if the empty cells of the bottom height rows split into column runs
+    of 4k cells each. Neighbouring columns are in the same run only if some
+    row has both cells empty: a piece covering both needs such a row, filling
+    cells never joins two runs, and a cleared row holds no empty cells.
+    """
+    box = (1 << height) - 1
+    run = previous = 0
+    for col in board.cols:
+        cells = ~col & box
+        if not cells & previous:
+            if run & 3:
+                return False
+            run = 0
+        run += cells.bit_count()
+        previous = cells
+    return not run & 3
+
+def _empty_cells(board, height):
+    """The empty cells of the bottom height rows as a cover_table() cell mask."""
+    box = (1 << height) - 1
+    cells = 0
+    for c, col in enumerate(board.cols):
+        cells |= (~col & box) << (c * height)
+    return cells
+
+class PerfectClearSolver:
+    """
+    Finds perfect clears for a known queue (no hold). solve() returns the
+    placements, (rotation, x, y) per piece in queue order, or None. With
+    time_budget set (seconds per solve), a search that runs out of time also
+    returns None and sets timed_out. nodes, cache_hits and tilings count the
+    work of the last solve().
+    """
+
+    def __init__(self, max_height=PC_MAX_HEIGHT, time_budget=None):
+        self.max_height = max_height
+        self.time_budget = time_budget
+        self.nodes = self.cache_hits = 0
+        self.timed_out = False
+        self._dead = set() # (BoardSnapshot, queue index, box height) states with no solution
+        self._tilings = {} # (empty cells, shape counts, box height) -> whether those shapes can cover them
+        self._counts = [] # Shape counts of queue[i:] for each i
+        self._deadline = None
+
+    @property
+    def tilings(self):
+        return len(self._tilings)
+
+    def heights(self, board, pieces):
+        """The box heights a perfect clear with at most `pieces` pieces can have, lowest first."""
+        filled = sum(row.bit_count() for row in board.rows)
+        return [h for h in range(max(board.stack_height, 1), self.max_height + 1)
+                if (h * board.width - filled) % 4 == 0 and h * board.width - filled <= 4 * pieces]
+
+    def solve(self, board, queue, max_pieces=None):
+        """
+        Placements that clear board (a BitBoard or list board, not modified)
+        using the shapes in queue in order, at most max_pieces of them, or
+        None if there is no perfect clear within max_height rows.
+        """
+        board = _copy(board)
+        queue = tuple(queue)[:max_pieces]
+        self.nodes = self.cache_hits = 0
+        self.timed_out = False
+        self._dead, self._tilings = set(), {}
+        self._counts = [tuple(queue[i:].count(name) for name in SHAPE_NAMES) for i in range(len(queue) + 1)]
+        self._deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        filled = sum(row.bit_count() for row in board.rows)
+        try:
+            for height in self.heights(board, len(queue)):
+                if not _segments_ok(board, height):
+                    continue
+                solution = self._search(board, queue, 0, height, height * board.width - filled)
+                if solution is not None:
+                    return solution
+        except _Timeout:
+            self.timed_out = True
+        finally:
+            self._deadline = None
+        return None
+
+    def _tileable(self, cells, counts, height, table):
+        """
+        True if pieces with the given shape counts can cover exactly `cells`,
+        ignoring order, gravity and reachability: a necessary condition for a
+        perfect clear. Covers the lowest cell first, so each step only tries
+        the placements starting there.
+        """
+        if not cells:
+            return True
+        key = (cells, counts, height)
+        known = self._tilings.get(key)
+        if known is not None:
+            return known
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise _Timeout
+        result = False
+        for shape, mask in table[(cells & -cells).bit_length() - 1]:
+            if counts[shape] and not mask & ~cells:
+                rest = counts[:shape] + (counts[shape] - 1,) + counts[shape + 1:]
+                if self._tileable(cells ^ mask, rest, height, table):
+                    result = True
+                    break
+        self._tilings[key] = result
+        return result
+
+    def _search(self, board, queue, index, height, empty):
+        """Placements for queue[index:] that fill the `empty` cells of the bottom `height` rows."""
+        if index and not board.stack_height:
+            return []
+        if empty > 4 * (len(queue) - index):
+            return None
+        key = (board.snapshot(), index, height)
+        if key in self._dead:
+            self.cache_hits += 1
+            return None
+        self.nodes += 1
+        if not self._tileable(_empty_cells(board, height), self._counts[index], height,
+                              cover_table(board.width, height)):
+            self._dead.add(key)
+            return None
+        name = queue[index]
+        rotations = PIECE_TABLE[name]
+        top = board.height - height # Highest row a piece may occupy
+        placements = [p for p in enumerate_placements(board, Piece.spawn(name, board.width)) if p[2] >= top]
+        placements.sort(key=lambda p: -p[2]) # Low placements first: they complete rows sooner
+        for rotation, x, y in placements:
+            masks = board.masks[(name, rotation, x)]
+            board.fix(masks, y)
+            cleared = board.clear_rows(range(y, y + rotations[rotation].height))
+            rest = None
+            if _segments_ok(board, height - len(cleared)):
+                # A clear removes a full row from the box, so the empty count only drops by the piece
+                rest = self._search(board, queue, index + 1, height - len(cleared), empty - 4)
+            board.restore_rows(cleared)
+            board.unfix(masks, y)
+            if rest is not None:
+                return [(rotation, x, y)] + rest
+        self._dead.add(key)
+        return None
+
+def perfect_clear(board, queue, max_pieces=None, max_height=PC_MAX_HEIGHT):
+    """PerfectClearSolver(max_height).solve(board, queue, max_pieces)."""
+    return PerfectClearSolver(max_height).solve(board, queue, max_pieces)
+
+def finesse(board, shape_name, rotation, x, y):
+    """
+    The actions (ACTION_LEFT/RIGHT/ROTATE/DOWN) that take a newly spawned
+    shape_name piece to the resting placement (rotation, x, y) with the fewest
+    left, right and rotate presses (made as high up as possible), ending with
+    the ACTION_DOWN that locks it. The drops can be left to gravity, so the key
+    presses are the other actions. Returns None if the spawn collides or the
+    placement cannot be reached.
+    """
+    if not isinstance(board, BitBoard):
+        board = BitBoard.from_rows(board)
+    collides, all_masks, all_kicks = board.collides, board.masks, board.kicks
+    spawn = Piece.spawn(shape_name, board.width)
+    start, target = (spawn.rotation, spawn.x, spawn.y), (rotation, x, y)
+    if collides(all_masks[(shape_name, spawn.rotation, spawn.x)], spawn.y):
+        return None
+    # Dijkstra on (presses, sum of the rows pressed at) over the moves of _search_placements()
+    costs = {start: (0, 0)}
+    parents = {start: (None, None)}
+    heap = [((0, 0), start)]
+    while heap:
+        cost, state = heapq.heappop(heap)
+        if cost != costs[state]:
+            continue
+        if state == target:
+            break
+        r, c, row = state
+        presses, depth = cost
+        moves = []
+        if not collides(all_masks[(shape_name, r, c)], row + 1):
+            moves.append(((r, c, row + 1), ACTION_DOWN, cost))
+        for action, dx in ((ACTION_LEFT, -1), (ACTION_RIGHT, 1)):
+            moved = all_masks.get((shape_name, r, c + dx))
+            if moved is not None and not collides(moved, row):
+                moves.append(((r, c + dx, row), action, (presses + 1, depth + row)))
+        for new_rotation, new_x, kicked in all_kicks[(shape_name, r, c)]:
+            if not collides(kicked, row):
+                moves.append(((new_rotation, new_x, row), ACTION_ROTATE, (presses + 1, depth + row)))
+                break # Only the first kick candidate that fits is taken
+        for nxt, action, nxt_cost in moves:
+            if nxt not in costs or nxt_cost < costs[nxt]:
+                costs[nxt], parents[nxt] = nxt_cost, (state, action)
+                heapq.heappush(heap, (nxt_cost, nxt))
+    masks = all_masks.get((shape_name, rotation, x))
+    if masks is None or target not in parents or not collides(masks, y + 1):
+        return None
+    actions = [ACTION_DOWN]
+    state = target
+    while True:
+        state, action = parents[state]
+        if state is None:
+            break
+        actions.append(action)
+    return actions[::-1]
+
+def solution_finesse(board, queue, placements):
+    """finesse() key sequences for each placement of a solve() result, played in order on a copy of board."""
+    board = _copy(board)
+    paths = []
+    for name, (rotation, x, y) in zip(queue, placements):
+        paths.append(finesse(board, name, rotation, x, y))
+        masks = board.masks[(name, rotation, x)]
+        board.fix(masks, y)
+        board.clear_rows(range(y, y + len(masks)))
+    return paths
+
+def read_board(path, width=10, height=20):
+    """A BitBoard from a text file of rows like '##..######' ('#' or 'X' filled), aligned to the floor."""
+    with open(path) as f:
+        lines = [line.rstrip('\n') for line in f if line.strip()]
+    rows = [[0] * width for _ in range(height - len(lines))]
+    rows += [[1 if cell in '#X' else 0 for cell in line.ljust(width, '.')[:width]] for line in lines]
+    return BitBoard.from_rows(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find a perfect clear for a known piece queue.")
+    parser.add_argument('queue', help="shapes in order, e.g. IOJSZLTJLT")
+    parser.add_argument('--board', help="text file with the starting rows ('#' filled, '.' empty)")
+    parser.add_argument('--max-pieces', type=int, default=None)
+    parser.add_argument('--max-height', type=int, default=PC_MAX_HEIGHT)
+    parser.add_argument('--time-budget', type=float, default=None, help="give up after this many seconds")
+    args = parser.parse_args(argv)
+    board = read_board(args.board) if args.board else BitBoard()
+    queue = args.queue.upper()
+    solver = PerfectClearSolver(args.max_height, args.time_budget)
+    start = time.perf_counter()
+    placements = solver.solve(board, queue, args.max_pieces)
+    elapsed = time.perf_counter() - start
+    print(f"{solver.nodes} nodes, {solver.cache_hits} cache hits, {elapsed * 1000:.1f} ms")
+    if placements is None:
+        print("out of time" if solver.timed_out else "no perfect clear")
+        return 1
+    for name, placement, keys in zip(queue, placements, solution_finesse(board, queue, placements)):
+        rotation, x, y = placement
+        presses = sum(action != ACTION_DOWN for action in keys)
+        print(f"{name}: rotation {rotation}, x {x}, y {y}  {presses} presses: {''.join(keys)}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Genetic tuner for tetris_bot evaluation weights.
+
+Each generation every candidate Weights plays the same seeded headless games
+(common random numbers, so candidates are compared on equal terms). Games run
+on a process pool started once; workers write each game's score, lines and
+pieces straight into a shared array instead of returning them, and the parent
+reads fitness (mean lines per game) from it. The weakest part of the
+population is then replaced by children of tournament winners: a
+fitness-weighted average of two parents, sometimes mutated, normalised to unit
+length. Every generation is checkpointed to JSON, and a run restarted with the
+same checkpoint path resumes where it stopped.
+
+    python tetris_tuner.py --generations 20 --population 32 --games 16 --checkpoint tuner.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+
+from tetris import game_seed, play_game
+from tetris_bot import Bot, Weights, DEFAULT_WEIGHTS
+
+POPULATION = 32
+GAMES = 16 # Games per candidate per generation
+MAX_PIECES = 500
+DEPTH = 1 # Bot search depth while tuning
+TOURNAMENT = 0.1 # Share of the population drawn for each tournament
+OFFSPRING = 0.3 # Share of the population replaced each generation
+MUTATION_RATE = 0.05
+MUTATION_STEP = 0.2
+RESULT_FIELDS = 3 # score, lines, pieces
+
+def normalize(weights):
+    norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+    return Weights(*(w / norm for w in weights))
+
+_worker = None
+
+def _init_worker(results, max_pieces, depth):
+    global _worker
+    _worker = (results, max_pieces, depth)
+
+def _play(task):
+    """Plays one game for one candidate and stores the result in its slot of the shared array."""
+    slot, weights, seed = task
+    results, max_pieces, depth = _worker
+    result = play_game(seed, Bot(weights, depth=depth), max_pieces)
+    base = slot * RESULT_FIELDS
+    results[base], results[base + 1], results[base + 2] = result.score, result.lines, result.pieces
+
+class Tuner:
+    """
+    Evolves a population of Weights. run() plays generations until the
+    requested total is reached, saving a checkpoint after each one when
+    checkpoint is set; if that file exists, the tuner resumes from it (its
+    population size and game count take precedence over the arguments).
+    """
+
+    def __init__(self, population=POPULATION, games=GAMES, workers=1, seed=0,
+                 max_pieces=MAX_PIECES, depth=DEPTH, checkpoint=None):
+        self.games, self.workers, self.seed = games, workers, seed
+        self.max_pieces, self.depth = max_pieces, depth
+        self.checkpoint = checkpoint
+        self.generation = 0
+        self.history = [] # Per generation: best and mean fitness, best weights
+        self.rng = random.Random(seed)
+        if checkpoint and os.path.exists(checkpoint):
+            self._load(checkpoint)
+        else:
+            self.population = [normalize(DEFAULT_WEIGHTS)] + [
+                normalize([self.rng.uniform(-1, 1) for _ in Weights._fields]) for _ in range(population - 1)]
+
+    @property
+    def best(self):
+        """(fitness, weights) of the best candidate of the latest generation, or None."""
+        if not self.history:
+            return None
+        return self.history[-1]['best_fitness'], Weights(*self.history[-1]['best_weights'])
+
+    def _load(self, path):
+        with open(path) as f:
+            state = json.load(f)
+        self.games, self.seed, self.generation = state['games'], state['seed'], state['generation']
+        self.population = [Weights(*w) for w in state['population']]
+        self.history = state['history']
+        version, internal, gauss = state['rng_state']
+        self.rng.setstate((version, tuple(internal), gauss))
+
+    def save(self, path):
+        """Writes the checkpoint atomically (write to a temporary file, then rename)."""
+        state = {
+            'games': self.games, 'seed': self.seed, 'generation': self.generation,
+            'population': [list(w) for w in self.population],
+            'history': self.history,
+            'rng_state': self.rng.getstate(),
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def _tasks(self):
+        seeds = [game_seed(self.seed, self.generation * self.games + i) for i in range(self.games)]
+        return [(c * self.games + g, weights, seeds[g])
+                for c, weights in enumerate(self.population) for g in range(self.games)]
+
+    def _fitness(self, results):
+        """Mean lines per game for each candidate, read from the shared results array."""
+        per_candidate = self.games * RESULT_FIELDS
+        return [sum(results[c * per_candidate + 1:(c + 1) * per_candidate:RESULT_FIELDS]) / self.games
+                for c in range(len(self.population))]
+
+    def _breed(self, fitness):
+        """Replaces the weakest OFFSPRING share of the population with children of tournament winners."""
+        n = len(self.population)
+        ranked = sorted(range(n), key=fitness.__getitem__)
+        tournament = max(2, int(n * TOURNAMENT))
+        children = []
+        for _ in range(max(1, int(n * OFFSPRING))):
+            drawn = sorted(self.rng.sample(range(n), tournament), key=fitness.__getitem__, reverse=True)
+            a, b = drawn[0], drawn[1]
+            fa, fb = fitness[a] + 1e-9, fitness[b] + 1e-9
+            child = [wa * fa + wb * fb for wa, wb in zip(normalize(self.population[a]), normalize(self.population[b]))]
+            child = normalize(child)
+            if self.rng.random() < MUTATION_RATE:
+                child = list(child)
+                child[self.rng.randrange(len(child))] += self.rng.uniform(-MUTATION_STEP, MUTATION_STEP)
+                child = normalize(child)
+            children.append(child)
+        for index, child in zip(ranked, children):
+            self.population[index] = child
+
+    def run(self, generations, log=None):
+        """Evolves until `generations` generations have been played in total; returns self.best."""
+        size = len(self.population) * self.games * RESULT_FIELDS
+        results = multiprocessing.Array('d', size, lock=False) # Shared with the workers; never pickled
+        pool = None
+        if self.workers > 1:
+            pool = multiprocessing.Pool(self.workers, _init_worker, (results, self.max_pieces, self.depth))
+        else:
+            _init_worker(results, self.max_pieces, self.depth)
+        try:
+            while self.generation < generations:
+                tasks = self._tasks()
+                if pool is None:
+                    for task in tasks:
+                        _play(task)
+                else:
+                    for _ in pool.imap_unordered(_play, tasks, chunksize=max(1, len(tasks) // (self.workers * 4))):
+                        pass
+                fitness = self._fitness(results)
+                best = max(range(len(fitness)), key=fitness.__getitem__)
+                self.history.append({
+                    'generation': self.generation,
+                    'best_fitness': fitness[best],
+                    'mean_fitness': sum(fitness) / len(fitness),
+                    'best_weights': list(self.population[best]),
+                })
+                if log:
+                    log(self.history[-1])
+                self._breed(fitness)
+                self.generation += 1
+                if self.checkpoint:
+                    self.save(self.checkpoint)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return self.best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune tetris_bot weights with a genetic algorithm.")
+    parser.add_argument('--generations', type=int, default=20, help="total generations, counting resumed ones")
+    parser.add_argument('--population', type=int, default=POPULATION)
+    parser.add_argument('--games', type=int, default=GAMES)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-pieces', type=int, default=MAX_PIECES)
+    parser.add_argument('--depth', type=int, default=DEPTH)
+    parser.add_argument('--checkpoint', help="JSON checkpoint to write each generation and resume from")
+    args = parser.parse_args(argv)
+    tuner = Tuner(args.population, args.games, args.workers, args.seed, args.max_pieces, args.depth, args.checkpoint)
+
+    def log(entry):
+        print(f"generation {entry['generation']}: best {entry['best_fitness']:.1f} "
+              f"mean {entry['mean_fitness']:.1f} lines/game", flush=True)
+    fitness, weights = tuner.run(args.generations, log)
+    print(f"best: {fitness:.1f} lines/game with {weights}")
+
+if __name__ == '__main__':
+    main()